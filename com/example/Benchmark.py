@@ -0,0 +1,366 @@
+import argparse
+import contextlib
+import gc
+import importlib.util
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# 各规模的合成数据参数
+Scales = {
+    'small': {'days': 1000, 'symbols': 20, 'stocks': 300, 'excel_rows': 5000, 'insert_rows': 50000},
+    'medium': {'days': 2500, 'symbols': 200, 'stocks': 2000, 'excel_rows': 20000, 'insert_rows': 500000},
+    'large': {'days': 5000, 'symbols': 1000, 'stocks': 5000, 'excel_rows': 50000, 'insert_rows': 2000000},
+}
+Output_Dir = 'data/benchmarks'
+Regression_Threshold = 0.2  # 耗时增加超过20%视为性能回退
+
+
+# ---------------------------------------------------------------- 合成数据
+
+def random_walk_bars(days, symbols=1, start='2015-01-05', seed=42):
+    """
+    随机游走日线（长表：ts_code, trade_date, open/high/low/close/pre_close/pct_chg/vol/amount）
+
+    在MA20Strategy示例数据生成方式的基础上改为几何随机游走，价格始终为正
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(start, periods=days)
+    returns = rng.normal(0.0003, 0.018, (symbols, days))
+    close = 100 * np.exp(np.cumsum(returns, axis=1))
+    pre_close = np.concatenate([close[:, :1] / np.exp(returns[:, :1]), close[:, :-1]], axis=1)
+    open_ = close * (1 + rng.normal(0, 0.01, close.shape))
+    high = np.maximum(close, open_) * (1 + np.abs(rng.normal(0, 0.01, close.shape)))
+    low = np.minimum(close, open_) * (1 - np.abs(rng.normal(0, 0.01, close.shape)))
+    vol = rng.integers(1_000_000, 5_000_000, close.shape).astype(np.float64)
+    return pd.DataFrame({
+        'ts_code': np.repeat([f"{600000 + i:06d}.SH" for i in range(symbols)], days),
+        'trade_date': np.tile(dates.strftime('%Y%m%d'), symbols),
+        'open': open_.ravel(), 'high': high.ravel(), 'low': low.ravel(), 'close': close.ravel(),
+        'pre_close': pre_close.ravel(), 'pct_chg': ((close / pre_close - 1) * 100).ravel(),
+        'vol': vol.ravel(), 'amount': (vol * close / 10).ravel(),
+    })
+
+
+def screening_panels(stocks, years=6, history_days=250, seed=7):
+    """选股引擎所需的全市场面板（年报财务指标、现金流、估值、基本信息和估值历史）"""
+    rng = np.random.default_rng(seed)
+    codes = np.array([f"{i:06d}.SZ" for i in range(stocks)])
+    ends = [f"{2024 - k}1231" for k in range(years)]
+    n = stocks * years
+    growth = rng.normal(1.1, 0.1, (stocks, 1)) ** -np.arange(years)
+    fina = pd.DataFrame({
+        'ts_code': np.repeat(codes, years), 'end_date': np.tile(ends, stocks), 'report_type': 1,
+        'roe': rng.normal(14, 6, n), 'roic': rng.normal(11, 5, n),
+        'grossprofit_margin': rng.normal(35, 15, n), 'netprofit_margin': rng.normal(12, 8, n),
+        'debt_to_assets': rng.uniform(10, 90, n), 'current_ratio': rng.uniform(0.5, 4, n),
+        'quick_ratio': rng.uniform(0.3, 3, n), 'revenue_ps': (10 * growth).ravel(),
+        'profit_dedt': (1e8 * growth * rng.uniform(0.8, 1.2, (stocks, years))).ravel(),
+        'im_net_cashflow_oper_act': rng.normal(1.2e8, 5e7, n), 'net_profit': rng.normal(1e8, 3e7, n),
+    })
+    valuation = pd.DataFrame({'ts_code': codes, 'pe_ttm': rng.uniform(5, 60, stocks),
+                              'pb': rng.uniform(0.5, 8, stocks), 'dv_ttm': rng.uniform(0, 6, stocks)})
+    history_dates = pd.bdate_range('2020-01-01', periods=history_days).strftime('%Y%m%d')
+    history = pd.DataFrame({
+        'ts_code': np.repeat(codes, history_days), 'trade_date': np.tile(history_dates, stocks),
+        'pe_ttm': (valuation['pe_ttm'].to_numpy()[:, None] * rng.uniform(0.6, 1.4, (stocks, history_days))).ravel(),
+        'pb': (valuation['pb'].to_numpy()[:, None] * rng.uniform(0.6, 1.4, (stocks, history_days))).ravel(),
+    })
+    panels = {
+        'fina_indicator': fina,
+        'cashflow': fina[['ts_code', 'end_date', 'report_type', 'im_net_cashflow_oper_act', 'net_profit']],
+        'valuation': valuation,
+        'stock_basic': pd.DataFrame({'ts_code': codes, 'name': codes, 'industry': '合成'}).set_index(
+            'ts_code', drop=False),
+    }
+    return panels, history
+
+
+def market_rows(count, seed=3):
+    """CN_MAKET_BASIC_ALL表的行（timestamp, maket_name, com_count, total_mv, float_mv, amount, pe）"""
+    rng = np.random.default_rng(seed)
+    timestamps = (pd.Timestamp('2000-01-03').value // 10 ** 9 + 86400 * (np.arange(count) // 2)).tolist()
+    markets = np.tile(['SH_MARKET', 'SZ_MARKET'], count // 2 + 1)[:count].tolist()
+    values = rng.uniform(1, 1e6, (count, 5)).tolist()
+    return [(ts, market, *row) for ts, market, row in zip(timestamps, markets, values)]
+
+
+# ---------------------------------------------------------------- 计时与内存
+
+def measure(fn, repeat=3, setup=None):
+    """
+    运行fn计时并记录内存：先repeat次只计时，再在tracemalloc下运行一次记录Python堆（含numpy数组，
+    不含pyarrow、SQLite等原生库自行分配的内存）峰值
+
+    参数:
+    setup (callable): 每次运行前执行（不计入耗时）
+
+    返回:
+    dict: best/mean秒数、峰值内存（MB）
+    """
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        gc.collect()
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            fn()
+        times.append(time.perf_counter() - started)
+    if setup:
+        setup()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'best_s': min(times), 'mean_s': sum(times) / len(times), 'peak_mb': peak / 1024 ** 2}
+
+
+def _peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024 ** 2 if sys.platform == 'darwin' else rss / 1024
+
+
+# ---------------------------------------------------------------- 基准用例
+
+def bench_backtest(params, repeat):
+    """MA20Strategy.backtest：逐日循环与向量化引擎"""
+    from com.example.MaoTai_20_Strategy import MA20Strategy
+
+    bars = random_walk_bars(params['days'])
+    strategy = MA20Strategy(window=20)
+    strategy.data = bars.assign(trade_date=pd.to_datetime(bars['trade_date'])).set_index('trade_date')
+    with contextlib.redirect_stdout(io.StringIO()):
+        strategy.generate_signals()
+    rows = {'rows': len(bars)}
+    return {
+        'backtest.loop': dict(measure(lambda: strategy.backtest(), repeat), **rows),
+        'backtest.vectorized': dict(measure(lambda: strategy.backtest(vectorized=True), repeat), **rows),
+    }
+
+
+def bench_metrics(params, repeat):
+    """calc_maotai_data（读取数据集+绩效指标）以及全市场批量指标、滚动指标"""
+    from com.example import CalcuMaoTai
+    from com.example.tools import DataStore, Metrics
+
+    bars = random_walk_bars(params['days'], symbols=params['symbols'])
+    single = bars[bars['ts_code'] == bars['ts_code'].iloc[0]].assign(ts_code=CalcuMaoTai.TS_Code)
+    DataStore.write_dataset(single, CalcuMaoTai.Dataset, partition_by='ts_code')
+    returns = bars.pivot(index='trade_date', columns='ts_code', values='pct_chg') / 100
+    returns.index = pd.to_datetime(returns.index, format='%Y%m%d')
+    cells = {'rows': returns.shape[0], 'assets': returns.shape[1]}
+    return {
+        'metrics.calc_maotai_data': dict(measure(CalcuMaoTai.calc_maotai_data, repeat), rows=len(single)),
+        'metrics.summarize': dict(measure(lambda: Metrics.summarize(returns), repeat), **cells),
+        'metrics.drawdown_episodes': dict(measure(lambda: Metrics.drawdown_episodes(returns), repeat), **cells),
+        'metrics.rolling': dict(measure(lambda: Metrics.rolling(returns), repeat), **cells),
+    }
+
+
+def _screening_module():
+    # 模块文件名中含有不可见字符，按路径加载
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'QuantitativeMultifactorFiltering​.py')
+    spec = importlib.util.spec_from_file_location('QuantitativeMultifactorFiltering', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def bench_screening(params, repeat):
+    """StockFilter全市场向量化筛选（含估值历史分位）"""
+    qmf = _screening_module()
+    panels, history = screening_panels(params['stocks'])
+
+    class Provider:
+        def get_stock_pool(self):
+            return panels['valuation']['ts_code'].tolist()
+
+        def get_panels(self):
+            return panels
+
+    stock_filter = qmf.StockFilter(Provider())
+    stocks = Provider().get_stock_pool()
+    return {'screening.stock_filter': dict(
+        measure(lambda: stock_filter.filter_stocks_vectorized(stocks, valuation_history=history), repeat),
+        stocks=len(stocks))}
+
+
+def bench_io(params, repeat):
+    """同一份日线数据的Excel、列式数据仓库（Parquet）、SQLite读写"""
+    from com.example.tools import DataStore
+    from com.init import Database, InitTable
+
+    bars = random_walk_bars(params['days'], symbols=params['symbols'])
+    excel = bars.iloc[:params['excel_rows']]
+    Database.configure('bench.db')
+    InitTable.createEmptyTable()
+    rows = {'rows': len(bars)}
+    ts_code = bars['ts_code'].iloc[0]
+    results = {
+        'io.excel_write': dict(measure(lambda: excel.to_excel('bars.xlsx', index=False), repeat), rows=len(excel)),
+        'io.excel_read': dict(measure(lambda: pd.read_excel('bars.xlsx'), repeat), rows=len(excel)),
+        'io.store_write': dict(measure(lambda: DataStore.write_dataset(bars, 'bench_bars', partition_by='ts_code'),
+                                       repeat), **rows),
+        'io.store_read': dict(measure(lambda: DataStore.read_dataset('bench_bars'), repeat), **rows),
+        'io.store_read_symbol': dict(measure(lambda: DataStore.read_dataset('bench_bars', ts_codes=[ts_code]),
+                                             repeat), rows=params['days']),
+        'io.sqlite_upsert': dict(measure(lambda: InitTable.upsert('daily_bar', bars), repeat), **rows),
+        'io.sqlite_read': dict(measure(lambda: Database.get_db().query("SELECT * FROM daily_bar"), repeat), **rows),
+        'io.sqlite_read_symbol': dict(measure(lambda: list(InitTable.iter_symbol(ts_code)), repeat),
+                                      rows=params['days']),
+    }
+    Database.configure()
+    return results
+
+
+def bench_insert(params, repeat):
+    """InitTable.batch_insert写入CN_MAKET_BASIC_ALL"""
+    from com.init import Database, InitTable
+
+    data = market_rows(params['insert_rows'])
+
+    def reset():
+        # 与生产库相同的表结构和索引（索引维护是写入开销的一部分）
+        db = Database.configure('bench_insert.db')
+        db.executescript(f"DROP TABLE IF EXISTS {InitTable.TABLE_NAME};" + InitTable.MAKET_BASIC_SCHEMA)
+
+    result = dict(measure(lambda: InitTable.batch_insert(data), repeat, setup=reset), rows=len(data))
+    Database.configure()
+    return {'insert.batch_insert': result}
+
+
+Suites = {
+    'backtest': bench_backtest,
+    'metrics': bench_metrics,
+    'screening': bench_screening,
+    'io': bench_io,
+    'insert': bench_insert,
+}
+
+
+# ---------------------------------------------------------------- 运行与对比
+
+def _git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run(scale='small', suites=None, repeat=3, output=None, params=None):
+    """
+    运行基准测试，结果写入JSON
+
+    参数:
+    scale (str): Scales中的规模名
+    suites (list): 要运行的用例组，默认全部
+    repeat (int): 每个用例的计时次数
+    output (str): 结果文件路径，默认data/benchmarks/<时间>-<版本>.json
+    params (dict): 覆盖规模参数
+
+    返回:
+    dict: 测试结果（与写入的JSON相同）
+    """
+    params = dict(Scales[scale], **(params or {}))
+    output = os.path.abspath(output) if output else None
+    report = {
+        'revision': _git_revision(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'scale': scale,
+        'params': params,
+        'repeat': repeat,
+        'results': {},
+    }
+    cwd = os.getcwd()
+    # 在临时目录中运行：数据仓库、缓存、数据库等相对路径都落在临时目录，不影响本地数据
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        try:
+            for name in suites or Suites:
+                print(f"运行 {name} ...")
+                for case, result in Suites[name](params, repeat).items():
+                    report['results'][case] = result
+                    print(f"  {case:<28} {result['best_s'] * 1000:>10.1f} ms  峰值 {result['peak_mb']:>8.1f} MB")
+        finally:
+            os.chdir(cwd)
+    report['peak_rss_mb'] = _peak_rss_mb()
+
+    if output is None:
+        output = os.path.join(Output_Dir, f"{datetime.now():%Y%m%d-%H%M%S}-{report['revision'] or 'local'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as file:
+        json.dump(report, file, ensure_ascii=False, indent=2)
+    print(f"结果已写入 {output}")
+    return report
+
+
+def compare(baseline, current, threshold=Regression_Threshold):
+    """
+    对比两次结果（dict或JSON文件路径），按用例列出耗时和峰值内存的变化
+
+    返回:
+    pd.DataFrame: 每个共同用例一行，regression列标记耗时增加超过threshold的用例
+    """
+    reports = []
+    for report in (baseline, current):
+        if isinstance(report, str):
+            with open(report, 'r', encoding='utf-8') as file:
+                report = json.load(file)
+        reports.append(report['results'])
+    cases = [case for case in reports[1] if case in reports[0]]
+    df = pd.DataFrame({
+        'case': cases,
+        'baseline_s': [reports[0][case]['best_s'] for case in cases],
+        'current_s': [reports[1][case]['best_s'] for case in cases],
+        'baseline_mb': [reports[0][case]['peak_mb'] for case in cases],
+        'current_mb': [reports[1][case]['peak_mb'] for case in cases],
+    })
+    df['time_change'] = df['current_s'] / df['baseline_s'] - 1
+    df['regression'] = df['time_change'] > threshold
+    return df
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='回测、指标、选股、读写性能基准测试')
+    parser.add_argument('--scale', choices=list(Scales), default='small', help='合成数据规模')
+    parser.add_argument('--suite', action='append', choices=list(Suites), help='只运行指定用例组（可多次指定）')
+    parser.add_argument('--repeat', type=int, default=3, help='每个用例的计时次数')
+    parser.add_argument('--output', default=None, help='结果JSON路径')
+    parser.add_argument('--compare', default=None, help='与之对比的基线结果JSON')
+    args = parser.parse_args(argv)
+
+    report = run(args.scale, suites=args.suite, repeat=args.repeat, output=args.output)
+    if args.compare:
+        diff = compare(args.compare, report)
+        print(diff.to_string(index=False))
+        if diff['regression'].any():
+            sys.exit(1)
+
+
+# 用法: python -m com.example.Benchmark --scale medium --compare data/benchmarks/baseline.json
+if __name__ == '__main__':
+    main()
@@ -1,19 +1,21 @@
-import tushare as ts
-from com.example import Tusharetoken
-from com.example.tools import Df_To_Excel as dte
-import numpy as np
+from com.example.tools import ApiCache, DataStore, Metrics, PriceAdjust
 import pandas as pd
 
 # Tushare Pro配置（A股数据）
-ts_token = Tusharetoken.get()  # 在tushare.pro官网注册获取
-ts.set_token(ts_token)
-pro = ts.pro_api()
+pro = ApiCache.lazy_client()  # 首次调用接口时才读取token并构建客户端
 
 
-def refresh_maotai_data():
-    df = ts.pro_bar(ts_code='600519.SH', adj='qfq', start_date='20150101', end_date='20250731')
-    dte.save_dataframe_to_excel(df=df,file_path='data/茅台前复权日线',  # 会自动添加.xlsx扩展名
-            sheet_name='茅台前复权日线')
+# 原始（不复权）日线与复权因子分开存储，复权价格在读取时由PriceAdjust计算
+Dataset = 'stock_daily'
+Factor_Dataset = 'adj_factor'
+TS_Code = '600519.SH'
+Start_Date = '20150101'
+
+
+def refresh_maotai_data(end_date=None):
+    """增量追加原始日线和复权因子（已存的历史不再重新下载）"""
+    return PriceAdjust.update_daily([TS_Code], pro.daily, pro.adj_factor, Dataset, Factor_Dataset,
+                                    start_date=Start_Date, end_date=end_date)
 
 
 
@@ -23,43 +25,24 @@ def refresh_maotai_data():
 动态调整：牛市中可容忍稍低夏普（>1.2），熊市中需严守索提诺>1.0的底线。
 '''
 def calc_maotai_data():
-    df = pd.read_excel('data/maotai_daily_20150101.xlsx', sheet_name='茅台前复权日线')  # 指定工作表
-    # 假设df为DataFrame，含日期(date)和日收益率(pct_chg)
-    # df_sorted = df.sort_values(by='列名', ascending=True)
-
-    df = df.head()
-
-    # 日累计回报率
-    df['cumulative_return'] = (1 + df['pct_chg']/100).cumprod()
-    print(df['cumulative_return'])
-
-    # 日累计回报率的最大值
-    df['peak'] = df['cumulative_return'].cummax()
-    print(df['peak'])
-
-    # 日回撤百分比序列
-    df['drawdown'] = 1 - df['cumulative_return'] / df['peak']
-    print(df['drawdown'])
-
-    # 日最大回撤百分比
-    max_drawdown = df['drawdown'].max()
-    print(max_drawdown)
-
-    # 夏普比率
-    sharpe_ratio = ((df['pct_chg']/100).mean() * 252) / ((df['pct_chg']/100).std() * np.sqrt(252))
-    print(sharpe_ratio)
-
-    # 索提诺比率
-    downside_returns = df[df['pct_chg']/100 < 0]['pct_chg']/100
-    print(downside_returns)
-    sortino_ratio = ((df['pct_chg']/100).mean() * 252) / (downside_returns.std() * np.sqrt(252))
-    print(sortino_ratio)
-
-    # 假设df包含净值序列'net_value'
-    drawdown_start = df[df['drawdown'] > 0].index[0]  # 回撤起点
-    drawdown_end = df[df['cumulative_return'] >= df.loc[drawdown_start, 'peak']].index[0]  # 修复终点
-    max_duration = (drawdown_end - drawdown_start).days
-    print(max_duration)
+    df = DataStore.read_dataset(Dataset, columns=['trade_date', 'pct_chg'], ts_codes=[TS_Code])
+    # 日收益率（小数），以日期为索引；pct_chg按除权后的昨收计算，不受复权方式影响
+    returns = pd.Series(df['pct_chg'].to_numpy() / 100,
+                        index=pd.to_datetime(df['trade_date'], format='%Y%m%d'), name=TS_Code)
+
+    metrics = Metrics.summarize(returns).iloc[0]
+    episodes = Metrics.drawdown_episodes(returns)
+    print(metrics)
+    print(episodes.sort_values('depth', ascending=False).head(10))
+
+    # 最大回撤、夏普比率、索提诺比率
+    max_drawdown = metrics['max_drawdown']
+    sharpe_ratio = metrics['sharpe']
+    sortino_ratio = metrics['sortino']
+    downside_returns = returns[returns < 0]
+
+    # 最长回撤持续期（自然日，从前高到修复；未修复的回撤计至最后一日）
+    max_duration = int(metrics['max_drawdown_duration'])
 
     # 自由现金流收益率
 
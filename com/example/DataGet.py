@@ -1,15 +1,13 @@
-import yfinance as yf
-import tushare as ts
 import pandas as pd
-import matplotlib.pyplot as plt
-import schedule
-from pandas_datareader import data as pdr
-from com.example import Tusharetoken
+from com.example.tools import ApiCache, DataProvider, FetchPlanner, MarketIngest, TradingCalendar
 
-# Tushare Pro配置（A股数据）
-ts_token = Tusharetoken.get()  # 在tushare.pro官网注册获取
-ts.set_token(ts_token)
-pro = ts.pro_api()
+# Tushare Pro配置（A股数据），首次调用接口时才读取token并构建客户端
+# matplotlib、schedule较重或为可选依赖，在用到的函数内导入
+pro = ApiCache.lazy_client()
+
+# Yahoo Finance、FRED（美股、美国宏观数据），与Tushare共用同一个keep-alive连接池
+yahoo = DataProvider.get_provider('yahoo')
+fred = DataProvider.get_provider('fred')
 
 # Yahoo Finance配置（美股数据）
 SP500_TICKER = "^GSPC"  # 标普500指数
@@ -45,11 +43,11 @@ def get_buffett_index(market="A"):
 
     elif market == "US":
         # 美股总市值（Wilshire 5000指数）
-        wilshire = yf.Ticker("^W5000")
+        wilshire = yahoo.ticker("^W5000")
         mkt_val = wilshire.fast_info.market_cap  # 单位：美元
 
         # 美国GDP（FRED数据）
-        gdp_us = pdr.get_data_fred("GDP", start="2025-01-01").iloc[-1].values[0] * 1e9  # 单位：美元[2](@ref)
+        gdp_us = fred.series("GDP", start="2025-01-01").iloc[-1].values[0] * 1e9  # 单位：美元[2](@ref)
 
         return (mkt_val / gdp_us) * 100
 
@@ -60,35 +58,23 @@ def calc_equity_bond_yield(market="A"):
         hs300_pe = pro.index_daily(ts_code="000300.SH").iloc[0].pe  # 沪深300PE[4](@ref)
         equity_yield = (1 / hs300_pe) * 100  # 转换为收益率%
 
-        # 中国10年期国债收益率
-        bond_yield_df = pro.yc_cb(**{
-            "ts_code": "1001.CB",
-            "curve_type": 0,
-            "trade_date": "",
-            "start_date": 20250701,
-            "end_date": 20250724,
-            "curve_term": 10,
-            "limit": 100,
-            "offset": ""
-        }, fields=[
-            "trade_date",
-            "ts_code",
-            "curve_name",
-            "curve_type",
-            "curve_term",
-            "yield"
-        ])  # 国债代码示例
+        # 中国10年期国债到期收益率：取近一个月的曲线（一次请求），用最新一个交易日的值
+        end_date = TradingCalendar.today()
+        start_date = TradingCalendar.shift_days(end_date, -30)
+        curve, _ = FetchPlanner.fetch_yield_curve(start_date, end_date, terms=(10,), ts_code="1001.CB",
+                                                  curve_type="0", client=pro)
+        bond_yield = curve['10Y_YTM'].dropna().iloc[-1]
 
         return equity_yield - bond_yield
 
     elif market == "US":
         # 标普500盈利率
-        sp500 = yf.Ticker(SP500_TICKER)
+        sp500 = yahoo.ticker(SP500_TICKER)
         pe_ratio = sp500.info["trailingPE"]
         equity_yield = (1 / pe_ratio) * 100
 
         # 美国10年期国债收益率
-        bond_yield = yf.Ticker(US10Y_TICKER).history(period="1d").Close.iloc[-1]
+        bond_yield = yahoo.history(US10Y_TICKER, period="5d").Close.dropna().iloc[-1]
 
         return equity_yield - bond_yield
 
@@ -96,6 +82,8 @@ def calc_equity_bond_yield(market="A"):
 
 def generate_valuation_report():
     """生成估值报告并绘图"""
+    import matplotlib.pyplot as plt
+
     # 计算关键指标
     buffett_cn = get_buffett_index("A")
     #buffett_us = get_buffett_index("US")
@@ -135,10 +123,23 @@ def generate_valuation_report():
 
 
 def daily_job():
+    # 全市场日线、复权因子、每日指标按交易日截面增量更新（每个接口每天约一次调用）
+    MarketIngest.update()
     report = generate_valuation_report()
     report.savefig(f"reports/{pd.Timestamp.now().strftime('%Y%m%d')}.png")
 
 
+def run_daily(at="18:00"):
+    """每天定时生成估值报告（阻塞运行）"""
+    import time
+    import schedule
+
+    schedule.every().day.at(at).do(daily_job)
+    while True:
+        schedule.run_pending()
+        time.sleep(30)
+
+
 if __name__ == '__main__':
     #data = pro.stock_basic(exchange='', list_status='L', fields='ts_code,symbol,name,area,industry,list_date')
     #data.head()
@@ -146,4 +147,4 @@ if __name__ == '__main__':
     # 生成报告
     report = generate_valuation_report()
     report.show()
-    #schedule.every().day.at("18:00").do(daily_job)
+    #run_daily("18:00")
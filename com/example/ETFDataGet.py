@@ -1,81 +1,82 @@
-from com.example import Tusharetoken
-import tushare as ts
+from com.example.tools import ApiCache, Metrics, PriceAdjust
 import pandas as pd
-from datetime import datetime
-
-
-TOKEN = Tusharetoken.get()
-ts.set_token(TOKEN)
-pro = ts.pro_api()
-
-
-def get_etf_data():
-    # 定义参数
-    etf_list = ['513530.SH', '159545.SZ']
-    start_date = '20200101'
-    end_date = '20250731'
-    output_file = 'data/etf_history_adj.xlsx'
-
-    # 创建Excel写入器
-    with pd.ExcelWriter(output_file, engine='xlsxwriter') as writer:
-        for ts_code in etf_list:
-            try:
-                print(f"正在处理 {ts_code} 数据...")
-
-                # 获取日线数据
-                daily_df = pro.fund_daily(
-                    ts_code=ts_code,
-                    start_date=start_date,
-                    end_date=end_date,
-                    fields='ts_code,trade_date,open,high,low,close,vol,amount'
-                )
-
-                # 数据清洗
-                daily_df['trade_date'] = pd.to_datetime(daily_df['trade_date'])
-                daily_df = daily_df.sort_values('trade_date')
-
-                # 获取复权因子
-                adj_df = pro.fund_adj(
-                    ts_code=ts_code,
-                    start_date=start_date,
-                    end_date=end_date
-                )
-
-                # 数据清洗
-                adj_df['trade_date'] = pd.to_datetime(adj_df['trade_date'])
-                adj_df = adj_df.sort_values('trade_date')
-
-                # 合并数据
-                merged_df = pd.merge(
-                    daily_df[['trade_date', 'open', 'high', 'low', 'close', 'vol', 'amount']],
-                    adj_df[['trade_date', 'adj_factor']],
-                    on='trade_date',
-                    how='left'
-                )
-
-                # 前复权计算（以end_date为基准）
-                base_date = datetime.strptime(end_date, '%Y%m%d')
-                base_adj = merged_df[merged_df['trade_date'] == base_date]['adj_factor'].values[0]
-
-                # 计算复权价格
-                price_cols = ['open', 'high', 'low', 'close']
-                for col in price_cols:
-                    merged_df[col] = merged_df[col] * (merged_df['adj_factor'] / base_adj)
-
-                # 保留两位小数
-                merged_df[price_cols] = merged_df[price_cols].round(2)
-                merged_df['vol'] = merged_df['vol'].astype(int)
-                merged_df['amount'] = merged_df['amount'].astype(int)
-
-                # 保存到Excel
-                sheet_name = ts_code.split('.')[0]  # 提取代码前缀作为sheet名
-                merged_df.to_excel(writer, sheet_name=sheet_name, index=False)
-
-                print(f"{ts_code} 数据处理完成，共 {len(merged_df)} 条记录")
-
-            except Exception as e:
-                print(f"处理 {ts_code} 时发生错误: {str(e)}")
-                continue
+
+
+pro = ApiCache.lazy_client()  # 首次调用接口时才读取token并构建客户端
+
+
+# 原始（不复权）日线与复权因子分开存储，复权价格在读取时计算
+Dataset = 'etf_daily'
+Factor_Dataset = 'etf_adj_factor'
+ETF_List = ['513530.SH', '159545.SZ']
+Start_Date = '20200101'
+
+
+def get_etf_data(etf_list=ETF_List, start_date=Start_Date, end_date=None, dataset=Dataset,
+                 factor_dataset=Factor_Dataset, export_path=None):
+    """
+    增量获取ETF原始日线和复权因子并写入列式数据仓库（按ts_code分区），每日更新只追加新行
+
+    参数:
+    etf_list (list): ETF代码
+    start_date (str): 数据集中没有该代码时的起始日期
+    end_date (str): 结束日期，默认今天
+    dataset (str): 原始日线数据集名称
+    factor_dataset (str): 复权因子数据集名称
+    export_path (str): 需要同时导出前复权Excel（以end_date为基准，每个代码一个工作表）时指定文件路径，默认不导出
+    """
+    added = PriceAdjust.update_daily(etf_list, pro.fund_daily, pro.fund_adj, dataset, factor_dataset,
+                                     start_date=start_date, end_date=end_date,
+                                     fields='ts_code,trade_date,open,high,low,close,pre_close,vol,amount')
+    for ts_code, (rows, factors) in added.items():
+        print(f"{ts_code} 数据处理完成，新增 {rows} 条日线、{factors} 条复权因子")
+
+    if export_path:
+        df = read_etf_data(etf_list, adj='qfq', base_date=end_date, start_date=start_date, end_date=end_date,
+                           dataset=dataset, factor_dataset=factor_dataset)
+        price_cols = ['open', 'high', 'low', 'close', 'pre_close']
+        df[price_cols] = df[price_cols].round(3)
+        with pd.ExcelWriter(export_path) as writer:
+            for ts_code, group in df.groupby('ts_code', sort=True):
+                group.to_excel(writer, sheet_name=ts_code.split('.')[0], index=False)
+    return added
+
+
+def read_etf_data(ts_codes=None, adj='qfq', base_date=None, start_date=None, end_date=None, dataset=Dataset,
+                  factor_dataset=Factor_Dataset, columns=None):
+    """
+    读取ETF日线并在读取时复权
+
+    参数:
+    adj (str): 'qfq'（前复权，基准日默认各代码最新的因子）、'hfq'（后复权）或None（不复权）
+    base_date (str): 前复权基准日，非交易日时取之前最近的交易日
+
+    返回:
+    pd.DataFrame: 复权后的日线
+    """
+    return PriceAdjust.read_adjusted(dataset, factor_dataset, adj=adj, base_date=base_date, ts_codes=ts_codes,
+                                     start_date=start_date, end_date=end_date, columns=columns)
+
+
+def rolling_risk(ts_codes=None, dataset=Dataset, factor_dataset=Factor_Dataset, windows=Metrics.Rolling_Windows):
+    """
+    从数据仓库读取ETF后复权收盘价，计算全部ETF的滚动风险指标
+
+    参数:
+    ts_codes (list): ETF代码，默认数据集中的全部代码
+    dataset (str): 原始日线数据集名称
+    factor_dataset (str): 复权因子数据集名称
+    windows (tuple): 滚动窗口
+
+    返回:
+    dict: {窗口: DataFrame}，格式同Metrics.rolling
+    """
+    df = read_etf_data(ts_codes, adj='hfq', columns=['ts_code', 'trade_date', 'close'], dataset=dataset,
+                       factor_dataset=factor_dataset)
+    close = df.pivot(index='trade_date', columns='ts_code', values='close').sort_index()
+    close.index = pd.to_datetime(close.index)
+    return Metrics.rolling(close.pct_change(fill_method=None).iloc[1:], windows=windows)
+
 
 if __name__ == "__main__":
     # 创建输出目录
@@ -83,5 +84,5 @@ if __name__ == "__main__":
 
     os.makedirs('data', exist_ok=True)
 
-    get_etf_data()
-    print("所有数据处理完成，文件已保存至 data/etf_history_adj.xlsx")
+    get_etf_data(end_date='20250731', export_path='data/etf_history_adj.xlsx')
+    print(f"所有数据处理完成，已保存至数据集 {Dataset}/{Factor_Dataset}，并导出 data/etf_history_adj.xlsx")
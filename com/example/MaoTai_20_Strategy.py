@@ -1,83 +1,175 @@
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
 from datetime import datetime
 import os
+from com.example.tools import DataStore, Metrics, PanelCache, PriceAdjust
+
+
+def vectorized_backtest(close, position, initial_capital=1000000.0, slippage=0.0002, commision_rate=0.001,
+                        bottom_cash=1000):
+    """
+    向量化回测引擎，交易规则与MA20Strategy.backtest的逐日循环完全一致
+
+    全仓买入、清仓卖出，因此只有买卖信号点会改变资金和持仓：
+    先用掩码定位信号点，只在信号点上按顺序结算（次数远小于K线数），
+    再把每个信号点之后的资金、持仓向前填充到全部K线，最后整列计算总资产。
+
+    参数:
+    close (array-like): 收盘价序列
+    position (array-like): 信号差分序列，2为买入，-2为卖出
+    initial_capital (float): 初始资金
+    slippage (float): 滑点比例
+    commision_rate (float): 手续费率（最低5元）
+    bottom_cash (float): 买入前需保留的最低资金
+
+    返回:
+    tuple: (cash, shares, total_assets) 三个与close等长的numpy数组
+    """
+    close = np.asarray(close, dtype=np.float64)
+    position = np.asarray(position, dtype=np.float64)
+
+    # 定位全部买卖信号点
+    event_idx = np.flatnonzero((position == 2) | (position == -2))
+    is_buy = (position[event_idx] == 2).tolist()
+    buy_prices = (close[event_idx] * (1 + slippage)).tolist()
+    sell_prices = (close[event_idx] * (1 - slippage)).tolist()
+
+    # 第0项为初始状态，第k+1项为第k个信号点结算后的状态
+    event_cash = np.empty(len(event_idx) + 1, dtype=np.float64)
+    event_shares = np.empty(len(event_idx) + 1, dtype=np.int64)
+    current_cash = float(initial_capital)
+    current_shares = 0
+    event_cash[0] = current_cash
+    event_shares[0] = current_shares
+
+    for k in range(len(event_idx)):
+        if is_buy[k]:
+            if current_cash - bottom_cash > 0:
+                trade_price = buy_prices[k]
+                # 整手买卖，1手=100股
+                max_shares = (current_cash // (trade_price * 100)) * 100
+                if max_shares > 0:
+                    trade_amount = max_shares * trade_price
+                    commission = max(trade_amount * commision_rate, 5)
+                    total_cost = trade_amount + commission
+                    if current_cash >= total_cost:
+                        current_shares += int(max_shares)
+                        current_cash -= total_cost
+        elif current_shares > 0:
+            trade_amount = current_shares * sell_prices[k]
+            commission = max(trade_amount * commision_rate, 5)
+            current_cash += trade_amount - commission
+            current_shares = 0
+        event_cash[k + 1] = current_cash
+        event_shares[k + 1] = current_shares
 
-# 设置中文显示
-plt.rcParams["font.family"] = ["Arial Unicode MS","STHeiti","DejaVu Sans"]
-plt.rcParams["axes.unicode_minus"] = False  # 解决负号显示问题
+    # 每根K线对应其之前（含当日）最近一个信号点的状态
+    owner = np.searchsorted(event_idx, np.arange(len(close)), side='right')
+    cash = event_cash[owner]
+    shares = event_shares[owner]
+    total_assets = cash + shares * close
+    return cash, shares, total_assets
 
 
 class MA20Strategy:
-    def __init__(self, data_path=None,window=20):
+    def __init__(self, data_path=None,window=20, ts_code=None, dataset='stock_daily', factor_dataset='adj_factor',
+                 adj='qfq'):
         """初始化策略"""
         self.data = None  # 存储股票数据
         self.results = None  # 存储回测结果
         self.data_path = data_path
+        self.ts_code = ts_code  # 指定代码时从列式数据仓库读取原始日线，按adj复权
+        self.dataset = dataset
+        self.factor_dataset = factor_dataset
+        self.adj = adj
+        self.window = window
         self.MA_Day = f"MA{window}"
 
+    @staticmethod
+    def _read_file(path):
+        """解析Excel/CSV行情文件"""
+        # 根据文件扩展名选择合适的读取方法
+        if path.endswith(('.xlsx', '.xls')):
+            # 读取Excel文件，尝试不同的引擎处理可能的格式问题
+            try:
+                return pd.read_excel(
+                    path,
+                    parse_dates=['trade_date'],  # 尝试自动解析日期
+#                    engine='openpyxl'  # 用于处理.xlsx文件
+                )
+            except:
+                # 备用引擎
+                return pd.read_excel(
+                    path,
+                    parse_dates=['trade_date'],
+#                    engine='xlrd'  # 用于处理旧版.xls文件
+                )
+
+        # 读取CSV文件，尝试不同编码
+        encodings = ['utf-8', 'gbk', 'gb2312', 'utf-16']
+        for encoding in encodings:
+            try:
+                return pd.read_csv(
+                    path,
+                    parse_dates=['trade_date'],
+                    encoding=encoding
+                )
+            except UnicodeDecodeError:
+                continue
+        raise UnicodeDecodeError("无法解析文件编码，请检查文件格式")
+
     # 修改load_data方法以支持Excel文件和特殊日期格式
-    def load_data(self, data_path=None):
-        """加载股票数据，支持Excel文件和20150101格式日期"""
+    def load_data(self, data_path=None, ts_code=None, start_date=None, end_date=None, use_cache=True):
+        """
+        加载股票数据，优先从列式数据仓库按代码读取（原始日线与复权因子，默认前复权），
+        也支持Excel/CSV文件和20150101格式日期
+
+        use_cache为True时经由内存映射的面板缓存读取（只含数值列），源数据变化后才重新解析
+        """
         try:
             # 如果提供了新的路径则使用新路径，否则使用初始化时的路径
             path = data_path if data_path else self.data_path
+            ts_code = ts_code if ts_code else self.ts_code
 
-            if not path or not os.path.exists(path):
+            if ts_code and not data_path:
+                panel = PriceAdjust.load_panel(self.dataset, self.factor_dataset, adj=self.adj) if use_cache else None
+                if panel is not None and ts_code in panel.symbols:
+                    self.data = panel.frame(ts_code, start_date=DataStore.normalize_date(start_date),
+                                            end_date=DataStore.normalize_date(end_date))
+                else:
+                    # 从数据仓库读取，只扫描该代码的分区和日期范围
+                    self.data = PriceAdjust.read_adjusted(self.dataset, self.factor_dataset, adj=self.adj,
+                                                          ts_codes=[ts_code], start_date=start_date,
+                                                          end_date=end_date)
+                if self.data.empty:
+                    raise ValueError(f"数据集 {self.dataset} 中没有 {ts_code} 的数据")
+            elif not path or not os.path.exists(path):
                 raise FileNotFoundError("数据文件不存在")
-
-            # 根据文件扩展名选择合适的读取方法
-            if path.endswith(('.xlsx', '.xls')):
-                # 读取Excel文件，尝试不同的引擎处理可能的格式问题
-                try:
-                    self.data = pd.read_excel(
-                        path,
-                        parse_dates=['trade_date'],  # 尝试自动解析日期
-#                        engine='openpyxl'  # 用于处理.xlsx文件
-                    )
-                except:
-                    # 备用引擎
-                    self.data = pd.read_excel(
-                        path,
-                        parse_dates=['trade_date'],
-#                        engine='xlrd'  # 用于处理旧版.xls文件
-                    )
+            elif use_cache:
+                self.data = PanelCache.load_file(path, read=self._read_file).frame()
             else:
-                # 读取CSV文件，尝试不同编码
-                encodings = ['utf-8', 'gbk', 'gb2312', 'utf-16']
-                for encoding in encodings:
-                    try:
-                        self.data = pd.read_csv(
-                            path,
-                            parse_dates=['trade_date'],
-                            encoding=encoding
-                        )
-                        break
-                    except UnicodeDecodeError:
-                        continue
-                else:
-                    raise UnicodeDecodeError("无法解析文件编码，请检查文件格式")
-
-            # 处理20150101格式的日期（整数或字符串）
-            if not pd.api.types.is_datetime64_any_dtype(self.data['trade_date']):
-                # 尝试将日期列转换为字符串，再转换为 datetime
-                self.data['trade_date'] = pd.to_datetime(
-                    self.data['trade_date'].astype(str),
-                    format='%Y%m%d',
-                    errors='coerce'
-                )
+                self.data = self._read_file(path)
+
+            if 'trade_date' in self.data.columns:
+                # 处理20150101格式的日期（整数或字符串）
+                if not pd.api.types.is_datetime64_any_dtype(self.data['trade_date']):
+                    # 尝试将日期列转换为字符串，再转换为 datetime
+                    self.data['trade_date'] = pd.to_datetime(
+                        self.data['trade_date'].astype(str),
+                        format='%Y%m%d',
+                        errors='coerce'
+                    )
 
-                # 检查是否有无法转换的日期
-                invalid_dates = self.data['trade_date'].isna().sum()
-                if invalid_dates > 0:
-                    print(f"警告：有 {invalid_dates} 个日期格式无效，已转换为NaT")
-                    # 移除无效日期的行
-                    self.data = self.data.dropna(subset=['trade_date'])
+                    # 检查是否有无法转换的日期
+                    invalid_dates = self.data['trade_date'].isna().sum()
+                    if invalid_dates > 0:
+                        print(f"警告：有 {invalid_dates} 个日期格式无效，已转换为NaT")
+                        # 移除无效日期的行
+                        self.data = self.data.dropna(subset=['trade_date'])
 
-            # 将日期设为索引并排序
-            self.data = self.data.set_index('trade_date').sort_index()
+                # 将日期设为索引并排序
+                self.data = self.data.set_index('trade_date')
+            self.data = self.data.sort_index()
 
             print(f"数据加载成功，共 {len(self.data)} 条记录")
             print(f"数据时间范围: {self.data.index[0].date()} 至 {self.data.index[-1].date()}")
@@ -96,7 +188,7 @@ class MA20Strategy:
         try:
             # 计算20日均线
             ma_day = self.MA_Day
-            self.data[ma_day] = self.data['close'].rolling(ma_day).mean()
+            self.data[ma_day] = self.data['close'].rolling(self.window).mean()
 
             # 生成信号：价格上穿window日均线时买入(1)，下穿时卖出(-1)，无信号(0)
             self.data['signal'] = 0
@@ -117,8 +209,14 @@ class MA20Strategy:
             print(f"生成信号失败: {str(e)}")
             return False
 
-    def backtest(self, initial_capital=1000000.0, slippage=0.0002, commision_rate=0.001, bottom_cash=1000):
-        """回测策略"""
+    def backtest(self, initial_capital=1000000.0, slippage=0.0002, commision_rate=0.001, bottom_cash=1000,
+                 vectorized=False):
+        """
+        回测策略
+
+        参数:
+        vectorized (bool): True时使用NumPy向量化引擎（结果与逐日循环一致，不逐笔打印交易），默认False
+        """
         if self.data is None or 'position' not in self.data.columns:
             print("请先加载数据并生成交易信号")
             return False
@@ -127,6 +225,23 @@ class MA20Strategy:
             # 复制数据用于回测计算
             backtest_data = self.data.copy()
 
+            if vectorized:
+                cash, shares, total_assets = vectorized_backtest(
+                    backtest_data['close'].to_numpy(),
+                    backtest_data['position'].to_numpy(),
+                    initial_capital=initial_capital,
+                    slippage=slippage,
+                    commision_rate=commision_rate,
+                    bottom_cash=bottom_cash
+                )
+                backtest_data['cash'] = cash
+                backtest_data['shares'] = shares
+                backtest_data['total_assets'] = total_assets
+
+                self.results = backtest_data
+                print("回测完成")
+                return True
+
             # 初始化资金和持仓
             backtest_data['cash'] = float(initial_capital)
             backtest_data['shares'] = 0  # 持有股份数量
@@ -209,20 +324,9 @@ class MA20Strategy:
         buy_hold_return = (self.results['close'].iloc[-1] - self.results['close'].iloc[0]) / self.results['close'].iloc[
             0] * 100
 
-        # 日累计回报率
-        df = self.results
-        df['cumulative_return'] = (1 + df['total_assets'] / 100).cumprod()
-        # 日累计回报率的最大值
-        df['peak'] = df['cumulative_return'].cummax()
-        # 日回撤百分比序列
-        df['drawdown'] = 1 - df['cumulative_return'] / df['peak']
-
-        # 夏普比率
-        sharpe_ratio = ((df['total_assets'] / 100).mean() * 252) / ((df['total_assets'] / 100).std() * np.sqrt(252))
-
-        # # 索提诺比率
-        # downside_returns = df[df['total_assets'] / 100 < 0]['total_assets'] / 100
-        # sortino_ratio = ((df['total_assets'] / 100).mean() * 252) / (downside_returns.std() * np.sqrt(252))
+        # 风险收益指标（基于每日资产收益率）
+        daily_return = self.results['total_assets'].pct_change().dropna()
+        metrics = Metrics.summarize(daily_return).iloc[0]
 
         # 统计交易次数
         # 使用pandas的sum()方法，确保在Series上操作
@@ -242,8 +346,31 @@ class MA20Strategy:
         print(f"年化收益率: {annual_return:.2f}%")
         print(f"买入持有策略收益率: {buy_hold_return:.2f}%")
         print(f"总交易次数: {total_trades} 次 (买入: {buy_signals} 次, 卖出: {sell_signals} 次)\n")
-        print(f"夏普比率: {sharpe_ratio:.2f}%")
-        # print(f"索提诺比率: {sortino_ratio:.2f}%")
+        print(f"夏普比率: {metrics['sharpe']:.2f}")
+        print(f"索提诺比率: {metrics['sortino']:.2f}")
+        print(f"卡玛比率: {metrics['calmar']:.2f}")
+        print(f"最大回撤: {metrics['max_drawdown'] * 100:.2f}%")
+        print(f"最长回撤持续期: {int(metrics['max_drawdown_duration'])} 天")
+
+        rolling = self.rolling_metrics()
+        for window, frame in rolling.items():
+            latest = frame.iloc[-1]
+            if latest.notna().any():
+                print(f"近{window}日: 夏普 {latest['sharpe'].iloc[0]:.2f}，"
+                      f"波动率 {latest['volatility'].iloc[0] * 100:.2f}%，最大回撤 {latest['max_drawdown'].iloc[0] * 100:.2f}%")
+
+    def rolling_metrics(self, windows=Metrics.Rolling_Windows):
+        """
+        策略每日资产收益的滚动风险指标
+
+        返回:
+        dict: {窗口: DataFrame}，格式同Metrics.rolling
+        """
+        if self.results is None:
+            print("请先进行回测")
+            return {}
+        daily_return = self.results['total_assets'].pct_change().iloc[1:].rename(self.ts_code or 'strategy')
+        return Metrics.rolling(daily_return, windows=windows)
 
     def plot_results(self):
         """可视化策略结果"""
@@ -251,6 +378,14 @@ class MA20Strategy:
             print("请先进行回测")
             return
 
+        # matplotlib只在绘图时导入，回测、参数扫描等纯计算不承担其导入开销
+        import matplotlib.pyplot as plt
+        import matplotlib.dates as mdates
+
+        # 设置中文显示
+        plt.rcParams["font.family"] = ["Arial Unicode MS","STHeiti","DejaVu Sans"]
+        plt.rcParams["axes.unicode_minus"] = False  # 解决负号显示问题
+
         fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(16, 12), sharex=True)
 
         # 第一个子图：价格和均线
@@ -332,8 +467,8 @@ if __name__ == "__main__":
         # 加载模拟数据
         strategy.load_data('data/maotai_sample_data.csv')
     else:
-        # 加载真实数据（请替换为你的数据路径）
-        strategy.load_data('data/maotai_daily_20150101.xlsx')
+        # 从数据仓库加载前复权数据（首次使用可运行 CalcuMaoTai.refresh_maotai_data() 拉取原始日线和复权因子）
+        strategy.load_data(ts_code='600519.SH')
 
     # 生成交易信号
     strategy.generate_signals()
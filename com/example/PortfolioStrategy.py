@@ -0,0 +1,191 @@
+import numpy as np
+import pandas as pd
+
+from com.example.MaoTai_20_Strategy import MA20Strategy
+from com.example.tools import Metrics, PriceAdjust
+
+
+class MA20Portfolio:
+    """
+    多标的均线组合回测
+
+    对每个标的使用与MA20Strategy相同的均线交叉规则，所有标的对齐到统一交易日历后，
+    以 日期×标的 的二维矩阵一次性完成信号、权重和净值计算。
+    组合按目标权重在收盘时调仓，手续费和滑点按换手金额比例扣除（不模拟整手与最低5元佣金）。
+    """
+
+    def __init__(self, window=20, sizing='equal', max_weight=None):
+        """
+        初始化组合策略
+
+        参数:
+        window (int): 均线窗口
+        sizing (str): 仓位分配规则，'equal'为持仓标的等权
+        max_weight (float): 单一标的权重上限（如0.1），超出部分保留为现金，默认不限制
+        """
+        if sizing not in ('equal',):
+            raise ValueError(f"不支持的仓位分配规则: {sizing}")
+        self.window = window
+        self.sizing = sizing
+        self.max_weight = max_weight
+        self.close = None  # 收盘价矩阵（日期×标的，停牌日沿用前收盘价）
+        self.holding = None  # 持仓状态矩阵（1为持有，0为空仓）
+        self.weights = None  # 目标权重矩阵
+        self.results = None  # 组合回测结果
+
+    def load_data(self, prices):
+        """
+        加载多个标的的行情数据并对齐交易日历
+
+        参数:
+        prices: 以下任一形式
+            dict: {ts_code: 文件路径 / 以trade_date为索引或列的DataFrame / 以日期为索引的收盘价Series}
+            pd.DataFrame: 以日期为索引、标的为列的收盘价矩阵
+
+        返回:
+        bool: 加载成功返回True，失败返回False
+        """
+        try:
+            if isinstance(prices, pd.DataFrame):
+                close = prices.copy()
+            else:
+                close = pd.concat({ts_code: self._to_close_series(value) for ts_code, value in prices.items()},
+                                  axis=1)
+
+            close.index = pd.to_datetime(close.index)
+            # 以全部标的交易日的并集作为统一日历，停牌日沿用前收盘价
+            close = close.sort_index().ffill().astype(np.float64)
+            if close.empty:
+                raise ValueError("没有可用的行情数据")
+
+            self.close = close
+            print(f"组合数据加载成功，共 {close.shape[1]} 个标的，{close.shape[0]} 个交易日")
+            return True
+
+        except Exception as e:
+            print(f"组合数据加载失败: {str(e)}")
+            return False
+
+    @staticmethod
+    def _to_close_series(value):
+        """将单个标的的数据统一转换为以日期为索引的收盘价序列"""
+        if isinstance(value, pd.Series):
+            return value
+        if isinstance(value, str):
+            strategy = MA20Strategy(data_path=value)
+            if not strategy.load_data():
+                raise ValueError(f"{value} 加载失败")
+            return strategy.data['close']
+
+        df = value
+        if 'trade_date' in df.columns:
+            df = df.set_index(pd.to_datetime(df['trade_date'].astype(str), format='%Y%m%d', errors='coerce'))
+        return df['close'].sort_index()
+
+    def generate_signals(self):
+        """对全部标的同时生成交易信号和持仓状态"""
+        if self.close is None:
+            print("请先加载数据")
+            return False
+
+        try:
+            ma = self.close.rolling(self.window).mean()
+            signal = np.where(self.close > ma, 1, np.where(self.close < ma, -1, 0))
+            position = np.diff(signal, axis=0, prepend=signal[:1])
+
+            # 上穿买入后持有，下穿卖出后空仓，其余交易日沿用前一状态
+            state = np.where(position == 2, 1.0, np.where(position == -2, 0.0, np.nan))
+            self.holding = pd.DataFrame(state, index=self.close.index, columns=self.close.columns).ffill().fillna(0)
+
+            print("组合交易信号生成成功")
+            return True
+
+        except Exception as e:
+            print(f"生成组合信号失败: {str(e)}")
+            return False
+
+    def _target_weights(self):
+        """根据持仓状态和仓位规则计算目标权重"""
+        holding = self.holding.to_numpy()
+        count = holding.sum(axis=1, keepdims=True)
+        weights = np.divide(holding, count, out=np.zeros_like(holding), where=count > 0)
+        if self.max_weight is not None:
+            weights = np.minimum(weights, self.max_weight)
+        return weights
+
+    def backtest(self, initial_capital=1000000.0, slippage=0.0002, commision_rate=0.001):
+        """组合回测：收盘时调仓到目标权重，下一交易日起按持仓权重获得收益"""
+        if self.holding is None:
+            print("请先加载数据并生成交易信号")
+            return False
+
+        try:
+            weights = self._target_weights()
+            returns = self.close.pct_change().fillna(0).to_numpy()
+
+            # 前一日目标权重在当日收益下的漂移后权重
+            prev_weights = np.vstack([np.zeros((1, weights.shape[1])), weights[:-1]])
+            gross_return = (prev_weights * returns).sum(axis=1)
+            drifted = prev_weights * (1 + returns) / (1 + gross_return)[:, None]
+
+            # 调仓换手按比例扣除手续费和滑点
+            turnover = np.abs(weights - drifted).sum(axis=1)
+            net_growth = (1 + gross_return) * (1 - turnover * (commision_rate + slippage))
+            total_assets = initial_capital * np.cumprod(net_growth)
+
+            self.weights = pd.DataFrame(weights, index=self.close.index, columns=self.close.columns)
+            self.results = pd.DataFrame({
+                'total_assets': total_assets,
+                'daily_return': net_growth - 1,
+                'turnover': turnover,
+                'cash_weight': 1 - weights.sum(axis=1),
+                'holdings': self.holding.sum(axis=1).astype(int).to_numpy(),
+            }, index=self.close.index)
+
+            print("组合回测完成")
+            return True
+
+        except Exception as e:
+            print(f"组合回测失败: {str(e)}")
+            return False
+
+    def analyze_results(self):
+        """分析组合回测结果"""
+        if self.results is None:
+            print("请先进行回测")
+            return
+
+        initial_assets = self.results['total_assets'].iloc[0]
+        final_assets = self.results['total_assets'].iloc[-1]
+        total_return = (final_assets - initial_assets) / initial_assets * 100
+
+        start_date = self.results.index[0].date()
+        end_date = self.results.index[-1].date()
+        years_held = (end_date - start_date).days / 365.25
+        annual_return = ((1 + total_return / 100) ** (1 / years_held) - 1) * 100 if years_held > 0 else 0
+
+        metrics = Metrics.summarize(self.results['daily_return'].iloc[1:]).iloc[0]
+
+        print("\n===== 组合表现分析 =====")
+        print(f"回测时间段: {start_date} 至 {end_date}")
+        print(f"标的数量: {self.close.shape[1]}")
+        print(f"初始资金: {initial_assets:.2f} 元")
+        print(f"最终资产: {final_assets:.2f} 元")
+        print(f"总收益率: {total_return:.2f}%")
+        print(f"年化收益率: {annual_return:.2f}%")
+        print(f"平均持仓数: {self.results['holdings'].mean():.1f}")
+        print(f"年均换手率: {self.results['turnover'].mean() * 252:.2f}")
+        print(f"夏普比率: {metrics['sharpe']:.2f}")
+        print(f"索提诺比率: {metrics['sortino']:.2f}")
+        print(f"最大回撤: {metrics['max_drawdown'] * 100:.2f}%\n")
+
+
+# 示例用法
+if __name__ == "__main__":
+    portfolio = MA20Portfolio(window=20, max_weight=0.2)
+    etf_daily = PriceAdjust.read_adjusted('etf_daily', 'etf_adj_factor', adj='qfq',
+                                          columns=['ts_code', 'trade_date', 'close'])
+    portfolio.load_data(dict(tuple(etf_daily.groupby('ts_code'))))
+    portfolio.generate_signals()
+    portfolio.backtest()
+    portfolio.analyze_results()
@@ -1,9 +1,10 @@
-import tushare as ts
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
-from com.example import Tusharetoken
+from datetime import datetime
+from com.example.tools import ApiCache, DataStore, FetchScheduler, Fundamentals, MarketIngest, TradingCalendar
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import os
+import threading
 
 
 # 配置项
@@ -36,16 +37,22 @@ class Config:
     # 日期设置
     # 当前日期 = datetime.now().strftime('%Y%m%d')
     当前日期 = '20250731'
-    开始日期 = (datetime.now() - timedelta(days=5 * 366)).strftime('%Y%m%d')  # 5年前
-    三年前日期 = (datetime.now() - timedelta(days=3 * 366)).strftime('%Y%m%d')  # 3年前
+    # 以当前日期为基准推算，保证同一筛选日期的请求参数不变，可命中本地缓存
+    开始日期 = TradingCalendar.shift_days(当前日期, -5 * 366)  # 5年前
+    三年前日期 = TradingCalendar.shift_days(当前日期, -3 * 366)  # 3年前
 
 
 class TushareData:
-    def __init__(self, token):
-        """初始化Tushare接口"""
-        ts.set_token(token)
-        self.pro = ts.pro_api()
+    def __init__(self, token=None, scheduler=None):
+        """初始化Tushare接口（token默认读取配置文件，与其他模块共享同一个pro_api客户端；指定其他token时使用该token的客户端）"""
         self.a500_stocks = None
+        # 所有接口调用先查本地缓存，未命中时经由调度器限流，可在多线程中并发调用
+        self.scheduler = scheduler or FetchScheduler.get_scheduler()
+        self.pro = ApiCache.cached_client(ApiCache.pro_api(token), scheduler=self.scheduler)
+
+    def _call(self, api_name, **kwargs):
+        """调用Tushare接口（带缓存和频率限制）"""
+        return self.pro.query(api_name, **kwargs)
 
     def get_a500_stocks(self):
         """获取A500指数成分股列表"""
@@ -53,37 +60,45 @@ class TushareData:
             # 注意：Tushare可能没有直接的A500成分股接口，这里使用中证500作为替代
             # TODO 粗选股票池待确定
             # 实际应用中可能需要从其他渠道获取A500成分股列表
-            index_stocks = self.pro.index_weight(index_code='000905.SH', trade_date=Config.当前日期)
+            index_stocks = self._call('index_weight', index_code='000905.SH', trade_date=Config.当前日期)
             self.a500_stocks = index_stocks['con_code'].tolist()
         return self.a500_stocks
 
+    def get_stock_pool(self):
+        """获取待筛选的股票池（默认为A500成分股）"""
+        return self.get_a500_stocks()
+
     def get_latest_financial_data(self, ts_code):
-        """获取最新财务指标数据"""
+        """获取当前日期时已经公布的财务数据（按实际公告日取时点版本，不使用之后才公布或更正的数据）"""
         try:
             # 获取最新的财务指标
-            tmp_fina_indicator = self.pro.query('fina_indicator', ts_code=ts_code,
+            tmp_fina_indicator = self._call('fina_indicator', ts_code=ts_code,
                                             start_date=Config.开始日期, end_date=Config.当前日期)
-            fina_indicator = self._filter_last_day_of_year(tmp_fina_indicator)
+            fina_indicator = self._filter_last_day_of_year(
+                Fundamentals.point_in_time(tmp_fina_indicator, Config.当前日期))
 
 
             # 获取利润表数据
-            income = self.pro.income(ts_code=ts_code, start_date=Config.开始日期,
-                                     end_date=Config.当前日期,
-                                     fields='ts_code,end_date,report_type,basic_eps,gross_profit_rate,net_profit_rate')
+            income = self._call('income', ts_code=ts_code, start_date=Config.开始日期,
+                                end_date=Config.当前日期,
+                                fields='ts_code,ann_date,f_ann_date,end_date,report_type,basic_eps,gross_profit_rate,net_profit_rate')
+            income = Fundamentals.point_in_time(income, Config.当前日期)
 
             # 获取资产负债表数据
-            balancesheet = self.pro.balancesheet(ts_code=ts_code, start_date=Config.开始日期,
-                                                 end_date=Config.当前日期,
-                                                 fields='ts_code,end_date,report_type,debt_to_asset,current_ratio,quick_ratio')
+            balancesheet = self._call('balancesheet', ts_code=ts_code, start_date=Config.开始日期,
+                                      end_date=Config.当前日期,
+                                      fields='ts_code,ann_date,f_ann_date,end_date,report_type,debt_to_asset,current_ratio,quick_ratio')
+            balancesheet = Fundamentals.point_in_time(balancesheet, Config.当前日期)
 
             # 获取现金流量表数据
-            cashflow = self.pro.cashflow(ts_code=ts_code, start_date=Config.开始日期,
-                                         end_date=Config.当前日期,
-                                         fields='ts_code,end_date,report_type,net_cash_flows_oper_act,net_profit')
+            cashflow = self._call('cashflow', ts_code=ts_code, start_date=Config.开始日期,
+                                  end_date=Config.当前日期,
+                                  fields='ts_code,ann_date,f_ann_date,end_date,report_type,net_cash_flows_oper_act,im_net_cashflow_oper_act,net_profit')
+            cashflow = Fundamentals.point_in_time(cashflow, Config.当前日期)
 
             # 获取估值数据
-            valuation = self.pro.daily_basic(ts_code=ts_code,trade_date=Config.当前日期,
-                                       fields='ts_code,pe,pe_ttm,pb,ps,dv_ratio')
+            valuation = self._call('daily_basic', ts_code=ts_code,trade_date=Config.当前日期,
+                                   fields='ts_code,pe,pe_ttm,pb,ps,dv_ratio,dv_ttm')
 
             return {
                 'fina_indicator': fina_indicator,
@@ -99,7 +114,7 @@ class TushareData:
     def get_stock_basic_info(self, ts_code):
         """获取股票基本信息"""
         try:
-            basic = self.pro.stock_basic(ts_code=ts_code, fields='ts_code,name,industry')
+            basic = self._call('stock_basic', ts_code=ts_code, fields='ts_code,name,industry')
             return basic.iloc[0] if not basic.empty else None
         except Exception as e:
             print(f"获取{ts_code}基本信息出错: {e}")
@@ -126,40 +141,383 @@ class TushareData:
         return filtered_df
 
 
+class BulkTushareData(TushareData):
+    """
+    截面批量数据提供者
+
+    按报告期（*_vip接口的period参数）和交易日（trade_date参数）一次拉取全市场数据，
+    再按ts_code建立索引，逐只股票的查询变为本地查找。接口与TushareData一致，可直接交给StockFilter。
+    """
+
+    # 各报表接口及字段（与TushareData.get_latest_financial_data保持一致）
+    报表接口 = {
+        'fina_indicator': ('fina_indicator_vip', ''),
+        'income': ('income_vip',
+                   'ts_code,ann_date,f_ann_date,end_date,report_type,basic_eps,gross_profit_rate,net_profit_rate'),
+        'balancesheet': ('balancesheet_vip',
+                         'ts_code,ann_date,f_ann_date,end_date,report_type,debt_to_asset,current_ratio,quick_ratio'),
+        'cashflow': ('cashflow_vip', 'ts_code,ann_date,f_ann_date,end_date,report_type,net_cash_flows_oper_act,im_net_cashflow_oper_act,net_profit'),
+    }
+    分页大小 = 5000
+
+    def __init__(self, token=None, scheduler=None, universe='a500'):
+        """
+        参数:
+        universe (str): 股票池，'a500'为A500成分股，'all'为全部上市A股
+        """
+        super().__init__(token, scheduler=scheduler)
+        if universe not in ('a500', 'all'):
+            raise ValueError(f"不支持的股票池: {universe}")
+        self.universe = universe
+        self._tables = None
+        self.panels = None  # 截面数据的原始堆叠表（供ScreeningEngine向量化筛选）
+        self.valuation_history = None
+        self._lock = threading.Lock()
+
+    def _fetch_all(self, api_name, **kwargs):
+        """分页拉取接口的全部数据"""
+        frames = []
+        offset = 0
+        while True:
+            df = self._call(api_name, limit=self.分页大小, offset=offset, **kwargs)
+            frames.append(df)
+            if len(df) < self.分页大小:
+                break
+            offset += self.分页大小
+        return pd.concat(frames, ignore_index=True)
+
+    @staticmethod
+    def _report_periods():
+        """公告日在[开始日期, 当前日期]内的报表可能覆盖的全部报告期（季度末）"""
+        start_year = int(Config.开始日期[:4]) - 1
+        end_year = int(Config.当前日期[:4])
+        periods = [f"{year}{month_day}" for year in range(start_year, end_year + 1)
+                   for month_day in ('0331', '0630', '0930', '1231')]
+        return [period for period in periods if period <= Config.当前日期]
+
+    @staticmethod
+    def _index_by_code(df):
+        return {ts_code: group for ts_code, group in df.groupby('ts_code', sort=False)}
+
+    def _load_tables(self):
+        """首次查询时并发拉取全部截面数据并建立索引（线程安全，只执行一次）"""
+        with self._lock:
+            if self._tables is not None:
+                return self._tables
+
+            tasks = {}
+            for name, (api_name, fields) in self.报表接口.items():
+                for period in self._report_periods():
+                    tasks[(name, period)] = {'api_name': api_name, 'period': period, 'fields': fields}
+            tasks[('valuation', Config.当前日期)] = {'api_name': 'daily_basic', 'trade_date': Config.当前日期,
+                                                   'fields': 'ts_code,pe,pe_ttm,pb,ps,dv_ratio,dv_ttm'}
+            tasks[('stock_basic', '')] = {'api_name': 'stock_basic', 'list_status': 'L',
+                                          'fields': 'ts_code,name,industry'}
+
+            # 使用独立线程池：本方法可能在StockFilter提交到共享线程池的任务中被调用
+            frames = {}
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                futures = {executor.submit(self._fetch_all, **kwargs): key for key, kwargs in tasks.items()}
+                for future in as_completed(futures):
+                    name, _ = futures[future]
+                    frames.setdefault(name, []).append(future.result())
+            frames = {name: pd.concat(dfs, ignore_index=True) for name, dfs in frames.items()}
+
+            panels = {}
+            tables = {}
+            for name in self.报表接口:
+                df = frames[name]
+                # 与逐只查询一致：公告日不早于开始日期，且只保留当前日期时已经公布的版本（同一报表取当时最新的更正）
+                df = df[df['ann_date'] >= Config.开始日期]
+                df = Fundamentals.point_in_time(df.drop_duplicates(), Config.当前日期)
+                if name == 'fina_indicator':
+                    df = self._filter_last_day_of_year(df)
+                panels[name] = df
+                tables[name] = self._index_by_code(df)
+                tables[name + '_columns'] = df.columns
+            panels['valuation'] = frames['valuation']
+            tables['valuation'] = self._index_by_code(frames['valuation'])
+            tables['valuation_columns'] = frames['valuation'].columns
+            tables['stock_basic'] = frames['stock_basic'].set_index('ts_code', drop=False)
+            panels['stock_basic'] = tables['stock_basic']
+
+            self.panels = panels
+            self._tables = tables
+            print(f"截面数据加载完成，共 {len(tables['stock_basic'])} 只股票，{len(tasks)} 组请求")
+            return tables
+
+    def get_panels(self):
+        """获取全市场堆叠数据表 {fina_indicator, income, balancesheet, cashflow, valuation, stock_basic}"""
+        self._load_tables()
+        return self.panels
+
+    def get_valuation_history(self, stocks=None):
+        """
+        近5年（开始日期~当前日期）每个交易日的 (ts_code, trade_date, pe_ttm, pb)，供估值历史分位规则使用。
+        按交易日拉取daily_basic全市场截面写入数据仓库（已拉取的交易日不再请求），再按代码读取
+        """
+        with self._lock:
+            if self.valuation_history is None:
+                MarketIngest.ingest(Config.开始日期, Config.当前日期, endpoints=('daily_basic',), client=self.pro,
+                                    scheduler=self.scheduler)
+                self.valuation_history = DataStore.read_dataset(
+                    MarketIngest.Endpoints['daily_basic'], columns=['ts_code', 'trade_date', 'pe_ttm', 'pb'],
+                    start_date=Config.开始日期, end_date=Config.当前日期)
+            history = self.valuation_history
+        return history if stocks is None else history[history['ts_code'].isin(stocks)]
+
+    def get_stock_pool(self):
+        """获取待筛选的股票池"""
+        if self.universe == 'all':
+            return self._load_tables()['stock_basic']['ts_code'].tolist()
+        return self.get_a500_stocks()
+
+    def get_latest_financial_data(self, ts_code):
+        """从截面数据中查找单只股票的财务数据"""
+        try:
+            tables = self._load_tables()
+            result = {}
+            for name in list(self.报表接口) + ['valuation']:
+                df = tables[name].get(ts_code)
+                result[name] = df if df is not None else pd.DataFrame(columns=tables[name + '_columns'])
+            return result
+        except Exception as e:
+            print(f"获取{ts_code}财务数据出错: {e}")
+            return None
+
+    def get_stock_basic_info(self, ts_code):
+        """从截面数据中查找股票基本信息"""
+        try:
+            stock_basic = self._load_tables()['stock_basic']
+            return stock_basic.loc[ts_code] if ts_code in stock_basic.index else None
+        except Exception as e:
+            print(f"获取{ts_code}基本信息出错: {e}")
+            return None
+
+
+class ScreeningEngine:
+    """
+    向量化筛选引擎
+
+    把Config.筛选标准中的规则（min/max、连续N年、N年复合增速、历史分位）编译为
+    股票×规则的布尔矩阵：各报表先按 (ts_code, end_date倒序) 排序一次，透视成
+    股票×最近第k期 的宽表，每条规则只是宽表上的一次整列比较。缺失值视为不满足。
+    """
+
+    # 规则 -> (数据表, 字段)；cash_flow_to_profit为两个字段之比
+    规则来源 = {
+        'roe': ('fina_indicator', 'roe'),
+        'roic': ('fina_indicator', 'roic'),
+        'grossprofit_margin': ('fina_indicator', 'grossprofit_margin'),
+        'netprofit_margin': ('fina_indicator', 'netprofit_margin'),
+        'debt_to_asset': ('fina_indicator', 'debt_to_assets'),
+        'current_ratio': ('fina_indicator', 'current_ratio'),
+        'quick_ratio': ('fina_indicator', 'quick_ratio'),
+        # 与_check_financial_health一致，采用"间接法经营现金流"-im_net_cashflow_oper_act
+        'cash_flow_to_profit': ('cashflow', ('im_net_cashflow_oper_act', 'net_profit')),
+        'revenue_growth': ('fina_indicator', 'revenue_ps'),
+        'profit_growth': ('fina_indicator', 'profit_dedt'),
+        'pe': ('valuation', 'pe_ttm'),
+        'pb': ('valuation', 'pb'),
+        'dividend_rate': ('valuation', 'dv_ttm'),
+    }
+    # 以复合增速方式判断的规则
+    增速规则 = ('revenue_growth', 'profit_growth')
+
+    def __init__(self, criteria=None):
+        self.criteria = criteria or Config.筛选标准
+
+    @staticmethod
+    def _wide(panel, column, stocks, periods):
+        """把堆叠表透视为 股票×最近第k期 的宽表（第0列为最新一期）"""
+        if isinstance(column, tuple):
+            numerator, denominator = column
+            panel = panel.assign(_ratio=panel[numerator] / panel[denominator])
+            column = '_ratio'
+        wide = panel.pivot(index='ts_code', columns='_rank', values=column)
+        wide = wide.reindex(index=stocks, columns=range(periods))
+        return wide.to_numpy(dtype=np.float64)
+
+    @staticmethod
+    def _rank_reports(df):
+        """年报按ts_code分组、end_date倒序编号（只排序一次）"""
+        if 'report_type' in df.columns:
+            df = df[df['report_type'].astype(str) == '1']
+        df = df.sort_values(['ts_code', 'end_date'], ascending=[True, False])
+        df = df.drop_duplicates(subset=['ts_code', 'end_date'], keep='first')
+        return df.assign(_rank=df.groupby('ts_code').cumcount())
+
+    @staticmethod
+    def _history_percentile(valuation_history, column, stocks, latest):
+        """最新值在其历史序列中的分位（0~100）"""
+        history = valuation_history.pivot_table(index='ts_code', columns='trade_date', values=column)
+        history = history.reindex(index=stocks).to_numpy(dtype=np.float64)
+        valid = ~np.isnan(history)
+        below = (history <= latest[:, None]) & valid
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return below.sum(axis=1) / valid.sum(axis=1) * 100
+
+    def evaluate(self, panels, stocks, valuation_history=None):
+        """
+        对全部股票一次性评估所有规则
+
+        参数:
+        panels (dict): 堆叠数据表，键为fina_indicator、cashflow、valuation（见BulkTushareData.get_panels）
+        stocks (list): 待筛选的股票代码
+        valuation_history (pd.DataFrame): 可选，近5年的(ts_code, trade_date, pe_ttm, pb)，提供时检查历史分位
+
+        返回:
+        tuple: (passed, mask, reasons)
+            passed (pd.Series): 每只股票是否通过全部规则
+            mask (pd.DataFrame): 股票×规则的通过矩阵
+            reasons (pd.Series): 未通过的规则名，以';'分隔
+        """
+        stocks = pd.Index(stocks, name='ts_code')
+        ranked = {name: self._rank_reports(df) for name, df in panels.items()
+                  if name in ('fina_indicator', 'income', 'balancesheet', 'cashflow')}
+        valuation = panels['valuation'].drop_duplicates('ts_code').set_index('ts_code').reindex(stocks)
+
+        mask = {}
+        for rule, params in self.criteria.items():
+            table, column = self.规则来源[rule]
+            years = params.get('years', 1)
+            if table == 'valuation':
+                values = valuation[column].to_numpy(dtype=np.float64)[:, None]
+            else:
+                values = self._wide(ranked[table], column, stocks, years)
+
+            if rule in self.增速规则:
+                # 复合增速（与_check_growth_stability的口径一致）
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    values = ((values[:, 0] / values[:, years - 1]) ** (1 / years) - 1)[:, None] * 100
+
+            ok = ~np.isnan(values).any(axis=1)
+            with np.errstate(invalid='ignore'):
+                if 'min' in params:
+                    ok &= (values >= params['min']).all(axis=1)
+                if 'max' in params:
+                    ok &= (values <= params['max']).all(axis=1)
+            if 'percentile' in params and valuation_history is not None:
+                percentile = self._history_percentile(valuation_history, column, stocks, values[:, 0])
+                with np.errstate(invalid='ignore'):
+                    ok &= percentile <= params['percentile']
+            mask[rule] = ok
+
+        mask = pd.DataFrame(mask, index=stocks)
+        passed = mask.all(axis=1)
+        failed = (~mask).astype(object)
+        reasons = failed.dot(pd.Series([rule + ';' for rule in mask.columns], index=mask.columns, dtype=object))
+        reasons = reasons.astype(str).str.rstrip(';')
+        return passed, mask, reasons
+
+    def collect(self, panels, stocks):
+        """生成输出列（与StockFilter._collect_stock_info一致），每只股票一行"""
+        stocks = pd.Index(stocks, name='ts_code')
+        fina = self._rank_reports(panels['fina_indicator'])
+        cashflow = self._rank_reports(panels['cashflow'])
+        latest = fina[fina['_rank'] == 0].set_index('ts_code').reindex(stocks)
+        latest_cf = cashflow[cashflow['_rank'] == 0].set_index('ts_code').reindex(stocks)
+        valuation = panels['valuation'].drop_duplicates('ts_code').set_index('ts_code').reindex(stocks)
+        basic = panels['stock_basic'].reindex(stocks)
+
+        def growth(column, years):
+            values = self._wide(fina, column, stocks, years)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                return ((values[:, 0] / values[:, years - 1]) ** (1 / years) - 1) * 100
+
+        numerator, denominator = self.规则来源['cash_flow_to_profit'][1]
+        return pd.DataFrame({
+            '股票代码': stocks,
+            '股票名称': basic['name'].to_numpy(),
+            '行业': basic['industry'].to_numpy(),
+            '最新年报日期': latest['end_date'].to_numpy(),
+            'ROE(%)': latest['roe'].to_numpy(),
+            'ROIC(%)': latest['roic'].to_numpy(),
+            '毛利率(%)': latest['grossprofit_margin'].to_numpy(),
+            '净利率(%)': latest['netprofit_margin'].to_numpy(),
+            '资产负债率(%)': latest['debt_to_assets'].to_numpy(),
+            '流动比率': latest['current_ratio'].to_numpy(),
+            '速动比率': latest['quick_ratio'].to_numpy(),
+            '经营现金流/净利润': (latest_cf[numerator] / latest_cf[denominator]).to_numpy(),
+            '近3年营收复合增速(%)': growth('revenue_ps', 3),
+            '近3年净利润复合增速(%)': growth('profit_dedt', 3),
+            '市盈率(PE)': valuation['pe_ttm'].to_numpy(),
+            '市净率(PB)': valuation['pb'].to_numpy(),
+            '股息率(%)': valuation['dv_ttm'].to_numpy(),
+        })
+
+
 class StockFilter:
     def __init__(self, data_provider):
         self.data_provider = data_provider
+        self.last_mask = None
+        self.last_reasons = None
 
     def filter_stocks(self):
         """筛选符合条件的股票"""
-        a500_stocks = self.data_provider.get_a500_stocks()
+        a500_stocks = self.data_provider.get_stock_pool()
         if not a500_stocks:
             print("未能获取A500成分股列表")
             return []
 
-        result = []
-        total = len(a500_stocks)
+        # 截面批量数据可直接交给向量化引擎，一次评估全部股票（估值历史用于PE/PB的历史分位规则）
+        if hasattr(self.data_provider, 'get_panels'):
+            valuation_history = None
+            if hasattr(self.data_provider, 'get_valuation_history'):
+                valuation_history = self.data_provider.get_valuation_history(a500_stocks)
+            return self.filter_stocks_vectorized(a500_stocks, valuation_history=valuation_history)
 
-        for i, ts_code in enumerate(a500_stocks):
-            print(f"正在处理 {i + 1}/{total}: {ts_code}")
+        total = len(a500_stocks)
 
-            # 获取股票基本信息
-            basic_info = self.data_provider.get_stock_basic_info(ts_code)
-            if not basic_info.any():
+        # 每只股票的数据拉取和检查相互独立，并发执行，按完成顺序收集结果
+        scheduler = getattr(self.data_provider, 'scheduler', None) or FetchScheduler.get_scheduler()
+        futures = {scheduler.submit(None, self._process_stock, ts_code): ts_code for ts_code in a500_stocks}
+        qualified = {}
+        for i, future in enumerate(as_completed(futures)):
+            ts_code = futures[future]
+            print(f"已处理 {i + 1}/{total}: {ts_code}")
+            try:
+                stock_info = future.result()
+            except Exception as e:
+                print(f"处理{ts_code}时出错: {e}")
                 continue
+            if stock_info is not None:
+                qualified[ts_code] = stock_info
 
-            # 获取财务数据
-            financial_data = self.data_provider.get_latest_financial_data(ts_code)
-            if not financial_data:
-                continue
+        # 保持成分股列表中的原有顺序
+        result = [qualified[ts_code] for ts_code in a500_stocks if ts_code in qualified]
+        return result
 
-            # 检查是否符合所有筛选条件
-            if self._check_all_conditions(ts_code, financial_data):
-                # 收集符合条件的股票信息
-                stock_info = self._collect_stock_info(ts_code, basic_info, financial_data)
-                result.append(stock_info)
+    def filter_stocks_vectorized(self, stocks, valuation_history=None):
+        """使用ScreeningEngine在全市场面板上一次完成筛选（未提供valuation_history时跳过历史分位规则）"""
+        engine = ScreeningEngine()
+        skipped = [rule for rule, params in engine.criteria.items() if 'percentile' in params]
+        if valuation_history is None and skipped:
+            print(f"未提供估值历史，跳过 {', '.join(skipped)} 的历史分位检查")
+        panels = self.data_provider.get_panels()
+        passed, mask, reasons = engine.evaluate(panels, stocks, valuation_history=valuation_history)
+        self.last_mask = mask  # 保留通过矩阵和未通过原因，便于排查
+        self.last_reasons = reasons
+        print(f"共评估 {len(stocks)} 只股票，{int(passed.sum())} 只通过全部规则")
+        return engine.collect(panels, passed.index[passed.to_numpy()]).to_dict('records')
+
+    def _process_stock(self, ts_code):
+        """拉取单只股票数据并检查，符合条件时返回股票信息，否则返回None"""
+        # 获取股票基本信息
+        basic_info = self.data_provider.get_stock_basic_info(ts_code)
+        if basic_info is None or not basic_info.any():
+            return None
 
-        return result
+        # 获取财务数据
+        financial_data = self.data_provider.get_latest_financial_data(ts_code)
+        if not financial_data:
+            return None
+
+        # 检查是否符合所有筛选条件
+        if self._check_all_conditions(ts_code, financial_data):
+            # 收集符合条件的股票信息
+            return self._collect_stock_info(ts_code, basic_info, financial_data)
+        return None
 
     def _check_all_conditions(self, ts_code, financial_data):
         """检查是否符合所有筛选条件"""
@@ -387,11 +745,8 @@ class ExcelExporter:
 
 
 def main():
-    # 请替换为您的Tushare token
-    TUSHARE_TOKEN = Tusharetoken.get()
-
-    # 初始化数据提供者
-    data_provider = TushareData(TUSHARE_TOKEN)
+    # 初始化数据提供者（截面批量模式，按报告期/交易日一次拉取全市场数据；token默认读取配置文件）
+    data_provider = BulkTushareData()
 
     # 初始化筛选器
     filter = StockFilter(data_provider)
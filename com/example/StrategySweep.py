@@ -0,0 +1,168 @@
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from com.example.MaoTai_20_Strategy import MA20Strategy, vectorized_backtest
+
+# 参数网格默认值（与MA20Strategy.backtest的默认参数一致）
+Default_Grid = {
+    'window': [20],
+    'slippage': [0.0002],
+    'commision_rate': [0.001],
+}
+
+# 工作进程内的共享收盘价（只读视图，不复制数据）
+_worker_state = {}
+
+
+def _init_worker(shm_name, length, years_held):
+    """工作进程初始化：挂载共享内存中的收盘价序列"""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    _worker_state['shm'] = shm  # 保持引用，避免共享内存被提前释放
+    _worker_state['close'] = np.ndarray((length,), dtype=np.float64, buffer=shm.buf)
+    _worker_state['years_held'] = years_held
+
+
+def ma_positions(close, window):
+    """按MA20Strategy.generate_signals的规则计算信号差分序列"""
+    ma = pd.Series(close, copy=False).rolling(window).mean().to_numpy()
+    signal = np.where(close > ma, 1, np.where(close < ma, -1, 0))
+    position = np.empty(len(close), dtype=np.float64)
+    position[0] = np.nan
+    position[1:] = np.diff(signal)
+    return position
+
+
+def summarize_assets(total_assets, shares, years_held, position=None):
+    """
+    计算单次回测的总收益率、年化收益率、夏普比率和成交次数
+
+    参数:
+    position (np.ndarray): 信号差分序列，提供时只统计引擎实际执行的买卖信号（±2且持仓发生变化）
+    """
+    initial_assets = total_assets[0]
+    final_assets = total_assets[-1]
+    total_return = (final_assets - initial_assets) / initial_assets * 100
+    annual_return = ((1 + total_return / 100) ** (1 / years_held) - 1) * 100 if years_held > 0 else 0
+
+    daily_returns = np.diff(total_assets) / total_assets[:-1]
+    std = daily_returns.std(ddof=1) if len(daily_returns) > 1 else 0
+    sharpe_ratio = daily_returns.mean() * 252 / (std * np.sqrt(252)) if std > 0 else 0
+
+    # 与初始空仓比较，首日建仓也计为一次成交
+    traded = np.diff(shares, prepend=0) != 0
+    if position is not None:
+        traded &= np.abs(np.nan_to_num(position)) == 2
+    trades = int(np.count_nonzero(traded))
+    return {
+        'total_return': total_return,
+        'annual_return': annual_return,
+        'sharpe': sharpe_ratio,
+        'trades': trades,
+    }
+
+
+def _run_chunk(window, cost_params, initial_capital, bottom_cash):
+    """在工作进程中运行同一均线窗口下的一组参数组合（信号只计算一次）"""
+    close = _worker_state['close']
+    years_held = _worker_state['years_held']
+    position = ma_positions(close, window)
+
+    rows = []
+    for slippage, commision_rate in cost_params:
+        _, shares, total_assets = vectorized_backtest(
+            close, position,
+            initial_capital=initial_capital,
+            slippage=slippage,
+            commision_rate=commision_rate,
+            bottom_cash=bottom_cash
+        )
+        row = {'window': window, 'slippage': slippage, 'commision_rate': commision_rate}
+        row.update(summarize_assets(total_assets, shares, years_held, position))
+        rows.append(row)
+    return rows
+
+
+def _build_chunks(param_grid, chunk_size):
+    """按均线窗口分组参数组合，并切分为不超过chunk_size的任务块"""
+    grid = dict(Default_Grid)
+    grid.update(param_grid or {})
+    unknown = set(grid) - set(Default_Grid)
+    if unknown:
+        raise ValueError(f"不支持的参数: {sorted(unknown)}")
+
+    cost_params = list(itertools.product(grid['slippage'], grid['commision_rate']))
+    chunks = []
+    for window in grid['window']:
+        for i in range(0, len(cost_params), chunk_size):
+            chunks.append((int(window), cost_params[i:i + chunk_size]))
+    return chunks
+
+
+def run_sweep(param_grid, data_path=None, data=None, ts_code=None, initial_capital=1000000.0, bottom_cash=1000,
+              rank_by='sharpe', ascending=False, max_workers=None, chunk_size=16):
+    """
+    并行参数扫描：价格序列只加载一次，放入共享内存供各工作进程零拷贝读取
+
+    参数:
+    param_grid (dict): 参数网格，键为window、slippage、commision_rate，值为候选值列表
+    data_path (str): 行情文件路径，交由MA20Strategy.load_data加载
+    data (pd.DataFrame): 已加载的行情数据（以日期为索引，含close列），提供时忽略data_path
+    ts_code (str): 从列式数据仓库按代码加载前复权行情（原始日线与复权因子，见MA20Strategy.load_data）
+    initial_capital (float): 初始资金
+    bottom_cash (float): 买入前需保留的最低资金
+    rank_by (str): 排序指标，可选total_return、annual_return、sharpe、trades
+    ascending (bool): 是否升序排列，默认降序
+    max_workers (int): 进程数，默认为CPU核数
+    chunk_size (int): 每个任务块包含的参数组合数
+
+    返回:
+    pd.DataFrame: 每个参数组合一行，按rank_by排序
+    """
+    if data is None:
+        strategy = MA20Strategy(data_path=data_path, ts_code=ts_code)
+        if not strategy.load_data():
+            raise ValueError("行情数据加载失败")
+        data = strategy.data
+
+    close = data['close'].to_numpy(dtype=np.float64)
+    if len(close) < 2:
+        raise ValueError("行情数据不足")
+    years_held = (data.index[-1] - data.index[0]).days / 365.25
+
+    chunks = _build_chunks(param_grid, chunk_size)
+    max_workers = max_workers or os.cpu_count() or 1
+
+    shm = shared_memory.SharedMemory(create=True, size=close.nbytes)
+    try:
+        np.ndarray(close.shape, dtype=np.float64, buffer=shm.buf)[:] = close
+        with ProcessPoolExecutor(max_workers=max_workers,
+                                 initializer=_init_worker,
+                                 initargs=(shm.name, len(close), years_held)) as executor:
+            futures = [executor.submit(_run_chunk, window, cost_params, initial_capital, bottom_cash)
+                       for window, cost_params in chunks]
+            rows = [row for future in futures for row in future.result()]
+    finally:
+        shm.close()
+        shm.unlink()
+
+    results = pd.DataFrame(rows)
+    if rank_by not in results.columns:
+        raise ValueError(f"不支持的排序指标: {rank_by}")
+    return results.sort_values(rank_by, ascending=ascending).reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    results = run_sweep(
+        {
+            'window': range(5, 121, 5),
+            'slippage': [0.0001, 0.0002, 0.0005],
+            'commision_rate': [0.0003, 0.0005, 0.001],
+        },
+        ts_code='600519.SH'
+    )
+    print(results.head(20))
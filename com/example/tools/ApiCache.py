@@ -0,0 +1,341 @@
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime
+
+import pandas as pd
+
+from com.example.tools import DataProvider, FetchScheduler
+
+# 缓存目录与容量上限（超出后按最近最少使用淘汰）
+Cache_Dir = 'data/cache'
+Max_Bytes = 2 * 1024 ** 3
+
+# 各接口的缓存有效期（秒），None表示永久有效；未列出的接口按查询日期判断
+Endpoint_TTL = {
+    'stock_basic': 24 * 3600,
+    'index_weight': 24 * 3600,
+    'cn_gdp': 24 * 3600,
+    'trade_cal': 24 * 3600,
+    # 财务报表的历史报告期仍会发布更正（update_flag=1），按报告期或公告日查询的结果不能永久缓存
+    'income': 24 * 3600,
+    'income_vip': 24 * 3600,
+    'balancesheet': 24 * 3600,
+    'balancesheet_vip': 24 * 3600,
+    'cashflow': 24 * 3600,
+    'cashflow_vip': 24 * 3600,
+    'fina_indicator': 24 * 3600,
+    'fina_indicator_vip': 24 * 3600,
+}
+Recent_TTL = 10 * 60  # 查询范围包含今天（行情仍可能变化）
+Open_TTL = 24 * 3600  # 查询未指定日期（返回最新数据）
+
+# 决定数据是否已"定型"的日期参数
+Date_Params = ('end_date', 'trade_date', 'period', 'ann_date', 'start_date')
+
+
+def _normalize_value(value):
+    """参数值统一为字符串，使20250101与'20250101'、['a','b']与'a,b'命中同一缓存"""
+    if isinstance(value, (list, tuple)):
+        return ','.join(str(item) for item in value)
+    return str(value)
+
+
+def normalize_params(params):
+    """去掉空参数并按键排序"""
+    return {key: _normalize_value(value) for key, value in sorted(params.items())
+            if value is not None and value != ''}
+
+
+def make_key(endpoint, params):
+    """缓存键：接口名+规范化参数的SHA-256摘要"""
+    payload = json.dumps([endpoint, normalize_params(params)], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def ttl_for(endpoint, params, today=None):
+    """
+    计算缓存有效期：历史区间永久有效，包含今天的查询只短期有效
+
+    返回:
+    float或None: 有效秒数，None表示永久有效
+    """
+    if endpoint in Endpoint_TTL:
+        return Endpoint_TTL[endpoint]
+    params = normalize_params(params)
+    dates = [params[name][:8] for name in Date_Params if name in params]
+    if 'end_date' not in params and 'start_date' in params:
+        return Open_TTL  # 只有起始日期时结果会随时间增加
+    if not dates:
+        return Open_TTL
+    today = today or datetime.now().strftime('%Y%m%d')
+    return Recent_TTL if max(dates) >= today else None
+
+
+class ResponseCache:
+    """
+    接口响应的磁盘缓存
+
+    - 每条响应按内容寻址存为一个文件（DataFrame为Parquet，其余为pickle）
+    - SQLite索引记录大小、过期时间和最近访问时间，超出容量时按LRU淘汰
+    - 并发的相同请求只发起一次，其余调用方等待同一结果
+    """
+
+    def __init__(self, cache_dir=Cache_Dir, max_bytes=Max_Bytes):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._db = sqlite3.connect(os.path.join(cache_dir, 'index.db'), check_same_thread=False)
+        self._db.execute('''
+            CREATE TABLE IF NOT EXISTS entries(
+            key TEXT PRIMARY KEY,
+            endpoint TEXT NOT NULL,
+            path TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            created REAL NOT NULL,
+            accessed REAL NOT NULL,
+            expires REAL);
+        ''')
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_accessed ON entries(accessed);")
+        self._db.commit()
+
+    def _path(self, key, is_frame):
+        return os.path.join(self.cache_dir, key[:2], key + ('.parquet' if is_frame else '.pkl'))
+
+    def _remove(self, key, path):
+        self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+        if os.path.exists(path):
+            os.remove(path)
+
+    def get(self, key):
+        """
+        读取缓存
+
+        返回:
+        tuple: (是否命中, 缓存值)
+        """
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT path, expires FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return False, None
+            path, expires = row
+            if expires is not None and expires <= now:
+                self._remove(key, path)
+                self._db.commit()
+                return False, None
+            self._db.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+            self._db.commit()
+        try:
+            if path.endswith('.parquet'):
+                return True, pd.read_parquet(path)
+            with open(path, 'rb') as file:
+                return True, pickle.load(file)
+        except (FileNotFoundError, OSError):
+            return False, None
+
+    def put(self, key, endpoint, params, value):
+        """写入缓存并在超出容量时淘汰"""
+        is_frame = isinstance(value, pd.DataFrame)
+        path = self._path(key, is_frame)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        if is_frame:
+            value.to_parquet(tmp_path, index=False)
+        else:
+            with open(tmp_path, 'wb') as file:
+                pickle.dump(value, file)
+        os.replace(tmp_path, path)
+
+        now = time.time()
+        ttl = ttl_for(endpoint, params)
+        if ttl is None and is_frame and value.empty:
+            ttl = Recent_TTL  # 历史区间的空结果可能是数据尚未发布，不永久缓存
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries(key, endpoint, path, size, created, accessed, expires) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, endpoint, path, os.path.getsize(path), now, now, None if ttl is None else now + ttl))
+            self._evict(keep=key)
+            self._db.commit()
+
+    def _evict(self, keep=None):
+        """按最近访问时间从旧到新删除（不删除刚写入的keep），直到总大小不超过上限（调用方持有锁）"""
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, path, size in self._db.execute(
+                "SELECT key, path, size FROM entries WHERE key != ? ORDER BY accessed", (keep,)).fetchall():
+            self._remove(key, path)
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def get_or_fetch(self, endpoint, params, fetch):
+        """
+        命中缓存直接返回，否则调用fetch()拉取并写入缓存；相同请求并发时只拉取一次
+
+        参数:
+        endpoint (str): 接口名
+        params (dict): 请求参数
+        fetch (callable): 无参函数，实际发起请求
+        """
+        key = make_key(endpoint, params)
+        hit, value = self.get(key)
+        if hit:
+            return value
+
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+        if not owner:
+            value = future.result()
+            return value.copy() if isinstance(value, pd.DataFrame) else value
+
+        try:
+            value = fetch()
+            self.put(key, endpoint, params, value)
+            future.set_result(value)
+            return value.copy() if isinstance(value, pd.DataFrame) else value
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            for key, path in self._db.execute("SELECT key, path FROM entries").fetchall():
+                self._remove(key, path)
+            self._db.commit()
+
+
+class CachedClient:
+    """
+    带缓存的Tushare pro_api客户端，用法与pro_api()相同（pro.daily(...)、pro.query('daily', ...)）
+
+    未命中缓存的请求经由FetchScheduler按接口限流，命中缓存的请求不占用调用频率
+    """
+
+    def __init__(self, client, cache=None, scheduler=None):
+        self._client = client
+        self._cache = cache or get_cache()
+        self._scheduler = scheduler or FetchScheduler.get_scheduler()
+
+    def query(self, api_name, fields='', **kwargs):
+        params = dict(kwargs, fields=fields)
+        return self._cache.get_or_fetch(
+            api_name, params,
+            lambda: self._scheduler.call(api_name, self._client.query, api_name, fields=fields, **kwargs))
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        def api(fields='', **kwargs):
+            return self.query(name, fields=fields, **kwargs)
+        return api
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def get_cache():
+    """获取全局共享的响应缓存"""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = ResponseCache()
+        return _shared_cache
+
+
+def cached_client(client, cache=None, scheduler=None):
+    """用响应缓存和限流调度器包装pro_api()客户端"""
+    return CachedClient(client, cache=cache, scheduler=scheduler)
+
+
+_shared_api = None
+_shared_token = None  # 共享客户端使用的token（回放或set_api替换的客户端为None，与token无关）
+_shared_client = None
+_client_lock = threading.Lock()
+
+
+def pro_api(token=None):
+    """
+    全局共享的原始pro_api()客户端（DataProvider.TushareProvider，经共享连接池请求），首次调用时才读取token；
+    指定的token与共享客户端不同时返回该token自己的客户端，不会使用其他账户的额度
+
+    参数:
+    token (str): Tushare token，默认由Tusharetoken.get()读取配置文件
+    """
+    global _shared_api, _shared_token
+    with _client_lock:
+        if _shared_api is not None and (token is None or _shared_token is None or token == _shared_token):
+            return _shared_api
+        from com.example import Tusharetoken
+        from com.example.tools import Replay
+
+        used = []
+
+        def make_live():
+            used.append(token or Tusharetoken.get())
+            return DataProvider.get_provider('tushare', token=used[0])
+
+        # RABBITLE_API_MODE=record/replay时替换为录制/回放客户端
+        api = Replay.from_environment(make_live)
+        if _shared_api is None:
+            _shared_api, _shared_token = api, (used[0] if used else None)
+        return api
+
+
+def set_api(api):
+    """
+    替换全局共享的原始客户端（如ReplayClient），之后构建的客户端（get_client、TushareData等）都使用它
+
+    返回:
+    之前的原始客户端
+    """
+    global _shared_api, _shared_token, _shared_client
+    with _client_lock:
+        previous, _shared_api, _shared_token, _shared_client = _shared_api, api, None, None
+        return previous
+
+
+def get_client():
+    """全局共享的带缓存、限流的客户端（首次使用时构建）"""
+    global _shared_client
+    api = pro_api()
+    with _client_lock:
+        if _shared_client is None:
+            _shared_client = CachedClient(api)
+        return _shared_client
+
+
+class LazyClient:
+    """
+    延迟构建的共享客户端代理，可在模块顶层赋值（pro = ApiCache.lazy_client()），
+    导入模块时不导入tushare、不读取token，第一次调用接口时才构建get_client()
+    """
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(get_client(), name)
+
+
+def lazy_client():
+    """返回共享客户端的延迟代理"""
+    return LazyClient()
@@ -0,0 +1,186 @@
+import io
+import json
+import threading
+
+import pandas as pd
+
+# 连接池与超时设置：池大小不小于FetchScheduler的线程数，避免线程等待连接
+Pool_Size = 16
+Connect_Timeout = 5.0  # 建立连接的超时秒数
+Read_Timeout = 60.0  # 等待响应的超时秒数
+Max_Retries = 3  # 连接失败、连接被对端重置时的重试次数（不重试已发出的POST）
+
+Tushare_Url = 'http://api.waditu.com/dataapi'
+Yahoo_Chart_Url = 'https://query1.finance.yahoo.com/v8/finance/chart/{symbol}'
+Fred_Csv_Url = 'https://fred.stlouisfed.org/graph/fredgraph.csv'
+User_Agent = 'Mozilla/5.0 (compatible; rabbitle-data/1.0)'
+
+
+def create_session(pool_size=Pool_Size, max_retries=Max_Retries):
+    """
+    创建带keep-alive连接池的requests.Session
+
+    同一主机的连接在请求间复用，省去每次调用的TCP/TLS握手；
+    连接池（urllib3）是线程安全的，Session可在FetchScheduler的线程间共享
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    session = requests.Session()
+    retry = Retry(total=max_retries, connect=max_retries, read=0, status=0, backoff_factor=0.5,
+                  allowed_methods=frozenset(['GET']))
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry, pool_block=True)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers['User-Agent'] = User_Agent
+    return session
+
+
+class HttpProvider:
+    """数据源的公共基类：共享连接池Session与超时设置，子类实现各自接口的请求与解析"""
+
+    def __init__(self, session=None, timeout=None):
+        """
+        参数:
+        session: requests.Session，默认全局共享的get_session()
+        timeout (tuple): (连接超时, 读取超时)秒数
+        """
+        self._session = session
+        self.timeout = timeout or (Connect_Timeout, Read_Timeout)
+
+    @property
+    def session(self):
+        return self._session or get_session()
+
+    def _request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        response = self.session.request(method, url, **kwargs)
+        response.raise_for_status()
+        return response
+
+
+class TushareProvider(HttpProvider):
+    """
+    Tushare数据接口，协议与tushare.pro_api()相同（pro.daily(...)、pro.query('daily', ...)），
+    可直接替代pro_api()客户端；请求经共享连接池发送，而不是每次新建连接
+    """
+
+    def __init__(self, token, url=Tushare_Url, session=None, timeout=None):
+        super().__init__(session, timeout)
+        self._token = token
+        self.url = url
+
+    def query(self, api_name, fields='', **kwargs):
+        if isinstance(fields, (list, tuple)):
+            fields = ','.join(fields)
+        kwargs.setdefault('ts_type_name', self.url)
+        payload = {'api_name': api_name, 'token': self._token, 'params': kwargs, 'fields': fields}
+        response = self._request('POST', f"{self.url}/{api_name}", json=payload)
+        result = json.loads(response.text)
+        if result['code'] != 0:
+            # 与tushare一致抛出Exception(msg)，FetchScheduler据此识别频率超限
+            raise Exception(result['msg'])
+        data = result['data']
+        return pd.DataFrame(data['items'], columns=data['fields'])
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        def api(fields='', **kwargs):
+            return self.query(name, fields=fields, **kwargs)
+        return api
+
+
+class YahooProvider(HttpProvider):
+    """Yahoo Finance：历史行情直接请求chart接口（走共享连接池），估值等字段经yfinance获取"""
+
+    def history(self, symbol, period='1y', interval='1d'):
+        """
+        历史K线
+
+        返回:
+        pd.DataFrame: 以日期为索引，列为Open/High/Low/Close/Volume
+        """
+        response = self._request('GET', Yahoo_Chart_Url.format(symbol=symbol),
+                                 params={'range': period, 'interval': interval})
+        result = response.json()['chart']['result'][0]
+        quote = result['indicators']['quote'][0]
+        index = pd.to_datetime(result.get('timestamp', []), unit='s').normalize()
+        return pd.DataFrame({'Open': quote.get('open'), 'High': quote.get('high'), 'Low': quote.get('low'),
+                             'Close': quote.get('close'), 'Volume': quote.get('volume')},
+                            index=pd.Index(index, name='Date')).dropna(how='all')
+
+    def ticker(self, symbol):
+        """yfinance.Ticker（info、fast_info等需要Yahoo会话凭证的字段由yfinance自行维护连接）"""
+        import yfinance as yf
+
+        return yf.Ticker(symbol)
+
+
+class FredProvider(HttpProvider):
+    """美联储FRED经济数据（fredgraph CSV接口，与pandas_datareader.get_data_fred数据一致，无需API key）"""
+
+    def series(self, series_id, start=None, end=None):
+        """
+        单个或多个序列
+
+        参数:
+        series_id (str/list): 序列代码，如'GDP'、'DGS10'
+        start, end: 起止日期（含），可为字符串或datetime
+
+        返回:
+        pd.DataFrame: 以DATE为索引，每个序列一列
+        """
+        ids = [series_id] if isinstance(series_id, str) else list(series_id)
+        params = {'id': ','.join(ids)}
+        if start is not None:
+            params['cosd'] = pd.Timestamp(start).strftime('%Y-%m-%d')
+        if end is not None:
+            params['coed'] = pd.Timestamp(end).strftime('%Y-%m-%d')
+        response = self._request('GET', Fred_Csv_Url, params=params)
+        df = pd.read_csv(io.StringIO(response.text), na_values='.')
+        df = df.rename(columns={df.columns[0]: 'DATE'})
+        df['DATE'] = pd.to_datetime(df['DATE'])
+        return df.set_index('DATE')
+
+
+_shared_session = None
+_shared_providers = {}
+_shared_lock = threading.Lock()
+
+
+def get_session():
+    """获取全局共享的连接池Session"""
+    global _shared_session
+    with _shared_lock:
+        if _shared_session is None:
+            _shared_session = create_session()
+        return _shared_session
+
+
+def configure(pool_size=Pool_Size, max_retries=Max_Retries):
+    """替换全局Session（如调整连接池大小），已创建的数据源随之使用新Session"""
+    global _shared_session
+    with _shared_lock:
+        if _shared_session is not None:
+            _shared_session.close()
+        _shared_session = create_session(pool_size=pool_size, max_retries=max_retries)
+        return _shared_session
+
+
+def get_provider(name, **kwargs):
+    """
+    获取全局共享的数据源，相同参数（如同一个token）共享同一个实例
+
+    参数:
+    name (str): 'tushare'、'yahoo'或'fred'
+    kwargs: 传给数据源构造函数的参数（tushare需要token）
+    """
+    classes = {'tushare': TushareProvider, 'yahoo': YahooProvider, 'fred': FredProvider}
+    key = (name, tuple(sorted(kwargs.items())))
+    with _shared_lock:
+        if key not in _shared_providers:
+            _shared_providers[key] = classes[name](**kwargs)
+        return _shared_providers[key]
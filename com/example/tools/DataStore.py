@@ -0,0 +1,377 @@
+import json
+import os
+import shutil
+import threading
+import uuid
+
+import pandas as pd
+
+from com.example.tools import Df_To_Excel as dte
+
+# 列式数据仓库根目录，每个数据集为其下的一个子目录
+Store_Dir = 'data/store'
+Meta_File = '_meta.json'
+
+# 清单（_meta.json）的读-改-写在进程内串行化
+_meta_lock = threading.Lock()
+
+
+def _dataset_dir(dataset, root):
+    return os.path.join(root, dataset)
+
+
+def normalize_date(value):
+    """将日期（datetime、20150101整数或字符串）统一为YYYYMMDD字符串"""
+    if value is None:
+        return None
+    if hasattr(value, 'strftime'):
+        return value.strftime('%Y%m%d')
+    return str(value).replace('-', '')[:8]
+
+
+def _normalize_date_column(series):
+    """整列日期统一为YYYYMMDD字符串"""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series.dt.strftime('%Y%m%d')
+    return series.astype(str).str.replace('-', '', regex=False).str.slice(0, 8)
+
+
+def _read_meta(dataset, root):
+    meta_path = os.path.join(_dataset_dir(dataset, root), Meta_File)
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+
+def _write_meta(dataset, root, meta):
+    os.makedirs(_dataset_dir(dataset, root), exist_ok=True)
+    meta_path = os.path.join(_dataset_dir(dataset, root), Meta_File)
+    tmp_path = f"{meta_path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        json.dump(meta, file, ensure_ascii=False)
+    os.replace(tmp_path, meta_path)
+
+
+def _partition_keys(df, partition_by):
+    """每行所属分区的键（清单中的高水位按该键记录）"""
+    if partition_by == 'year':
+        return df['trade_date'].str.slice(0, 4)
+    return df[partition_by].astype(str)
+
+
+def _update_high_water(meta, df, partition_by, mode):
+    """更新清单中各分区已存数据的最大trade_date；覆盖写入时分区被整体替换"""
+    if 'trade_date' not in df.columns:
+        return
+    marks = meta.setdefault('high_water', {})
+    latest = df.groupby(_partition_keys(df, partition_by), sort=False)['trade_date'].max()
+    for key, value in latest.items():
+        if mode == 'append' and key in marks:
+            value = max(marks[key], value)
+        marks[key] = value
+
+
+def _partitioning(partition_by):
+    """按ts_code（字符串）或year（由trade_date派生的年份）分区"""
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    field_type = pa.int32() if partition_by == 'year' else pa.string()
+    return ds.partitioning(pa.schema([(partition_by, field_type)]), flavor='hive')
+
+
+def dataset_exists(dataset, root=Store_Dir):
+    """数据集是否已存在"""
+    return _read_meta(dataset, root) is not None
+
+
+def write_dataset(df, dataset, partition_by=None, mode='overwrite', root=Store_Dir):
+    """
+    将DataFrame写入列式数据集（Parquet，按分区存放）
+
+    参数:
+    df (pd.DataFrame): 要写入的数据，日期列trade_date会统一为YYYYMMDD字符串
+    dataset (str): 数据集名称
+    partition_by (str): 分区键，'ts_code'或'year'，默认有ts_code列时按ts_code分区，否则按年份分区
+    mode (str): 'overwrite'覆盖本次涉及的分区，'append'在分区内追加新文件
+    root (str): 数据仓库根目录
+
+    返回:
+    int: 写入的行数
+    """
+    if not isinstance(df, pd.DataFrame):
+        raise TypeError("输入数据不是pandas DataFrame类型")
+    if mode not in ('overwrite', 'append'):
+        raise ValueError(f"不支持的写入模式: {mode}")
+    if df.empty:
+        return 0
+
+    meta = _read_meta(dataset, root)
+    if meta is not None:
+        if partition_by and partition_by != meta['partition_by']:
+            raise ValueError(f"数据集 {dataset} 已按 {meta['partition_by']} 分区")
+        partition_by = meta['partition_by']
+    elif not partition_by:
+        partition_by = 'ts_code' if 'ts_code' in df.columns else 'year'
+
+    df = df.copy()
+    if 'trade_date' in df.columns:
+        df['trade_date'] = _normalize_date_column(df['trade_date'])
+        df = df.sort_values('trade_date')
+    if partition_by == 'year':
+        df['year'] = df['trade_date'].str.slice(0, 4).astype('int32')
+
+    # pyarrow在首次读写数据集时才导入，只用到清单、导出等功能的模块不承担其导入开销
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    ds.write_dataset(
+        table,
+        _dataset_dir(dataset, root),
+        format='parquet',
+        partitioning=_partitioning(partition_by),
+        basename_template=f'part-{uuid.uuid4().hex}-{{i}}.parquet',
+        existing_data_behavior='delete_matching' if mode == 'overwrite' else 'overwrite_or_ignore',
+    )
+    with _meta_lock:
+        meta = _read_meta(dataset, root) or {'partition_by': partition_by}
+        _update_high_water(meta, df, partition_by, mode)
+        _write_meta(dataset, root, meta)
+    return len(df)
+
+
+def read_dataset(dataset, columns=None, ts_codes=None, start_date=None, end_date=None, root=Store_Dir):
+    """
+    读取列式数据集，列投影与日期范围过滤下推到文件扫描
+
+    参数:
+    dataset (str): 数据集名称
+    columns (list): 需要读取的列，默认全部
+    ts_codes (list): 只读取指定代码（按ts_code分区时只扫描对应分区）
+    start_date: 起始日期（含），YYYYMMDD字符串/整数或datetime
+    end_date: 结束日期（含）
+    root (str): 数据仓库根目录
+
+    返回:
+    pd.DataFrame: 按trade_date升序排列，数据集不存在时返回空DataFrame
+    """
+    meta = _read_meta(dataset, root)
+    if meta is None:
+        return pd.DataFrame(columns=columns) if columns else pd.DataFrame()
+    partition_by = meta['partition_by']
+
+    import pyarrow.dataset as ds
+
+    source = ds.dataset(_dataset_dir(dataset, root), format='parquet',
+                        partitioning=_partitioning(partition_by),
+                        exclude_invalid_files=True)
+
+    filters = []
+    start_date = normalize_date(start_date)
+    end_date = normalize_date(end_date)
+    if start_date:
+        filters.append(ds.field('trade_date') >= start_date)
+        if partition_by == 'year':
+            filters.append(ds.field('year') >= int(start_date[:4]))
+    if end_date:
+        filters.append(ds.field('trade_date') <= end_date)
+        if partition_by == 'year':
+            filters.append(ds.field('year') <= int(end_date[:4]))
+    if ts_codes is not None:
+        filters.append(ds.field('ts_code').isin(list(ts_codes)))
+
+    expression = None
+    for condition in filters:
+        expression = condition if expression is None else expression & condition
+
+    if columns is not None:
+        columns = list(columns)
+    elif partition_by == 'year':
+        columns = [name for name in source.schema.names if name != 'year']
+
+    df = source.to_table(columns=columns, filter=expression).to_pandas()
+    if 'trade_date' in df.columns:
+        df = df.sort_values('trade_date', kind='stable').reset_index(drop=True)
+    return df
+
+
+def upsert_dataset(df, dataset, keys=('ts_code', 'trade_date'), partition_by=None, root=Store_Dir):
+    """
+    按主键合并写入：只重写本次涉及的分区，重复主键以新数据为准
+
+    返回:
+    int: 合并后涉及分区的总行数
+    """
+    if df.empty:
+        return 0
+    keys = [key for key in keys if key in df.columns]
+    df = df.copy()
+    if 'trade_date' in df.columns:
+        df['trade_date'] = _normalize_date_column(df['trade_date'])
+
+    meta = _read_meta(dataset, root)
+    if meta is not None:
+        partition_by = meta['partition_by']
+        if partition_by == 'ts_code':
+            existing = read_dataset(dataset, ts_codes=df['ts_code'].unique(), root=root)
+        else:
+            years = df['trade_date'].str.slice(0, 4)
+            existing = read_dataset(dataset, start_date=years.min() + '0101', end_date=years.max() + '1231',
+                                    root=root)
+        df = pd.concat([existing, df], ignore_index=True)
+
+    df = df.drop_duplicates(subset=keys, keep='last')
+    return write_dataset(df, dataset, partition_by=partition_by, mode='overwrite', root=root)
+
+
+def high_water_mark(dataset, partition=None, root=Store_Dir):
+    """
+    从清单中读取已存数据的最大trade_date，无需扫描数据文件
+
+    参数:
+    partition: 分区键（ts_code或年份），默认返回整个数据集的最大日期
+
+    返回:
+    str或None: YYYYMMDD字符串，数据集或分区不存在时返回None
+    """
+    meta = _read_meta(dataset, root)
+    if meta is None:
+        return None
+    marks = meta.get('high_water')
+    if marks is None:
+        # 旧版本写入的数据集没有高水位，扫描一次trade_date后补写清单
+        marks = {}
+        partition_by = meta['partition_by']
+        df = read_dataset(dataset, columns=['trade_date'] + ([partition_by] if partition_by != 'year' else []),
+                          root=root)
+        if 'trade_date' in df.columns and not df.empty:
+            marks = df.groupby(_partition_keys(df, partition_by))['trade_date'].max().to_dict()
+        with _meta_lock:
+            meta = _read_meta(dataset, root)
+            meta['high_water'] = marks
+            _write_meta(dataset, root, meta)
+    if partition is not None:
+        return marks.get(str(partition))
+    return max(marks.values()) if marks else None
+
+
+def append_dataset(df, dataset, keys=('ts_code', 'trade_date'), partition_by=None, root=Store_Dir):
+    """
+    增量追加：晚于分区高水位的行直接写为新文件，不读取已有数据；
+    不晚于高水位的行（补数或修正）才按主键合并重写所在分区
+
+    日常更新的读写量只与新增行数有关，与已存历史的长度无关
+
+    返回:
+    int: 写入的行数（本批按主键去重后）
+    """
+    if df.empty:
+        return 0
+    keys = [key for key in keys if key in df.columns]
+    df = df.copy()
+    df['trade_date'] = _normalize_date_column(df['trade_date'])
+    df = df.drop_duplicates(subset=keys, keep='last')
+
+    meta = _read_meta(dataset, root)
+    if meta is None:
+        return write_dataset(df, dataset, partition_by=partition_by, root=root)
+
+    high_water_mark(dataset, root=root)  # 确保清单中已有高水位
+    marks = _read_meta(dataset, root)['high_water']
+    mark = _partition_keys(df, meta['partition_by']).map(marks)
+    fresh = (mark.isna() | (df['trade_date'] > mark)).to_numpy()
+
+    if not fresh.all():
+        upsert_dataset(df[~fresh], dataset, keys=keys, root=root)
+    if fresh.any():
+        write_dataset(df[fresh], dataset, mode='append', root=root)
+    return len(df)
+
+
+def merge_ranges(ranges):
+    """合并重叠或首尾相接（相差一天）的日期区间，返回按起始日期排序的 [起始, 结束] 列表（YYYYMMDD）"""
+    merged = []
+    for start, end in sorted((normalize_date(start), normalize_date(end)) for start, end in ranges):
+        if merged:
+            next_day = (pd.Timestamp(merged[-1][1]) + pd.Timedelta(days=1)).strftime('%Y%m%d')
+            if start <= next_day:
+                merged[-1][1] = max(merged[-1][1], end)
+                continue
+        merged.append([start, end])
+    return merged
+
+
+def fetched_ranges(dataset, key, root=Store_Dir):
+    """
+    清单中记录的已拉取日期区间（含接口无数据的节假日），用于判断哪些日期无需再次请求
+
+    参数:
+    key (str): 区间所属的请求类别，如'1001.CB/1/10'
+
+    返回:
+    list: [起始, 结束] 列表；数据集或该类别没有记录时返回None
+    """
+    meta = _read_meta(dataset, root)
+    if meta is None:
+        return None
+    return meta.get('fetched', {}).get(key)
+
+
+def add_fetched_ranges(dataset, key, ranges, root=Store_Dir):
+    """把本次成功拉取的日期区间并入清单"""
+    with _meta_lock:
+        meta = _read_meta(dataset, root)
+        if meta is None:
+            return
+        fetched = meta.setdefault('fetched', {})
+        fetched[key] = merge_ranges(fetched.get(key, []) + [list(item) for item in ranges])
+        _write_meta(dataset, root, meta)
+
+
+def delete_dataset(dataset, root=Store_Dir):
+    """删除整个数据集"""
+    path = _dataset_dir(dataset, root)
+    if os.path.exists(path):
+        shutil.rmtree(path)
+
+
+def import_excel(file_path, dataset, sheet_name=0, ts_code=None, partition_by=None, root=Store_Dir):
+    """将已有的Excel文件导入数据集（用于迁移旧数据）"""
+    df = pd.read_excel(file_path, sheet_name=sheet_name)
+    if ts_code and 'ts_code' not in df.columns:
+        df['ts_code'] = ts_code
+    return upsert_dataset(df, dataset, partition_by=partition_by, root=root)
+
+
+def export_to_excel(dataset, file_path, sheet_by=None, sheet_name='Sheet1', root=Store_Dir, **read_kwargs):
+    """
+    将数据集显式导出为Excel
+
+    参数:
+    sheet_by (str): 按该列拆分工作表（如'ts_code'），默认全部写入sheet_name
+    read_kwargs: 传给read_dataset的过滤参数（columns、ts_codes、start_date、end_date）
+    """
+    df = read_dataset(dataset, root=root, **read_kwargs)
+    if sheet_by is None:
+        return dte.save_dataframe_to_excel(df=df, file_path=file_path, sheet_name=sheet_name)
+
+    if not file_path.endswith(('.xlsx', '.xls')):
+        file_path += '.xlsx'
+    dir_path = os.path.dirname(file_path)
+    if dir_path:
+        os.makedirs(dir_path, exist_ok=True)
+    with pd.ExcelWriter(file_path) as writer:
+        for key, group in df.groupby(sheet_by, sort=True):
+            group.to_excel(writer, sheet_name=str(key).split('.')[0], index=False)
+    print(f"数据成功保存到: {os.path.abspath(file_path)}")
+    return True
+
+
+# 示例用法：读取前复权日线（原始日线和复权因子由CalcuMaoTai.refresh_maotai_data写入，读取时复权）
+if __name__ == "__main__":
+    from com.example.tools import PriceAdjust
+
+    print(PriceAdjust.read_adjusted('stock_daily', 'adj_factor', adj='qfq', ts_codes=['600519.SH'],
+                                    start_date='20250101', columns=['ts_code', 'trade_date', 'close']).tail())
@@ -0,0 +1,242 @@
+import numpy as np
+import pandas as pd
+
+from com.example.tools import ApiCache, DataStore, FetchScheduler, TradingCalendar
+
+# 各接口单次返回的最大行数（返回行数达到上限时视为被截断，拆分区间重新请求）
+Row_Limits = {'yc_cb': 2000}
+Default_Row_Limit = 2000
+
+# 收益率曲线每个交易日的期限数（不指定curve_term时每日返回的行数），首次请求后按实际响应更新
+Tenors_Per_Day = {}
+Tenor_Guess = 20  # 期限数未知时，首个区间按此估算大小
+
+
+def _day(value):
+    return np.datetime64(pd.Timestamp(DataStore.normalize_date(value)).date(), 'D')
+
+
+def _text(day):
+    return pd.Timestamp(day).strftime('%Y%m%d')
+
+
+def _calendar(calendar, end_date):
+    return calendar or TradingCalendar.get_calendar(end_date=end_date)
+
+
+def business_days(start_date, end_date, calendar=None):
+    """区间内的交易日数（calendar默认共享的上交所日历）"""
+    return _calendar(calendar, end_date).count(start_date, end_date)
+
+
+def subtract_ranges(start_date, end_date, covered):
+    """
+    [start_date, end_date] 去掉已覆盖区间后剩余的区间
+
+    参数:
+    covered (list): [起始, 结束] 列表（YYYYMMDD）
+
+    返回:
+    list: 剩余的 [起始, 结束] 列表，按日期排序
+    """
+    start, end = _day(start_date), _day(end_date)
+    missing = []
+    for covered_start, covered_end in DataStore.merge_ranges(covered or []):
+        covered_start, covered_end = _day(covered_start), _day(covered_end)
+        if covered_end < start or covered_start > end:
+            continue
+        if covered_start > start:
+            missing.append([_text(start), _text(covered_start - 1)])
+        start = max(start, covered_end + 1)
+    if start <= end:
+        missing.append([_text(start), _text(end)])
+    return missing
+
+
+def chunk_range(start_date, end_date, rows_per_day, row_limit, calendar=None):
+    """
+    按每日行数把区间切成单次请求不超过row_limit行的子区间，子区间首尾相接覆盖整个区间；
+    不含交易日的区间（如周末、长假）不产生请求
+    """
+    calendar = _calendar(calendar, end_date)
+    max_days = max(int(row_limit // max(rows_per_day, 1)), 1)
+    days = calendar.range(start_date, end_date)
+    if len(days) == 0 and calendar.covers(end_date):
+        return []
+    start, end = _day(start_date), _day(end_date)
+    chunks = []
+    # 子区间包含max_days个交易日（及其后的休市日），日历未覆盖的尾部日期并入最后一个子区间
+    for first in range(max_days, len(days), max_days):
+        chunk_end = _day(days[first]) - 1
+        chunks.append([_text(start), _text(chunk_end)])
+        start = chunk_end + 1
+    chunks.append([_text(start), _text(end)])
+    return chunks
+
+
+def covered_end(df, start_date, end_date, calendar=None):
+    """
+    响应实际覆盖到的日期：最后一个有数据的日期之后（或空响应的整个区间内）仍有交易日时，
+    这些交易日的数据可能尚未发布，只记到最后一个有数据的日期（空响应返回None，不记录）
+
+    返回:
+    str或None: YYYYMMDD
+    """
+    calendar = _calendar(calendar, end_date)
+    last = DataStore._normalize_date_column(df['trade_date']).max() if not df.empty else None
+    rest_start = _text(_day(last) + 1) if last else start_date
+    if calendar.covers(end_date) and calendar.count(rest_start, end_date) == 0:
+        return DataStore.normalize_date(end_date)
+    return last
+
+
+def plan_requests(missing, terms, tenors_per_day=None, row_limit=Default_Row_Limit, calendar=None):
+    """
+    为缺失区间规划请求：比较「一次取全部期限」与「逐个期限请求」的调用次数，取较少者
+
+    参数:
+    missing (list): 缺失的 [起始, 结束] 区间
+    terms (list): 需要的期限
+    tenors_per_day (float): 全部期限时每日行数，None表示未知（按Tenor_Guess估算并取全部期限）
+    calendar (TradingCalendar): 交易日历，默认共享的上交所日历
+
+    返回:
+    list: 请求列表，每项为 {'start_date', 'end_date', 'curve_term'}，curve_term为None表示全部期限
+    """
+    density = tenors_per_day or Tenor_Guess
+    all_tenors = [chunk for start, end in missing
+                  for chunk in chunk_range(start, end, density, row_limit, calendar)]
+    per_term = [chunk for start, end in missing for chunk in chunk_range(start, end, 1, row_limit, calendar)]
+    if tenors_per_day is not None and len(per_term) * len(terms) < len(all_tenors):
+        return [{'start_date': start, 'end_date': end, 'curve_term': term}
+                for term in terms for start, end in per_term]
+    return [{'start_date': start, 'end_date': end, 'curve_term': None} for start, end in all_tenors]
+
+
+def _term_key(ts_code, curve_type, term):
+    return f"{ts_code}/{curve_type}/{term:g}"
+
+
+def _column(term):
+    return f"{term:g}Y_YTM"
+
+
+def _legacy_ranges(dataset, terms, root):
+    """早期写入、清单中没有拉取区间的数据集：以各期限列已有数据的首末日期作为已覆盖区间"""
+    columns = [_column(term) for term in terms]
+    df = DataStore.read_dataset(dataset, root=root)
+    covered = {}
+    for term, column in zip(terms, columns):
+        if column in df.columns and df[column].notna().any():
+            dates = df.loc[df[column].notna(), 'trade_date']
+            covered[term] = [[dates.min(), dates.max()]]
+    return covered
+
+
+def missing_ranges(start_date, end_date, terms, ts_code='1001.CB', curve_type='1', dataset=None,
+                   root=DataStore.Store_Dir):
+    """需要的日期区间减去数据集已拉取的区间（任一期限缺失的日期都计入）"""
+    if dataset is None or not DataStore.dataset_exists(dataset, root=root):
+        return [[DataStore.normalize_date(start_date), DataStore.normalize_date(end_date)]]
+    coverage = {term: DataStore.fetched_ranges(dataset, _term_key(ts_code, curve_type, term), root=root)
+                for term in terms}
+    unknown = [term for term, ranges in coverage.items() if ranges is None]
+    if unknown:
+        coverage.update(_legacy_ranges(dataset, unknown, root))
+    missing = [item for term in terms for item in subtract_ranges(start_date, end_date, coverage.get(term))]
+    return DataStore.merge_ranges(missing)
+
+
+def pivot_curve(frames, terms):
+    """把各次响应合并后一次透视为 trade_date × 期限 的宽表，列名为'{期限}Y_YTM'"""
+    columns = ['trade_date'] + [_column(term) for term in terms]
+    frames = [df for df in frames if df is not None and not df.empty]
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    df = pd.concat(frames, ignore_index=True)
+    df['curve_term'] = pd.to_numeric(df['curve_term'], errors='coerce').round(4)
+    df = df[df['curve_term'].isin([round(float(term), 4) for term in terms])]
+    wide = df.pivot_table(index='trade_date', columns='curve_term', values='yield', aggfunc='last')
+    wide = wide.reindex(columns=[round(float(term), 4) for term in terms])
+    wide.columns = [_column(term) for term in terms]
+    return wide.sort_index().reset_index().reindex(columns=columns)
+
+
+def fetch_yield_curve(start_date, end_date, terms=(1, 3, 5, 10), ts_code='1001.CB', curve_type='1',
+                      dataset=None, client=None, scheduler=None, row_limit=None, calendar=None,
+                      root=DataStore.Store_Dir):
+    """
+    按规划拉取收益率曲线
+
+    - 指定dataset时先扣除数据集已拉取的区间，只请求缺失部分
+    - 每次请求取全部期限（或在逐期限更省调用时按期限请求），区间大小按接口行数上限和交易日历确定，
+      不含交易日的缺失区间不请求
+    - 响应达到行数上限时拆分区间重新请求；首次响应后按实际每日期限数重新规划剩余区间
+    - 全部响应合并后一次透视为宽表
+
+    返回:
+    tuple: (宽表DataFrame, {期限: 本次成功拉取且有数据的区间列表})，数据写入后用record_fetched记录区间
+    """
+    client = client or ApiCache.lazy_client()
+    scheduler = scheduler or FetchScheduler.get_scheduler()
+    calendar = _calendar(calendar, end_date)
+    row_limit = row_limit or Row_Limits.get('yc_cb', Default_Row_Limit)
+    terms = list(terms)
+    curve_key = (ts_code, str(curve_type))
+    fetched = {term: [] for term in terms}
+    frames = []
+
+    missing = missing_ranges(start_date, end_date, terms, ts_code, curve_type, dataset, root)
+    pending = plan_requests(missing, terms, Tenors_Per_Day.get(curve_key), row_limit, calendar)
+    calls = 0
+    while pending:
+        # 每日期限数未知时先单独请求一个区间，据此确定其余区间的大小
+        if Tenors_Per_Day.get(curve_key) is None and pending[0]['curve_term'] is None:
+            batch, pending = pending[:1], pending[1:]
+        else:
+            batch, pending = pending, []
+        tasks = {}
+        for request in batch:
+            params = {'ts_code': ts_code, 'curve_type': str(curve_type),
+                      'start_date': request['start_date'], 'end_date': request['end_date']}
+            if request['curve_term'] is not None:
+                params['curve_term'] = request['curve_term']
+            tasks[(request['start_date'], request['end_date'], request['curve_term'])] = params
+
+        for (start, end, term), df, error in scheduler.imap(None, client.yc_cb, tasks):
+            calls += 1
+            if error is not None:
+                print(f"获取收益率曲线出错({start}至{end}, 期限{term if term is not None else '全部'}): {error}")
+                continue
+            if len(df) >= row_limit and start < end:
+                # 被截断：对半拆分后重新请求
+                middle = _day(start) + (_day(end) - _day(start)) // 2
+                pending += [{'start_date': start, 'end_date': _text(middle), 'curve_term': term},
+                            {'start_date': _text(middle + 1), 'end_date': end, 'curve_term': term}]
+                continue
+            if term is None and not df.empty:
+                observed = len(df) / max(df['trade_date'].nunique(), 1)
+                if Tenors_Per_Day.get(curve_key) is None:
+                    Tenors_Per_Day[curve_key] = observed
+                    # 按实际期限数重新规划尚未发出的请求
+                    rest = DataStore.merge_ranges([[item['start_date'], item['end_date']] for item in pending])
+                    pending = plan_requests(rest, terms, observed, row_limit, calendar)
+                else:
+                    Tenors_Per_Day[curve_key] = max(Tenors_Per_Day[curve_key], observed)
+            frames.append(df)
+            # 只记录有数据（或不含交易日）的部分，尚未发布的交易日下次重新请求
+            covered = covered_end(df, start, end, calendar)
+            if covered is None:
+                continue
+            for covered_term in (terms if term is None else [term]):
+                fetched[covered_term].append([start, covered])
+
+    print(f"收益率曲线: {len(missing)} 个缺失区间，共 {calls} 次请求")
+    return pivot_curve(frames, terms), fetched
+
+
+def record_fetched(dataset, fetched, ts_code='1001.CB', curve_type='1', root=DataStore.Store_Dir):
+    """把fetch_yield_curve成功拉取的区间记入数据集清单（数据写入之后调用）"""
+    for term, ranges in fetched.items():
+        if ranges:
+            DataStore.add_fetched_ranges(dataset, _term_key(ts_code, curve_type, term), ranges, root=root)
@@ -0,0 +1,160 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# 各接口每分钟调用次数上限（未列出的接口使用default）
+Rate_Limits = {
+    'yc_cb': 2,
+    'default': 200,
+}
+
+# 触发频率限制时Tushare返回的错误信息关键字
+Quota_Error_Keywords = ('每分钟最多访问', '每小时最多访问', '频率', 'rate limit', 'too many requests')
+
+
+def is_quota_error(error):
+    """判断异常是否为接口频率/配额超限"""
+    message = str(error).lower()
+    return any(keyword in message for keyword in Quota_Error_Keywords)
+
+
+class TokenBucket:
+    """令牌桶限流器（线程安全）"""
+
+    def __init__(self, rate, per=60.0, burst=1):
+        """
+        参数:
+        rate (float): 每per秒允许的调用次数
+        per (float): 时间窗口（秒），默认60秒
+        burst (int): 桶容量，即允许的瞬时并发调用数，默认1（调用均匀分布）
+        """
+        self.fill_rate = rate / per
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.fill_rate)
+        self.updated = now
+
+    def acquire(self):
+        """获取一个令牌，令牌不足时阻塞等待"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self.blocked_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = max(self.blocked_until - now, (1 - self.tokens) / self.fill_rate)
+            time.sleep(wait)
+
+    def penalize(self, seconds):
+        """触发限流后清空令牌并暂停发放seconds秒"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = 0.0
+            self.updated = now
+            self.blocked_until = max(self.blocked_until, now + seconds)
+
+
+class FetchScheduler:
+    """
+    并发拉取调度器：每个接口一个令牌桶，相互独立的请求在线程池中并发执行，
+    触发频率限制时对该接口退避后重试
+    """
+
+    def __init__(self, max_workers=8, rate_limits=None, max_retries=5, backoff=5.0, max_backoff=120.0):
+        """
+        参数:
+        max_workers (int): 线程池大小
+        rate_limits (dict): {接口名: 每分钟调用次数}，覆盖Rate_Limits中的默认值
+        max_retries (int): 频率超限时的最大重试次数
+        backoff (float): 首次退避秒数，之后按指数增长
+        max_backoff (float): 单次退避的最大秒数
+        """
+        self.rate_limits = dict(Rate_Limits)
+        self.rate_limits.update(rate_limits or {})
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='fetch')
+
+    def set_rate_limit(self, endpoint, rate, per=60.0, burst=1):
+        """设置某个接口的调用频率"""
+        with self._lock:
+            self.rate_limits[endpoint] = rate
+            self._buckets[endpoint] = TokenBucket(rate, per=per, burst=burst)
+
+    def _bucket(self, endpoint):
+        with self._lock:
+            if endpoint not in self._buckets:
+                rate = self.rate_limits.get(endpoint, self.rate_limits['default'])
+                self._buckets[endpoint] = TokenBucket(rate)
+            return self._buckets[endpoint]
+
+    def call(self, endpoint, fn, *args, **kwargs):
+        """
+        在当前线程中按频率限制调用fn，频率超限时退避重试
+
+        参数:
+        endpoint (str): 接口名（用于选择令牌桶），为None时不限流
+        fn (callable): 实际发起请求的函数
+        """
+        bucket = self._bucket(endpoint) if endpoint else None
+        for attempt in range(self.max_retries + 1):
+            if bucket:
+                bucket.acquire()
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                if not is_quota_error(e) or attempt == self.max_retries:
+                    raise
+                wait = min(self.backoff * 2 ** attempt, self.max_backoff)
+                print(f"{endpoint} 触发频率限制，{wait:.0f}秒后重试({attempt + 1}/{self.max_retries}): {e}")
+                if bucket:
+                    bucket.penalize(wait)
+                else:
+                    time.sleep(wait)
+
+    def submit(self, endpoint, fn, *args, **kwargs):
+        """提交到线程池异步执行，返回Future"""
+        return self._executor.submit(self.call, endpoint, fn, *args, **kwargs)
+
+    def imap(self, endpoint, fn, tasks):
+        """
+        并发执行一组相互独立的请求，按完成顺序逐个返回结果
+
+        参数:
+        tasks (dict): {任务键: 传给fn的关键字参数dict}
+
+        返回:
+        生成器，依次产生 (任务键, 结果, 异常)，成功时异常为None，失败时结果为None
+        """
+        futures = {self.submit(endpoint, fn, **kwargs): key for key, kwargs in tasks.items()}
+        for future in as_completed(futures):
+            key = futures[future]
+            try:
+                yield key, future.result(), None
+            except Exception as e:
+                yield key, None, e
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+
+_shared_scheduler = None
+_shared_lock = threading.Lock()
+
+
+def get_scheduler():
+    """获取全局共享的调度器（各模块共用同一组令牌桶）"""
+    global _shared_scheduler
+    with _shared_lock:
+        if _shared_scheduler is None:
+            _shared_scheduler = FetchScheduler()
+        return _shared_scheduler
@@ -0,0 +1,199 @@
+import numpy as np
+import pandas as pd
+
+from com.example.tools import ApiCache, DataStore, FetchScheduler
+
+# 报表 → (按报告期拉取全市场的接口, 数据集)
+Statements = {
+    'fina_indicator': ('fina_indicator_vip', 'pit_fina_indicator'),
+    'income': ('income_vip', 'pit_income'),
+    'balancesheet': ('balancesheet_vip', 'pit_balancesheet'),
+    'cashflow': ('cashflow_vip', 'pit_cashflow'),
+}
+# 同一份报表（代码、报告期、报表类型）的不同版本以公告日区分，全部保留
+Statement_Keys = ('ts_code', 'end_date', 'report_type')
+Version_Keys = Statement_Keys + ('ann_date', 'f_ann_date', 'update_flag')
+Text_Columns = ('ts_code', 'ann_date', 'f_ann_date', 'end_date', 'report_type', 'comp_type', 'end_type',
+                'update_flag', 'trade_date')
+Page_Size = 5000
+
+
+def _dates(series):
+    """YYYYMMDD字符串列，空值为None"""
+    text = DataStore._normalize_date_column(series.where(series.notna(), ''))
+    return text.where(text.str.fullmatch(r'\d{8}'), None)
+
+
+def known_dates(df):
+    """
+    各版本的可用日期：实际公告日f_ann_date，缺失时为公告日ann_date（YYYYMMDD字符串，均缺失时为None）
+    """
+    if 'f_ann_date' not in df.columns and 'ann_date' not in df.columns:
+        raise ValueError("报表中必须包含'ann_date'或'f_ann_date'列")
+    known = _dates(df['f_ann_date']) if 'f_ann_date' in df.columns else pd.Series(None, index=df.index)
+    if 'ann_date' in df.columns:
+        known = known.fillna(_dates(df['ann_date']))
+    return known
+
+
+def _keys(df, keys):
+    return [key for key in keys if key in df.columns]
+
+
+def _by_availability(df):
+    """按可用日期排序（同日的多个版本以update_flag靠后者为新）"""
+    df = df.assign(_known=known_dates(df))
+    df = df[df['_known'].notna()]
+    order = ['_known'] + (['update_flag'] if 'update_flag' in df.columns else [])
+    return df.sort_values(order, kind='stable')
+
+
+def point_in_time(df, as_of_date):
+    """
+    as_of_date当时已经公布的报表：去掉之后才公布的版本，同一份报表保留当时最新的版本
+
+    参数:
+    df (pd.DataFrame): 报表的各个版本，需包含ann_date或f_ann_date
+    as_of_date (str): 时点
+
+    返回:
+    pd.DataFrame: 每份报表一行
+    """
+    df = _by_availability(df)
+    df = df[df['_known'] <= DataStore.normalize_date(as_of_date)]
+    return df.drop_duplicates(_keys(df, Statement_Keys), keep='last').drop(columns='_known')
+
+
+def as_of(queries, versions, fields=None, date_column='trade_date', period=None, report_type='1'):
+    """
+    面板的as-of连接：queries每行 (ts_code, 日期) 取该日已经公布的最新一期报表（报告期最新，同一报告期取最新版本），
+    全部查询与全部版本各排序一次后由一次merge_asof完成
+
+    参数:
+    queries (pd.DataFrame): 包含ts_code和date_column列，如 股票×调仓日 的面板
+    versions (pd.DataFrame): 报表的各个版本（接口返回的原始数据或load_versions读取的数据）
+    fields (list): 需要的字段，默认全部
+    date_column (str): queries中的日期列
+    period (str): 'annual'只看年报（end_date为1231），默认全部报告期
+    report_type (str): 只看该报表类型（默认'1'合并报表），None或数据中没有report_type列时不过滤
+
+    返回:
+    pd.DataFrame: 与queries行序一致，包含ts_code、date_column、end_date、ann_date以及fields；当时尚无报表的行为NaN
+    """
+    versions = versions.drop(columns=['trade_date'], errors='ignore')
+    if period == 'annual':
+        versions = versions[versions['end_date'].astype(str).str.endswith('1231')]
+    if report_type is not None and 'report_type' in versions.columns:
+        versions = versions[versions['report_type'].astype(str) == str(report_type)]
+    versions = _by_availability(versions)
+    versions = versions.sort_values('ts_code', kind='stable')  # 代码内仍按可用日期有序
+
+    # 某代码已有更新报告期时才公布的旧报告期修订，不改变"最新一期"，不参与连接
+    end = versions['end_date'].astype(np.int64)
+    versions = versions[(end >= end.groupby(versions['ts_code'].to_numpy()).cummax()).to_numpy()]
+
+    columns = ['end_date'] + [name for name in ('ann_date', 'f_ann_date') if name in versions.columns]
+    columns += [name for name in (fields or versions.columns) if name not in columns + ['ts_code', '_known']]
+    right = versions[['ts_code'] + columns].assign(_on=versions['_known'].astype(np.int64).to_numpy())
+    left = pd.DataFrame({'ts_code': queries['ts_code'].to_numpy(),
+                         '_on': DataStore._normalize_date_column(queries[date_column]).astype(np.int64).to_numpy(),
+                         '_row': np.arange(len(queries))})
+    merged = pd.merge_asof(left.sort_values('_on', kind='stable'), right.sort_values('_on', kind='stable'),
+                           on='_on', by='ts_code', direction='backward')
+    merged = merged.sort_values('_row').reset_index(drop=True)
+    result = queries[['ts_code', date_column]].reset_index(drop=True)
+    return pd.concat([result, merged[columns]], axis=1)
+
+
+def _clean(df):
+    """数值列统一为float64，文本列统一为字符串（不同批次写入的文件列类型一致）"""
+    df = df.copy()
+    for name in df.columns:
+        if name in Text_Columns:
+            df[name] = df[name].map(lambda value: None if pd.isna(value) else str(value))
+        else:
+            df[name] = pd.to_numeric(df[name], errors='coerce').astype(np.float64)
+    return df
+
+
+def store_statements(df, name, root=DataStore.Store_Dir):
+    """
+    把报表的全部版本写入数据集：trade_date列为可用日期（f_ann_date或ann_date），按年份分区，
+    相同版本（Version_Keys）去重，修订版本作为新行保留
+
+    返回:
+    int: 写入的行数
+    """
+    if df is None or df.empty:
+        return 0
+    df = df.assign(trade_date=known_dates(df))
+    df = _clean(df[df['trade_date'].notna()])
+    return DataStore.append_dataset(df, Statements[name][1], keys=_keys(df, Version_Keys) + ['trade_date'],
+                                    partition_by='year', root=root)
+
+
+def load_versions(name, as_of_date=None, ts_codes=None, columns=None, root=DataStore.Store_Dir):
+    """
+    读取报表的各个版本；指定as_of_date时只读取当时已经公布的版本（按可用日期下推过滤）
+
+    返回:
+    pd.DataFrame: 按可用日期升序
+    """
+    if columns is not None:
+        columns = list(dict.fromkeys(list(Version_Keys) + ['trade_date'] + list(columns)))
+        # 只保留数据集中存在的键列（各报表的键列不完全相同），按年份分区时该查询不读取任何文件
+        existing = DataStore.read_dataset(Statements[name][1], end_date='00000000', root=root).columns
+        columns = [column for column in columns if column in existing]
+    return DataStore.read_dataset(Statements[name][1], columns=columns, ts_codes=ts_codes, end_date=as_of_date,
+                                  root=root)
+
+
+def report_periods(start_date, end_date):
+    """[start_date, end_date]内的报告期（季度末）"""
+    start_date, end_date = DataStore.normalize_date(start_date), DataStore.normalize_date(end_date)
+    periods = [f"{year}{month_day}" for year in range(int(start_date[:4]), int(end_date[:4]) + 1)
+               for month_day in ('0331', '0630', '0930', '1231')]
+    return [period for period in periods if start_date <= period <= end_date]
+
+
+def _fetch_period(client, scheduler, api_name, period):
+    frames, offset = [], 0
+    while True:
+        df = scheduler.call(api_name, client.query, api_name, period=period, limit=Page_Size, offset=offset)
+        frames.append(df)
+        if df is None or len(df) < Page_Size:
+            break
+        offset += Page_Size
+    frames = [df for df in frames if df is not None and not df.empty]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def ingest(periods, names=tuple(Statements), client=None, scheduler=None, root=DataStore.Store_Dir):
+    """
+    按报告期拉取全市场报表（*_vip接口）并写入时点数据集，已有版本去重、新公布的修订追加。
+    历史报告期也会发布更正，因此不经过响应缓存，直接请求原始客户端（仍由调度器按接口限流）
+
+    参数:
+    periods (list): 报告期，如report_periods('20200101', '20250731')
+    names (tuple): Statements中的报表
+    client: 原始pro_api()客户端，默认ApiCache.pro_api()
+
+    返回:
+    dict: {报表: 写入的行数}
+    """
+    client = client or ApiCache.pro_api()
+    scheduler = scheduler or FetchScheduler.get_scheduler()
+    tasks = {(name, period): {'api_name': Statements[name][0], 'period': period}
+             for name in names for period in periods}
+    frames = {name: [] for name in names}
+
+    def fetch(api_name, period):
+        return _fetch_period(client, scheduler, api_name, period)
+
+    for (name, period), df, error in scheduler.imap(None, fetch, tasks):
+        if error is not None:
+            print(f"获取 {name} {period} 报表出错: {error}")
+        elif not df.empty:
+            frames[name].append(df)
+    return {name: store_statements(pd.concat(dfs, ignore_index=True), name, root=root) if dfs else 0
+            for name, dfs in frames.items()}
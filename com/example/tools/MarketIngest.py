@@ -0,0 +1,190 @@
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+from com.example.tools import ApiCache, DataStore, FetchScheduler, PanelCache, TradingCalendar
+
+# 按交易日拉取全市场截面的接口 → 数据集（按年份分区，每个交易日的截面追加为新文件）
+Endpoints = {
+    'daily': 'market_daily',
+    'adj_factor': 'market_adj_factor',
+    'daily_basic': 'market_daily_basic',
+    'fund_daily': 'fund_market_daily',
+    'fund_adj': 'fund_market_adj',
+}
+Stock_Endpoints = ('daily', 'adj_factor', 'daily_basic')
+Fund_Endpoints = ('fund_daily', 'fund_adj')
+
+# 各接口单次返回的最大行数，截面达到上限时按offset翻页
+Page_Limits = {'daily': 6000, 'adj_factor': 6000, 'daily_basic': 6000, 'fund_daily': 2000, 'fund_adj': 2000}
+Default_Page_Limit = 2000
+
+# 构建 代码×日期 面板时的数值列（未列出的接口使用PanelCache.Default_Columns）
+Panel_Columns = {
+    'adj_factor': ('adj_factor',),
+    'fund_adj': ('adj_factor',),
+    'daily_basic': ('close', 'turnover_rate', 'turnover_rate_f', 'volume_ratio', 'pe', 'pe_ttm', 'pb', 'ps',
+                    'ps_ttm', 'dv_ratio', 'dv_ttm', 'total_share', 'float_share', 'free_share', 'total_mv',
+                    'circ_mv'),
+}
+
+Fetched_Key = 'trade_date'  # 清单中记录已拉取交易日区间的键
+Update_Days = 10  # update()默认回看的自然日数，覆盖周末、长假后的补数
+Key_Columns = ('ts_code', 'trade_date', 'ann_date', 'end_date')
+
+
+def trading_days(start_date, end_date, calendar=None):
+    """
+    区间内的交易日（calendar默认共享的上交所日历），休市日不发请求
+
+    返回:
+    list: 升序的YYYYMMDD字符串
+    """
+    calendar = calendar or TradingCalendar.get_calendar(end_date=end_date)
+    return calendar.dates(start_date, end_date)
+
+
+def missing_days(endpoint, days, root=DataStore.Store_Dir):
+    """交易日中尚未拉取过截面的日期（清单中已记录的区间，包括接口返回为空的日期，不再请求）"""
+    covered = DataStore.fetched_ranges(Endpoints[endpoint], Fetched_Key, root=root) or []
+    values = np.asarray(days, dtype=np.int64)
+    done = np.zeros(len(values), dtype=bool)
+    for start, end in covered:
+        done |= (values >= int(start)) & (values <= int(end))
+    return [day for day, skip in zip(days, done) if not skip]
+
+
+def day_runs(done, days):
+    """
+    把已拉取的交易日压缩为区间：交易日序列中连续的日期记为一个 [起始, 结束]，
+    区间内的非交易日本来就没有数据，一并视为已覆盖，清单不随天数增长
+    """
+    calendar = np.asarray(days, dtype=np.int64)
+    positions = np.sort(np.searchsorted(calendar, np.asarray(done, dtype=np.int64)))
+    if len(positions) == 0:
+        return []
+    breaks = np.flatnonzero(np.diff(positions) != 1)
+    starts = np.concatenate([[0], breaks + 1])
+    ends = np.concatenate([breaks, [len(positions) - 1]])
+    return [[days[positions[i]], days[positions[j]]] for i, j in zip(starts, ends)]
+
+
+def _clean(df, trade_date):
+    """统一trade_date，数值列转为float64（不同交易日的文件列类型一致，数据集可以整体扫描）"""
+    df = df.copy()
+    if 'trade_date' not in df.columns:
+        df['trade_date'] = trade_date
+    for name in df.columns:
+        if name not in Key_Columns and df[name].dtype != object:
+            df[name] = pd.to_numeric(df[name], errors='coerce').astype(np.float64)
+    return df
+
+
+def fetch_day(endpoint, trade_date, client=None, page_limit=None):
+    """
+    拉取一个交易日的全市场截面，返回行数达到上限时按offset继续请求
+
+    返回:
+    pd.DataFrame: 该交易日的全部行
+    """
+    client = client or ApiCache.lazy_client()
+    page_limit = page_limit or Page_Limits.get(endpoint, Default_Page_Limit)
+    api = getattr(client, endpoint)
+    pages = [api(trade_date=trade_date)]
+    while pages[-1] is not None and len(pages[-1]) >= page_limit:
+        pages.append(api(trade_date=trade_date, offset=sum(len(page) for page in pages), limit=page_limit))
+    pages = [page for page in pages if page is not None and not page.empty]
+    if not pages:
+        return pd.DataFrame()
+    return _clean(pd.concat(pages, ignore_index=True), trade_date)
+
+
+def _flush(endpoint, frames, done, days, root):
+    """写入一个（接口, 年份）的全部截面并记入已拉取区间，中断后重跑只请求未完成的年份和日期"""
+    dataset = Endpoints[endpoint]
+    frames = [df for df in frames if not df.empty]
+    rows = 0
+    if frames:
+        rows = DataStore.append_dataset(pd.concat(frames, ignore_index=True), dataset, partition_by='year',
+                                        root=root)
+    if done:
+        DataStore.add_fetched_ranges(dataset, Fetched_Key, day_runs(done, days), root=root)
+    return rows
+
+
+def ingest(start_date, end_date=None, endpoints=Stock_Endpoints + Fund_Endpoints, client=None, scheduler=None,
+           calendar=None, root=DataStore.Store_Dir):
+    """
+    按交易日拉取全市场截面写入数据仓库：每个接口每个交易日一次请求（不按代码逐个请求），
+    多年的回补在调度器的限流下并发进行，每个（接口, 年份）的截面全部到达后一次写入
+
+    参数:
+    start_date, end_date (str): 日期区间，end_date默认今天
+    endpoints (tuple): 需要拉取的接口，Endpoints中的键
+    calendar (TradingCalendar): 交易日历，默认共享的上交所日历
+
+    返回:
+    dict: {接口: 写入的行数}
+    """
+    client = client or ApiCache.lazy_client()
+    scheduler = scheduler or FetchScheduler.get_scheduler()
+    end_date = end_date or TradingCalendar.today()
+    days = trading_days(start_date, end_date, calendar)
+    missing = {endpoint: set(missing_days(endpoint, days, root)) for endpoint in endpoints}
+
+    # 按日期在外、接口在内排列任务，同一年份各接口的截面大致同时到齐，缓冲的数据量不超过约一年
+    tasks = {}
+    pending = defaultdict(int)
+    for day in days:
+        for endpoint in endpoints:
+            if day in missing[endpoint]:
+                tasks[(endpoint, day)] = {'api_name': endpoint, 'trade_date': day}
+                pending[(endpoint, day[:4])] += 1
+
+    frames, done = defaultdict(list), defaultdict(list)
+    written = {endpoint: 0 for endpoint in endpoints}
+    today = TradingCalendar.today()
+
+    def fetch(api_name, trade_date):
+        return fetch_day(api_name, trade_date, client=client)
+
+    for (endpoint, day), df, error in scheduler.imap(None, fetch, tasks):
+        bucket = (endpoint, day[:4])
+        pending[bucket] -= 1
+        if error is not None:
+            print(f"获取 {endpoint} {day} 截面出错: {error}")
+        else:
+            frames[bucket].append(df)
+            # 当天的截面可能尚未发布，返回为空时不记为已拉取，下次更新再请求
+            if not df.empty or day < today:
+                done[bucket].append(day)
+        if pending[bucket] == 0:
+            written[endpoint] += _flush(endpoint, frames.pop(bucket, []), done.pop(bucket, []), days, root)
+
+    print(f"全市场截面: {len(days)} 个交易日，共 {len(tasks)} 次截面请求，写入 {sum(written.values())} 行")
+    return written
+
+
+def update(end_date=None, days=Update_Days, endpoints=Stock_Endpoints + Fund_Endpoints, client=None,
+           scheduler=None, calendar=None, root=DataStore.Store_Dir):
+    """日常更新：回看最近days个自然日，只请求尚未拉取的交易日（通常每个接口一次调用）"""
+    end_date = DataStore.normalize_date(end_date) or TradingCalendar.today()
+    return ingest(TradingCalendar.shift_days(end_date, -days), end_date, endpoints=endpoints, client=client,
+                  scheduler=scheduler, calendar=calendar, root=root)
+
+
+def load_panel(endpoint, cache_dir=PanelCache.Cache_Dir, root=DataStore.Store_Dir):
+    """
+    接口对应的 代码×日期 面板（内存映射，数据集有写入时才重新构建）
+
+    返回:
+    PanelCache.Panel或None: 尚未拉取过该接口时返回None
+    """
+    return PanelCache.load_dataset(Endpoints[endpoint], cache_dir=cache_dir, columns=Panel_Columns.get(endpoint),
+                                   root=root)
+
+
+if __name__ == '__main__':
+    # 回补近五年全市场日线、复权因子、每日指标及场内基金日线
+    ingest('20200101')
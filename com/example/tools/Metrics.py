@@ -0,0 +1,400 @@
+import warnings
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+Trading_Days = 252  # 年化使用的每年交易日数
+
+
+def _as_matrix(returns):
+    """收益率统一为 日期×标的 的float64矩阵，返回 (矩阵, 日期索引, 标的名称)"""
+    if isinstance(returns, pd.Series):
+        return returns.to_numpy(dtype=np.float64)[:, None], returns.index, [returns.name or 0]
+    if isinstance(returns, pd.DataFrame):
+        return returns.to_numpy(dtype=np.float64), returns.index, list(returns.columns)
+    values = np.asarray(returns, dtype=np.float64)
+    if values.ndim == 1:
+        values = values[:, None]
+    return values, pd.RangeIndex(values.shape[0]), list(range(values.shape[1]))
+
+
+def wealth_curve(returns):
+    """累计净值（从1开始复利），缺失收益（未上市、停牌）按0处理"""
+    values, _, _ = _as_matrix(returns)
+    wealth = np.nan_to_num(values)
+    wealth += 1
+    return np.cumprod(wealth, axis=0, out=wealth)
+
+
+def drawdown_matrix(returns):
+    """回撤序列：1 - 净值 / 历史最高净值"""
+    return _drawdown(wealth_curve(returns))
+
+
+def _drawdown(wealth):
+    peak = np.maximum.accumulate(wealth, axis=0)
+    np.divide(wealth, peak, out=peak)
+    np.subtract(1, peak, out=peak)
+    return peak
+
+
+def _durations(peak, end, index):
+    """回撤持续期：有日期索引时为自然日数，否则为K线数"""
+    if isinstance(index, pd.DatetimeIndex):
+        dates = index.to_numpy().astype('datetime64[D]').astype(np.int64)
+        return dates[end] - dates[peak]
+    return end - peak
+
+
+def _episodes(drawdown, index, troughs=True):
+    """
+    在回撤矩阵上一次性识别全部回撤区间（净值低于前高的连续K线）
+
+    troughs为False时不计算谷底和深度（只需持续期时更快）
+
+    返回:
+    dict: 各区间的标的序号、前高/谷底/修复位置、深度和持续期（numpy数组）
+    """
+    n_dates = drawdown.shape[0]
+    underwater = drawdown.T > 0  # 标的×日期，按行展开后每个标的的序列连续
+    cells = np.flatnonzero(underwater)
+    if len(cells) == 0:
+        empty = np.array([], dtype=np.int64)
+        return {'asset': empty, 'peak': empty, 'trough': empty, 'recovery': empty,
+                'recovered': np.array([], dtype=bool), 'depth': np.array([]), 'bars': empty, 'duration': empty}
+    # 首根K线不会低于前高，因此连续的展开位置不会跨越两个标的
+    starts = np.flatnonzero(np.r_[True, np.diff(cells) != 1])
+    lengths = np.diff(np.r_[starts, len(cells)])
+
+    start_cell = cells[starts]
+    last_cell = cells[starts + lengths - 1]
+    asset = start_cell // n_dates
+    peak = start_cell % n_dates - 1
+    last = last_cell % n_dates
+    recovered = last + 1 < n_dates
+    end = np.where(recovered, last + 1, last)
+    episodes = {
+        'asset': asset,
+        'peak': peak,
+        'recovery': end,
+        'recovered': recovered,
+        'bars': end - peak,
+        'duration': _durations(peak, end, index),
+    }
+    if troughs:
+        # 每个区间的最大回撤及其首次出现的位置（谷底）
+        flat = drawdown.T.ravel()[cells]
+        depth = np.maximum.reduceat(flat, starts)
+        deepest = np.flatnonzero(flat == np.repeat(depth, lengths))
+        deepest = deepest[np.r_[True, np.diff(np.searchsorted(starts, deepest, side='right')) != 0]]
+        episodes['trough'] = cells[deepest] % n_dates
+        episodes['depth'] = depth
+    return episodes
+
+
+def drawdown_episodes(returns):
+    """
+    全部标的的回撤区间明细
+
+    参数:
+    returns: 日收益率（小数），Series、DataFrame（日期×标的）或二维数组
+
+    返回:
+    pd.DataFrame: 每个回撤区间一行，包含标的、前高日、谷底日、修复日（未修复为NaT/None）、
+                  最大回撤深度、持续K线数和持续期（有日期索引时为自然日），按标的和前高日排序
+    """
+    values, index, names = _as_matrix(returns)
+    episodes = _episodes(drawdown_matrix(values), index)
+    labels = np.asarray(index)
+    recovery = pd.Series(labels[episodes['recovery']]).where(episodes['recovered'])
+    return pd.DataFrame({
+        'asset': np.asarray(names, dtype=object)[episodes['asset']],
+        'peak': labels[episodes['peak']],
+        'trough': labels[episodes['trough']],
+        'recovery': recovery.to_numpy(),
+        'depth': episodes['depth'],
+        'bars': episodes['bars'],
+        'duration': episodes['duration'],
+    })
+
+
+def summarize(returns, periods_per_year=Trading_Days, risk_free=0.0):
+    """
+    一次向量化计算全部标的（或全部回测结果）的绩效指标
+
+    参数:
+    returns: 日收益率（小数），Series、DataFrame（日期×标的）或二维数组；缺失值视为无数据，不参与统计
+    periods_per_year (int): 年化周期数
+    risk_free (float): 年化无风险利率，用于夏普、索提诺比率
+
+    返回:
+    pd.DataFrame: 每个标的一行，列为
+        total_return 总收益率、cagr 年化复合收益率、volatility 年化波动率、
+        sharpe 夏普比率、sortino 索提诺比率（下行偏差取全部收益低于无风险收益部分的均方根）、
+        calmar 卡玛比率（cagr / 最大回撤）、max_drawdown 最大回撤、
+        max_drawdown_duration 最长回撤持续期（有日期索引时为自然日，否则为K线数，未修复的回撤计至最后一日）
+    """
+    values, index, names = _as_matrix(returns)
+    valid = ~np.isnan(values)
+    count = valid.sum(axis=0)
+
+    wealth = wealth_curve(values)
+    total_return = wealth[-1] - 1
+    with np.errstate(invalid='ignore', divide='ignore'), warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # 全部缺失的列结果为NaN
+        cagr = np.where(count > 0, (1 + total_return) ** (periods_per_year / count) - 1, np.nan)
+
+        excess = values - risk_free / periods_per_year if risk_free else values
+        mean = np.nansum(excess, axis=0) / count
+        std = np.nanstd(values, axis=0, ddof=1)
+        # fmin把缺失值当作0，不影响下行平方和
+        downside = np.sqrt(np.square(np.fmin(excess, 0)).sum(axis=0) / count)
+        volatility = std * np.sqrt(periods_per_year)
+        sharpe = mean * periods_per_year / volatility
+        sortino = mean * periods_per_year / (downside * np.sqrt(periods_per_year))
+
+        drawdown = _drawdown(wealth.copy())
+        max_drawdown = drawdown.max(axis=0)
+        calmar = cagr / max_drawdown
+
+    episodes = _episodes(drawdown, index, troughs=False)
+    longest = np.zeros(len(names), dtype=np.int64)
+    np.maximum.at(longest, episodes['asset'], episodes['duration'])
+
+    clean = lambda array: np.where(np.isfinite(array), array, np.nan)
+    return pd.DataFrame({
+        'total_return': total_return,
+        'cagr': cagr,
+        'volatility': volatility,
+        'sharpe': clean(sharpe),
+        'sortino': clean(sortino),
+        'calmar': clean(calmar),
+        'max_drawdown': max_drawdown,
+        'max_drawdown_duration': longest,
+    }, index=pd.Index(names, name='asset'))
+
+
+def rank(returns, by='sharpe', ascending=False, **kwargs):
+    """计算绩效指标并按by排序"""
+    return summarize(returns, **kwargs).sort_values(by, ascending=ascending)
+
+
+Rolling_Windows = (60, 120, 252)  # 默认滚动窗口（约一季、半年、一年）
+Rolling_Fields = ('volatility', 'sharpe', 'sortino', 'max_drawdown')
+
+
+def _log_wealth(values):
+    """对数净值（缺失收益按0处理），窗口内任意两点之差即区间对数收益"""
+    return np.cumsum(np.log1p(np.nan_to_num(values)), axis=0)
+
+
+def _prefix_sums(values, risk_free, periods_per_year):
+    """有效数、超额收益、平方、下行平方的前缀和（首行补0），返回4×(日期+1)×标的数组"""
+    excess = np.nan_to_num(values - risk_free / periods_per_year if risk_free else values)
+    prefix = np.zeros((4, values.shape[0] + 1, values.shape[1]))
+    np.cumsum(~np.isnan(values), axis=0, out=prefix[0, 1:])
+    np.cumsum(excess, axis=0, out=prefix[1, 1:])
+    np.cumsum(excess * excess, axis=0, out=prefix[2, 1:])
+    np.cumsum(np.square(np.fmin(excess, 0)), axis=0, out=prefix[3, 1:])
+    return prefix
+
+
+def _ratios(count, total, square, downside, periods_per_year):
+    """由窗口累计量计算年化波动率、夏普和索提诺比率（与summarize口径一致）"""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = total / count
+        # 方差与平移无关，直接用超额收益的和、平方和计算
+        variance = np.maximum(square - total * mean, 0) / (count - 1)
+        volatility = np.sqrt(variance * periods_per_year)
+        sharpe = mean * periods_per_year / volatility
+        sortino = mean * periods_per_year / np.sqrt(downside / count * periods_per_year)
+    return volatility, sharpe, sortino
+
+
+def _rolling_max_drop(level, window):
+    """
+    滚动窗口内的最大回撤（对数）：max(level[s] - level[t])，s <= t 且同在窗口内
+
+    van Herk/Gil-Werman分块：把时间轴切成长度为window的块，块内前缀、后缀聚合各一次累积，
+    跨块窗口由「左块后缀 + 右块前缀」合并，总计O(n)，全部标的一次向量化完成
+
+    返回:
+    np.ndarray: 每个完整窗口一行（第i行对应以第window-1+i根K线结尾的窗口）
+    """
+    n, m = level.shape
+    blocks = -(-n // window)
+    # 补齐最后一块（补齐部分只会落在不完整的窗口中，不影响结果）
+    padded = np.empty((blocks * window, m))
+    padded[:n] = level
+    padded[n:] = level[-1] if n else 0
+    grid = padded.reshape(blocks, window, m)
+
+    # 块内前缀：最小值、最大回撤
+    prefix_max = np.maximum.accumulate(grid, axis=1)
+    prefix_min = np.minimum.accumulate(grid, axis=1)
+    prefix_drop = np.maximum.accumulate(prefix_max - grid, axis=1)
+    # 块内后缀：最大值、最大回撤（反向累积）
+    reverse = grid[:, ::-1]
+    suffix_max = np.maximum.accumulate(reverse, axis=1)[:, ::-1]
+    suffix_drop = np.maximum.accumulate(reverse - np.minimum.accumulate(reverse, axis=1), axis=1)[:, ::-1]
+
+    flat = lambda array: array.reshape(blocks * window, m)
+    prefix_min, prefix_drop = flat(prefix_min), flat(prefix_drop)
+    suffix_max, suffix_drop = flat(suffix_max), flat(suffix_drop)
+
+    start = np.arange(max(n - window + 1, 0))
+    end = start + window - 1
+    combined = np.maximum(np.maximum(suffix_drop[start], prefix_drop[end]), suffix_max[start] - prefix_min[end])
+    # 起点与块边界对齐时窗口恰为一整块
+    return np.where((start % window == 0)[:, None], suffix_drop[start], combined)
+
+
+def rolling(returns, windows=Rolling_Windows, periods_per_year=Trading_Days, risk_free=0.0, min_periods=None):
+    """
+    全部标的、全部窗口的滚动波动率、夏普、索提诺和最大回撤，每个窗口O(n)
+
+    参数:
+    returns: 日收益率（小数），Series、DataFrame（日期×标的）或二维数组
+    windows (tuple): 窗口长度（K线数）
+    min_periods (int): 窗口内有效收益数不足时结果为NaN，默认等于窗口长度
+
+    返回:
+    dict: {窗口: DataFrame}，列为 (指标, 标的) 两级索引，如 result[60]['sharpe'] 为60日滚动夏普（日期×标的）；
+          指标口径与summarize对同一窗口收益的计算结果一致
+    """
+    values, index, names = _as_matrix(returns)
+    level = _log_wealth(values)
+    prefix = _prefix_sums(values, risk_free, periods_per_year)
+    result = {}
+    for window in windows:
+        # 前缀和相减得到每个完整窗口的累计量，第i行对应以第window-1+i根K线结尾的窗口
+        count, total, square, downside = prefix[:, window:] - prefix[:, :-window]
+        volatility, sharpe, sortino = _ratios(count, total, square, downside, periods_per_year)
+        max_drawdown = -np.expm1(-_rolling_max_drop(level, window))
+
+        enough = count >= (min_periods or window)
+        frames = {}
+        for field, array in zip(Rolling_Fields, (volatility, sharpe, sortino, max_drawdown)):
+            full = np.full(values.shape, np.nan)
+            full[window - 1:] = np.where(enough & np.isfinite(array), array, np.nan)
+            frames[field] = pd.DataFrame(full, index=index, columns=names)
+        result[window] = pd.concat(frames, axis=1)
+    return result
+
+
+class RollingState:
+    """
+    滚动指标的增量状态：新K线到达时append一次，全部窗口、全部标的O(1)（均摊）更新，无需重算历史
+
+    - 波动率、夏普、索提诺：每个窗口维护有效数、超额收益和、平方和、下行平方和，进一减一出
+    - 最大回撤：每个窗口是一个双栈队列，栈元素为（最大值、最小值、最大回撤）聚合，
+      入队压入后栈，出队弹出前栈，前栈空时把后栈整体倒入并重算后缀聚合；
+      同时在倒栈时用缓冲区重算累计量，消除长期加减的浮点误差
+    """
+
+    def __init__(self, columns, windows=Rolling_Windows, periods_per_year=Trading_Days, risk_free=0.0,
+                 min_periods=None):
+        """
+        参数:
+        columns (list): 标的名称（每次append的收益按此顺序排列）
+        其余参数同rolling
+        """
+        self.columns = list(columns)
+        self.windows = tuple(windows)
+        self.periods_per_year = periods_per_year
+        self.risk_free = risk_free
+        self.min_periods = min_periods
+        self.index = None
+        width = len(self.columns)
+        self.level = np.zeros(width)  # 当前对数净值
+        self._buffers = {window: deque() for window in self.windows}  # 窗口内的 (超额收益, 有效标记)
+        self._sums = {window: np.zeros((4, width)) for window in self.windows}
+        self._front = {window: [] for window in self.windows}  # 前栈：(最大值, 最小值, 回撤) 后缀聚合
+        self._back = {window: [] for window in self.windows}  # 后栈：原始对数净值
+        self._back_agg = {window: None for window in self.windows}
+
+    @classmethod
+    def from_history(cls, returns, windows=Rolling_Windows, **kwargs):
+        """用历史收益（DataFrame，日期×标的）初始化状态，只回放最长窗口内的K线"""
+        state = cls(returns.columns, windows, **kwargs)
+        for label, row in returns.iloc[-max(state.windows):].iterrows():
+            state.append(row.to_numpy(), label)
+        return state
+
+    @staticmethod
+    def _layers(excess, valid):
+        return np.stack([valid, excess, excess * excess, np.square(np.fmin(excess, 0))])
+
+    @staticmethod
+    def _combine(left, right):
+        """两段相邻区间聚合的合并（left在前）"""
+        return (np.maximum(left[0], right[0]), np.minimum(left[1], right[1]),
+                np.maximum(np.maximum(left[2], right[2]), left[0] - right[1]))
+
+    def _push(self, window, level):
+        self._back[window].append(level)
+        item = (level, level, np.zeros_like(level))
+        agg = self._back_agg[window]
+        self._back_agg[window] = item if agg is None else self._combine(agg, item)
+
+    def _pop(self, window):
+        front = self._front[window]
+        if not front:
+            # 后栈倒入前栈：自后向前累积后缀聚合，栈顶为最早的元素
+            agg = None
+            for level in reversed(self._back[window]):
+                item = (level, level, np.zeros_like(level))
+                agg = item if agg is None else self._combine(item, agg)
+                front.append(agg)
+            self._back[window], self._back_agg[window] = [], None
+            buffer = self._buffers[window]
+            self._sums[window] = sum(self._layers(excess, valid) for excess, valid in buffer)
+        front.pop()
+
+    def append(self, returns, label=None):
+        """
+        追加一根K线的收益
+
+        参数:
+        returns (array-like): 各标的的收益率（缺失为NaN），顺序同columns
+        label: 该K线的日期（可选，记录为latest的索引）
+        """
+        values = np.asarray(returns, dtype=np.float64)
+        valid = (~np.isnan(values)).astype(np.float64)
+        excess = np.nan_to_num(values - self.risk_free / self.periods_per_year if self.risk_free else values)
+        self.level = self.level + np.log1p(np.nan_to_num(values))
+        layers = self._layers(excess, valid)
+        for window in self.windows:
+            buffer = self._buffers[window]
+            if len(buffer) == window:
+                self._sums[window] -= self._layers(*buffer.popleft())
+                self._pop(window)
+            buffer.append((excess, valid))
+            self._sums[window] += layers
+            self._push(window, self.level)
+        self.index = label
+        return self
+
+    def latest(self):
+        """
+        当前的滚动指标
+
+        返回:
+        pd.DataFrame: 每个标的一行，列为 (窗口, 指标) 两级索引；未满一个窗口或有效数不足时为NaN
+        """
+        frames = {}
+        for window in self.windows:
+            count, total, square, downside = self._sums[window]
+            volatility, sharpe, sortino = _ratios(count, total, square, downside, self.periods_per_year)
+            agg = self._back_agg[window]
+            if self._front[window]:
+                agg = self._front[window][-1] if agg is None else self._combine(self._front[window][-1], agg)
+            max_drawdown = -np.expm1(-agg[2]) if agg is not None else np.full(len(self.columns), np.nan)
+
+            enough = (len(self._buffers[window]) == window) & (count >= (self.min_periods or window))
+            frames[window] = pd.DataFrame(
+                {field: np.where(enough & np.isfinite(array), array, np.nan)
+                 for field, array in zip(Rolling_Fields, (volatility, sharpe, sortino, max_drawdown))},
+                index=pd.Index(self.columns, name='asset'))
+        return pd.concat(frames, axis=1)
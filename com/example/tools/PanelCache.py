@@ -0,0 +1,212 @@
+import hashlib
+import json
+import os
+import shutil
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from com.example.tools import DataStore
+
+# 面板缓存目录，每个面板为其下的一个子目录
+Cache_Dir = 'data/panel_cache'
+Meta_File = 'meta.json'
+
+# 需要缓存的数值列（源数据中存在的才会写入）
+Default_Columns = ('open', 'high', 'low', 'close', 'pre_close', 'change', 'pct_chg', 'vol', 'amount')
+
+
+def file_fingerprint(path, verify='mtime'):
+    """
+    源文件指纹：默认为大小+修改时间，verify='hash'时为内容的SHA-256（文件被原样复制或touch时不失效）
+    """
+    stat = os.stat(path)
+    if verify == 'hash':
+        digest = hashlib.sha256()
+        with open(path, 'rb') as file:
+            for block in iter(lambda: file.read(1 << 20), b''):
+                digest.update(block)
+        return {'size': stat.st_size, 'sha256': digest.hexdigest()}
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def dataset_fingerprint(dataset, root=DataStore.Store_Dir):
+    """列式数据集的指纹：每次写入都会更新数据集清单，取清单文件的大小+修改时间"""
+    meta_path = os.path.join(root, dataset, DataStore.Meta_File)
+    if not os.path.exists(meta_path):
+        return None
+    stat = os.stat(meta_path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+class Panel:
+    """
+    内存映射的OHLCV面板
+
+    - dates: int32 YYYYMMDD日期轴（升序）
+    - symbols: 代码轴
+    - 每个数值列为一个 代码×日期 的二维数组（单只代码的序列在磁盘上连续），以只读方式映射，
+      打开时不读取数据，多个进程共享操作系统页缓存；缺失值为NaN
+    """
+
+    def __init__(self, path):
+        with open(os.path.join(path, Meta_File), 'r', encoding='utf-8') as file:
+            self.meta = json.load(file)
+        self.path = path
+        self.dates = np.load(os.path.join(path, 'dates.npy'), mmap_mode='r')
+        self.symbols = np.load(os.path.join(path, 'symbols.npy'), mmap_mode='r')
+        self.columns = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r')
+                        for name in self.meta['columns']}
+        self._symbol_index = None
+
+    def __getitem__(self, column):
+        return self.columns[column]
+
+    def index_of(self, ts_code):
+        """代码在代码轴上的位置"""
+        if self._symbol_index is None:
+            self._symbol_index = {str(symbol): i for i, symbol in enumerate(self.symbols)}
+        return self._symbol_index[ts_code]
+
+    def date_slice(self, start_date=None, end_date=None):
+        """日期范围[start_date, end_date]在日期轴上的切片"""
+        lo = 0 if start_date is None else int(np.searchsorted(self.dates, int(start_date), side='left'))
+        hi = len(self.dates) if end_date is None else int(np.searchsorted(self.dates, int(end_date), side='right'))
+        return slice(lo, hi)
+
+    def frame(self, ts_code=None, columns=None, start_date=None, end_date=None):
+        """
+        单只代码的数据（以trade_date为索引的DataFrame，只复制该代码的数据），去掉该代码无数据的日期
+
+        参数:
+        ts_code (str): 代码，面板只有一个代码时可省略
+        """
+        i = 0 if ts_code is None else self.index_of(ts_code)
+        window = self.date_slice(start_date, end_date)
+        columns = list(columns or self.columns)
+        df = pd.DataFrame({name: self.columns[name][i, window] for name in columns},
+                          index=pd.Index(pd.to_datetime(self.dates[window].astype(str), format='%Y%m%d'),
+                                         name='trade_date'))
+        return df[~df.isna().all(axis=1)]
+
+    def cross_section(self, trade_date, columns=None):
+        """某一交易日的全市场截面"""
+        j = int(np.searchsorted(self.dates, int(trade_date)))
+        if j >= len(self.dates) or self.dates[j] != int(trade_date):
+            raise KeyError(trade_date)
+        columns = list(columns or self.columns)
+        return pd.DataFrame({name: self.columns[name][:, j] for name in columns},
+                            index=pd.Index(self.symbols.astype(str), name='ts_code'))
+
+
+def build_panel(df, path, columns=None, dtype=np.float64, source=None, symbol=None):
+    """
+    把长表（ts_code, trade_date, 数值列）写为面板缓存
+
+    参数:
+    df (pd.DataFrame): 行情数据，trade_date可为列或索引；没有ts_code列时视为单一代码symbol
+    path (str): 面板目录
+    columns (list): 写入的数值列，默认Default_Columns中存在的列
+    dtype: 数值列的存储类型（float64或float32）
+    source (dict): 源数据指纹，打开时用于判断缓存是否失效
+
+    返回:
+    Panel: 新写入的面板（已内存映射）
+    """
+    if 'trade_date' not in df.columns:
+        df = df.reset_index()
+    columns = [name for name in (columns or Default_Columns) if name in df.columns]
+
+    # 先对日期、代码编码，日期格式转换只作用于去重后的取值
+    date_codes, date_values = pd.factorize(df['trade_date'])
+    date_values = pd.to_numeric(DataStore._normalize_date_column(pd.Series(date_values)), errors='coerce').to_numpy()
+    valid_dates = ~np.isnan(date_values)
+    dates, date_remap = np.unique(date_values[valid_dates].astype(np.int32), return_inverse=True)
+    lookup = np.full(len(date_values) + 1, -1, dtype=np.intp)  # 最后一项对应缺失日期（编码-1）
+    lookup[np.flatnonzero(valid_dates)] = date_remap
+    date_pos = lookup[date_codes]
+    if 'ts_code' in df.columns:
+        symbol_pos, symbols = pd.factorize(df['ts_code'].astype(str), sort=True)
+        symbols = np.asarray(symbols)
+    else:
+        symbol_pos, symbols = np.zeros(len(df), dtype=np.intp), np.array([symbol or 'default'])
+
+    # 同一代码同一日期有多行时保留最后一行，无效日期的行丢弃
+    key = np.where(date_pos >= 0, symbol_pos.astype(np.int64) * len(dates) + date_pos, -1)
+    keep = (date_pos >= 0) & ~pd.Series(key).duplicated(keep='last').to_numpy()
+    if not keep.all():
+        df, symbol_pos, date_pos = df[keep], symbol_pos[keep], date_pos[keep]
+
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    os.makedirs(tmp_path)
+    np.save(os.path.join(tmp_path, 'dates.npy'), dates.astype(np.int32))
+    np.save(os.path.join(tmp_path, 'symbols.npy'), symbols.astype(str))
+    for name in columns:
+        values = np.full((len(symbols), len(dates)), np.nan, dtype=dtype)
+        values[symbol_pos, date_pos] = pd.to_numeric(df[name], errors='coerce').to_numpy(dtype=dtype)
+        np.save(os.path.join(tmp_path, f'{name}.npy'), values)
+    with open(os.path.join(tmp_path, Meta_File), 'w', encoding='utf-8') as file:
+        json.dump({'columns': columns, 'dtype': np.dtype(dtype).name, 'source': source}, file, ensure_ascii=False)
+
+    # 先写临时目录再替换，读取方不会看到写了一半的面板
+    old_path = f"{path}.{uuid.uuid4().hex}.old"
+    if os.path.exists(path):
+        os.replace(path, old_path)
+    os.replace(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+    return Panel(path)
+
+
+def open_panel(path, source=None):
+    """打开面板缓存；不存在或源数据指纹不一致时返回None"""
+    if not os.path.exists(os.path.join(path, Meta_File)):
+        return None
+    panel = Panel(path)
+    if source is not None and panel.meta.get('source') != source:
+        return None
+    return panel
+
+
+def _panel_path(name, cache_dir):
+    return os.path.join(cache_dir, name)
+
+
+def load_file(file_path, read=None, cache_dir=Cache_Dir, columns=None, dtype=np.float64, verify='mtime'):
+    """
+    读取单个行情文件对应的面板，源文件变化时才重新解析
+
+    参数:
+    file_path (str): Excel/CSV文件路径
+    read (callable): 缓存失效时解析源文件的函数，返回DataFrame，默认pd.read_excel/pd.read_csv
+    verify (str): 'mtime'按大小+修改时间判断失效，'hash'按内容摘要判断
+    """
+    source = dict(file_fingerprint(file_path, verify), path=os.path.abspath(file_path))
+    name = 'file-' + hashlib.sha256(source['path'].encode('utf-8')).hexdigest()[:16]
+    path = _panel_path(name, cache_dir)
+    panel = open_panel(path, source)
+    if panel is None:
+        if read is None:
+            read = pd.read_excel if file_path.endswith(('.xlsx', '.xls')) else pd.read_csv
+        panel = build_panel(read(file_path), path, columns=columns, dtype=dtype, source=source,
+                            symbol=os.path.splitext(os.path.basename(file_path))[0])
+    return panel
+
+
+def load_dataset(dataset, cache_dir=Cache_Dir, columns=None, dtype=np.float64, root=DataStore.Store_Dir):
+    """
+    读取列式数据集对应的全市场面板，数据集有写入时才重新构建（按原样缓存，复权日线使用PriceAdjust.load_panel）
+
+    返回:
+    Panel或None: 数据集不存在时返回None
+    """
+    source = dataset_fingerprint(dataset, root)
+    if source is None:
+        return None
+    source['dataset'] = dataset
+    path = _panel_path('dataset-' + dataset, cache_dir)
+    panel = open_panel(path, source)
+    if panel is None:
+        panel = build_panel(DataStore.read_dataset(dataset, root=root), path, columns=columns, dtype=dtype,
+                            source=source)
+    return panel
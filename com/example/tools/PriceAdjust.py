@@ -0,0 +1,183 @@
+from concurrent.futures import as_completed
+
+import numpy as np
+import pandas as pd
+
+from com.example.tools import DataStore, FetchScheduler, PanelCache, TradingCalendar
+
+# 复权时调整的价格列（成交量、成交额不调整）
+Price_Columns = ('open', 'high', 'low', 'close', 'pre_close')
+Adjust_Modes = ('qfq', 'hfq', None)
+
+
+def _factor_frame(factors):
+    factors = factors[['ts_code', 'trade_date', 'adj_factor']].copy()
+    factors['trade_date'] = DataStore._normalize_date_column(factors['trade_date'])
+    return factors.dropna(subset=['adj_factor']).drop_duplicates(['ts_code', 'trade_date'], keep='last')
+
+
+def base_factors(factors, base_date=None):
+    """
+    各代码在基准日的复权因子：取不晚于base_date的最后一个因子（基准日非交易日时取之前最近的交易日），
+    基准日早于该代码的第一个因子时取最早的因子；base_date为None时取各代码最新的因子
+
+    返回:
+    pd.Series: 以ts_code为索引
+    """
+    factors = _factor_frame(factors).sort_values('trade_date', kind='stable')
+    if base_date is None:
+        return factors.groupby('ts_code')['adj_factor'].last()
+    first = factors.groupby('ts_code')['adj_factor'].first()
+    known = factors[factors['trade_date'] <= DataStore.normalize_date(base_date)]
+    return known.groupby('ts_code')['adj_factor'].last().reindex(first.index).fillna(first)
+
+
+def _asof_factors(bars, factors):
+    """按(ts_code, trade_date)逐行取不晚于当日的最后一个因子，与bars行序一致"""
+    left = pd.DataFrame({'ts_code': bars['ts_code'].to_numpy(),
+                         'date': bars['trade_date'].astype(np.int64).to_numpy(), 'row': np.arange(len(bars))})
+    right = _factor_frame(factors)
+    right = pd.DataFrame({'ts_code': right['ts_code'].to_numpy(),
+                          'date': right['trade_date'].astype(np.int64).to_numpy(),
+                          'adj_factor': right['adj_factor'].to_numpy(dtype=np.float64)})
+    merged = pd.merge_asof(left.sort_values('date', kind='stable'), right.sort_values('date', kind='stable'),
+                           on='date', by='ts_code', direction='backward')
+    factor = np.empty(len(bars))
+    factor[merged['row'].to_numpy()] = merged['adj_factor'].to_numpy(dtype=np.float64)
+    return factor
+
+
+def adjust_prices(bars, factors, adj='qfq', base_date=None, price_columns=Price_Columns):
+    """
+    由原始日线和复权因子计算复权价格，全部代码一次向量化完成
+
+    - hfq（后复权）: 价格 × 当日因子
+    - qfq（前复权）: 价格 × 当日因子 / 基准日因子，基准日默认为各代码最新的因子日期
+    - None: 原始价格
+    当日缺少因子时沿用该代码之前最近的因子
+
+    参数:
+    bars (pd.DataFrame): 原始日线，包含ts_code、trade_date和价格列
+    factors (pd.DataFrame): 复权因子，包含ts_code、trade_date、adj_factor
+
+    返回:
+    pd.DataFrame: 按ts_code、trade_date排序的复权日线（不含adj_factor列）
+    """
+    if adj not in Adjust_Modes:
+        raise ValueError(f"不支持的复权方式: {adj}")
+    bars = bars.copy()
+    bars['trade_date'] = DataStore._normalize_date_column(bars['trade_date'])
+    bars = bars.sort_values(['ts_code', 'trade_date'], kind='stable').reset_index(drop=True)
+    if adj is None or bars.empty:
+        return bars
+
+    factor = _asof_factors(bars, factors)
+    if adj == 'qfq':
+        factor = factor / bars['ts_code'].map(base_factors(factors, base_date)).to_numpy(dtype=np.float64)
+
+    columns = [name for name in price_columns if name in bars.columns]
+    bars[columns] = bars[columns].to_numpy(dtype=np.float64) * factor[:, None]
+    if 'change' in bars.columns and {'close', 'pre_close'} <= set(bars.columns):
+        bars['change'] = bars['close'] - bars['pre_close']
+    return bars
+
+
+def read_adjusted(dataset, factor_dataset, adj='qfq', base_date=None, ts_codes=None, start_date=None,
+                  end_date=None, columns=None, root=DataStore.Store_Dir):
+    """
+    读取原始日线数据集并按需复权
+
+    复权因子不按日期过滤（区间首日沿用之前的因子，前复权的基准日可能晚于end_date），因子表很小，读取开销可忽略；
+    基准日默认为各代码最新的因子
+
+    参数:
+    dataset (str): 原始日线数据集
+    factor_dataset (str): 复权因子数据集
+    adj (str): 'qfq'、'hfq'或None
+
+    返回:
+    pd.DataFrame: 复权后的日线
+    """
+    bars = DataStore.read_dataset(dataset, columns=columns, ts_codes=ts_codes, start_date=start_date,
+                                  end_date=end_date, root=root)
+    if adj is None or bars.empty:
+        return adjust_prices(bars, None, adj=None)
+    factors = DataStore.read_dataset(factor_dataset, columns=['ts_code', 'trade_date', 'adj_factor'],
+                                     ts_codes=ts_codes, root=root)
+    return adjust_prices(bars, factors, adj=adj, base_date=base_date)
+
+
+def load_panel(dataset, factor_dataset, adj='qfq', cache_dir=PanelCache.Cache_Dir, columns=None, dtype=np.float64,
+               root=DataStore.Store_Dir):
+    """
+    复权日线的全市场面板缓存：原始日线或复权因子数据集有写入时才重新构建
+    （前复权以最新因子为基准，新的因子会改变全部历史价格）
+
+    返回:
+    PanelCache.Panel或None: 数据集不存在时返回None
+    """
+    if adj not in Adjust_Modes:
+        raise ValueError(f"不支持的复权方式: {adj}")
+    fingerprints = {name: PanelCache.dataset_fingerprint(name, root) for name in (dataset, factor_dataset)}
+    if fingerprints[dataset] is None or (adj is not None and fingerprints[factor_dataset] is None):
+        return None
+    source = {'dataset': dataset, 'factor_dataset': factor_dataset, 'adj': adj, 'fingerprints': fingerprints}
+    path = PanelCache._panel_path(f"adjusted-{adj or 'raw'}-{dataset}", cache_dir)
+    panel = PanelCache.open_panel(path, source)
+    if panel is None:
+        panel = PanelCache.build_panel(read_adjusted(dataset, factor_dataset, adj=adj, root=root), path,
+                                       columns=columns, dtype=dtype, source=source)
+    return panel
+
+
+def update_daily(ts_codes, daily_api, factor_api, dataset, factor_dataset, start_date, end_date=None,
+                 fields=None, scheduler=None, calendar=None, root=DataStore.Store_Dir):
+    """
+    增量更新原始日线和复权因子：每个代码从各自数据集的高水位之后的下一个交易日开始拉取，只追加新行；
+    高水位之后还没有新的交易日（如周末、节假日）时不发请求
+
+    分红送配只会产生新的因子，已存的原始日线和因子不需要重新下载
+
+    参数:
+    ts_codes (list): 代码列表
+    daily_api, factor_api (callable): 日线、复权因子接口（如pro.daily与pro.adj_factor，pro.fund_daily与pro.fund_adj）
+    start_date (str): 数据集中没有该代码时的起始日期
+    end_date (str): 结束日期，默认今天，非交易日时取之前最近的交易日
+    fields (str): 日线字段
+    calendar (TradingCalendar): 交易日历，默认共享的上交所日历
+
+    返回:
+    dict: {ts_code: (新增日线行数, 新增因子行数)}
+    """
+    end_date = DataStore.normalize_date(end_date) or TradingCalendar.today()
+    scheduler = scheduler or FetchScheduler.get_scheduler()
+    calendar = calendar or TradingCalendar.get_calendar(end_date=end_date)
+    last = calendar.previous_day(end_date, inclusive=True)
+    futures = {}
+    for ts_code in ts_codes:
+        for kind, api, target in (('daily', daily_api, dataset), ('factor', factor_api, factor_dataset)):
+            mark = DataStore.high_water_mark(target, partition=ts_code, root=root)
+            begin = calendar.next_day(mark) if mark else calendar.next_day(start_date, inclusive=True)
+            if begin is None or last is None or begin > last:
+                continue
+            kwargs = {'ts_code': ts_code, 'start_date': begin, 'end_date': last}
+            if kind == 'daily' and fields:
+                kwargs['fields'] = fields
+            futures[scheduler.submit(None, api, **kwargs)] = (ts_code, kind, target)
+
+    added = {ts_code: [0, 0] for ts_code in ts_codes}
+    for future in as_completed(futures):
+        ts_code, kind, target = futures[future]
+        try:
+            df = future.result()
+        except Exception as e:
+            print(f"获取 {ts_code} {'日线' if kind == 'daily' else '复权因子'}出错: {e}")
+            continue
+        if df is None or df.empty:
+            continue
+        if 'ts_code' not in df.columns:
+            df.insert(0, 'ts_code', ts_code)
+        if kind == 'factor':
+            df = df[['ts_code', 'trade_date', 'adj_factor']]
+        added[ts_code][kind == 'factor'] = DataStore.append_dataset(df, target, partition_by='ts_code', root=root)
+    return {ts_code: tuple(counts) for ts_code, counts in added.items()}
@@ -0,0 +1,189 @@
+import os
+import pickle
+import random
+import threading
+import time
+from collections import defaultdict, deque
+
+from com.example.tools import ApiCache, FetchScheduler
+
+# 录制文件目录，每条响应一个文件（文件名为ApiCache.make_key的请求摘要）
+Replay_Dir = 'data/replay'
+
+# 环境变量：RABBITLE_API_MODE=record/replay 时，ApiCache.pro_api()返回录制/回放客户端
+Mode_Env = 'RABBITLE_API_MODE'
+Dir_Env = 'RABBITLE_REPLAY_DIR'
+
+
+def _record_path(root, key):
+    return os.path.join(root, key[:2], key + '.pkl')
+
+
+def _params(fields, kwargs):
+    """与CachedClient相同的参数组织方式，保证录制键与缓存键一致"""
+    return dict(kwargs, fields=fields)
+
+
+class RecordingClient:
+    """
+    录制模式：包装真实的pro_api()客户端，每次调用把请求参数、响应（或错误信息）和耗时写入磁盘
+
+    频率超限的错误不录制（回放时由模拟限流产生）
+    """
+
+    def __init__(self, client, root=Replay_Dir):
+        self._client = client
+        self.root = root
+
+    def _save(self, key, record):
+        path = _record_path(self.root, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as file:
+            pickle.dump(record, file)
+        os.replace(tmp_path, path)
+
+    def query(self, api_name, fields='', **kwargs):
+        params = _params(fields, kwargs)
+        key = ApiCache.make_key(api_name, params)
+        record = {'api_name': api_name, 'params': ApiCache.normalize_params(params), 'recorded': time.time()}
+        started = time.monotonic()
+        try:
+            value = self._client.query(api_name, fields=fields, **kwargs)
+        except Exception as e:
+            if not FetchScheduler.is_quota_error(e):
+                self._save(key, dict(record, error=str(e), elapsed=time.monotonic() - started))
+            raise
+        self._save(key, dict(record, data=value, elapsed=time.monotonic() - started))
+        return value
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        def api(fields='', **kwargs):
+            return self.query(name, fields=fields, **kwargs)
+        return api
+
+
+class ReplayClient:
+    """
+    回放模式：从录制文件返回响应，不需要网络和token，可替代pro_api()客户端
+
+    - 延迟：固定秒数、{接口名: 秒数}或'recorded'（使用录制时的实际耗时），可叠加随机抖动
+    - 限流：按{接口名: 每分钟次数}模拟服务端的滑动窗口限制，超限时抛出与Tushare相同措辞的异常，
+      FetchScheduler会据此退避重试
+    - time_scale缩放全部延迟和限流窗口（如0.01表示按百分之一的时间回放），便于快速、可重复地基准测试
+    - 未录制的请求抛出LookupError
+    """
+
+    def __init__(self, root=Replay_Dir, latency=0.0, jitter=0.0, rate_limits=None, time_scale=1.0, seed=0):
+        """
+        参数:
+        root (str): 录制文件目录
+        latency (float/dict/str): 每次调用的模拟延迟（秒）
+        jitter (float): 延迟的随机波动比例，如0.2表示±20%
+        rate_limits (dict): {接口名: 每分钟调用次数}，'default'键为其余接口的限制；None表示不限流
+        time_scale (float): 时间缩放系数
+        seed (int): 抖动的随机种子
+        """
+        self.root = root
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limits = dict(rate_limits) if rate_limits else None
+        self.time_scale = time_scale
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._calls = defaultdict(deque)  # 各接口窗口内的调用时刻
+        self._records = {}
+        self.stats = defaultdict(lambda: {'calls': 0, 'rejected': 0, 'missing': 0})
+
+    def _load(self, key):
+        with self._lock:
+            if key in self._records:
+                return self._records[key]
+        path = _record_path(self.root, key)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'rb') as file:
+            record = pickle.load(file)
+        with self._lock:
+            self._records[key] = record
+        return record
+
+    def _delay(self, api_name, record):
+        if self.latency == 'recorded':
+            delay = record.get('elapsed', 0.0)
+        elif isinstance(self.latency, dict):
+            delay = self.latency.get(api_name, self.latency.get('default', 0.0))
+        else:
+            delay = self.latency
+        if self.jitter:
+            with self._lock:
+                delay *= 1 + self._random.uniform(-self.jitter, self.jitter)
+        return max(delay, 0.0) * self.time_scale
+
+    def _admit(self, api_name):
+        """按滑动窗口判断本次调用是否超限，未超限时记入窗口"""
+        if self.rate_limits is None:
+            return None
+        limit = self.rate_limits.get(api_name, self.rate_limits.get('default'))
+        if limit is None:
+            return None
+        window = 60.0 * self.time_scale
+        now = time.monotonic()
+        with self._lock:
+            calls = self._calls[api_name]
+            while calls and calls[0] <= now - window:
+                calls.popleft()
+            if len(calls) >= limit:
+                self.stats[api_name]['rejected'] += 1
+                return limit
+            calls.append(now)
+        return None
+
+    def query(self, api_name, fields='', **kwargs):
+        params = _params(fields, kwargs)
+        with self._lock:
+            self.stats[api_name]['calls'] += 1
+        limit = self._admit(api_name)
+        if limit is not None:
+            raise Exception(f"抱歉，您每分钟最多访问该接口{limit}次")
+
+        record = self._load(ApiCache.make_key(api_name, params))
+        if record is None:
+            with self._lock:
+                self.stats[api_name]['missing'] += 1
+            raise LookupError(f"没有录制的响应: {api_name} {ApiCache.normalize_params(params)}")
+        delay = self._delay(api_name, record)
+        if delay:
+            time.sleep(delay)
+        if 'error' in record:
+            raise Exception(record['error'])
+        data = record['data']
+        return data.copy() if hasattr(data, 'copy') else data
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        def api(fields='', **kwargs):
+            return self.query(name, fields=fields, **kwargs)
+        return api
+
+
+def from_environment(make_live):
+    """
+    按环境变量选择客户端：RABBITLE_API_MODE为record时录制make_live()的响应，为replay时回放，
+    否则返回make_live()；录制目录取RABBITLE_REPLAY_DIR，默认Replay_Dir
+
+    参数:
+    make_live (callable): 构建真实客户端的无参函数（回放模式下不调用，因此不需要token）
+    """
+    mode = os.environ.get(Mode_Env, 'live').lower()
+    root = os.environ.get(Dir_Env, Replay_Dir)
+    if mode == 'replay':
+        return ReplayClient(root)
+    if mode == 'record':
+        return RecordingClient(make_live(), root)
+    return make_live()
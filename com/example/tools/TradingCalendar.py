@@ -0,0 +1,189 @@
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from com.example.tools import ApiCache, DataStore
+
+# 交易日历缓存目录，每个交易所一个.npy（开市日）和一个.json（覆盖范围）
+Calendar_Dir = 'data/calendar'
+Exchanges = ('SSE', 'SZSE')
+First_Date = '19900101'
+Refresh_Interval = 12 * 3600  # 日历未覆盖所需日期时，两次刷新之间的最短间隔（交易所尚未公布的日期不反复请求）
+
+
+def to_int(date):
+    """日期（YYYYMMDD字符串/整数、datetime）转为int YYYYMMDD"""
+    return int(DataStore.normalize_date(date))
+
+
+def to_text(date):
+    """int YYYYMMDD转为字符串"""
+    return str(int(date))
+
+
+def _day(date):
+    text = DataStore.normalize_date(date)
+    return np.datetime64(f"{text[:4]}-{text[4:6]}-{text[6:8]}", 'D')
+
+
+def shift_days(date, days):
+    """自然日加减，返回YYYYMMDD字符串"""
+    return str(_day(date) + int(days)).replace('-', '')
+
+
+def today():
+    return time.strftime('%Y%m%d')
+
+
+class TradingCalendar:
+    """
+    交易日历：升序的int32 YYYYMMDD开市日数组，日期运算均为np.searchsorted（O(log n)）
+
+    covered_until为日历覆盖到的最后一个自然日（含休市日），之后的日期是否开市未知
+    """
+
+    def __init__(self, days, covered_until=None, exchange='SSE'):
+        self.days = np.unique(np.asarray(days, dtype=np.int32))
+        if covered_until is None and len(self.days):
+            covered_until = self.days[-1]
+        self.covered_until = int(covered_until) if covered_until is not None else None
+        self.exchange = exchange
+        self.refreshed = 0.0  # 上次从trade_cal刷新的时间戳
+
+    @classmethod
+    def weekdays(cls, start_date=First_Date, end_date='20301231', exchange='SSE'):
+        """只排除周末、不含节假日的近似日历（离线计算与测试用）"""
+        days = np.arange(_day(start_date), _day(end_date) + 1)
+        days = days[np.is_busday(days)]
+        return cls(np.char.replace(days.astype(str), '-', '').astype(np.int32), to_int(end_date), exchange)
+
+    def __len__(self):
+        return len(self.days)
+
+    def __contains__(self, date):
+        return self.is_trading_day(date)
+
+    def is_trading_day(self, date):
+        value = to_int(date)
+        i = int(np.searchsorted(self.days, value))
+        return i < len(self.days) and self.days[i] == value
+
+    def next_day(self, date, inclusive=False):
+        """date之后的第一个交易日（inclusive时date本身开市则返回date），超出日历范围时返回None"""
+        i = int(np.searchsorted(self.days, to_int(date), side='left' if inclusive else 'right'))
+        return to_text(self.days[i]) if i < len(self.days) else None
+
+    def previous_day(self, date, inclusive=False):
+        """date之前的最后一个交易日（inclusive时date本身开市则返回date），早于日历起点时返回None"""
+        i = int(np.searchsorted(self.days, to_int(date), side='right' if inclusive else 'left')) - 1
+        return to_text(self.days[i]) if i >= 0 else None
+
+    def offset(self, date, n):
+        """
+        第n个交易日后（n<0为之前）的交易日；date休市时n>=0从之前、n<0从之后最近的交易日起算，
+        如周六offset 1为下周一、offset -1为周五，超出日历范围时返回None
+        """
+        value = to_int(date)
+        i = int(np.searchsorted(self.days, value, side='right')) - 1 if n >= 0 else \
+            int(np.searchsorted(self.days, value, side='left'))
+        j = i + int(n)
+        return to_text(self.days[j]) if 0 <= j < len(self.days) and i >= 0 else None
+
+    def range(self, start_date=None, end_date=None):
+        """[start_date, end_date]内的交易日（int32数组，与days共享内存）"""
+        lo = 0 if start_date is None else int(np.searchsorted(self.days, to_int(start_date), side='left'))
+        hi = len(self.days) if end_date is None else int(np.searchsorted(self.days, to_int(end_date), side='right'))
+        return self.days[lo:hi]
+
+    def dates(self, start_date=None, end_date=None):
+        """[start_date, end_date]内的交易日（YYYYMMDD字符串列表）"""
+        return self.range(start_date, end_date).astype(str).tolist()
+
+    def count(self, start_date, end_date):
+        """[start_date, end_date]内的交易日数"""
+        return len(self.range(start_date, end_date))
+
+    def covers(self, date):
+        return self.covered_until is not None and to_int(date) <= self.covered_until
+
+    def extend(self, client=None, end_date=None):
+        """
+        从trade_cal增量刷新：只请求covered_until之后的日期（含交易所已公布的未来日期）
+
+        返回:
+        int: 新增的开市日数
+        """
+        client = client or ApiCache.lazy_client()
+        start = shift_days(to_text(self.covered_until), 1) if self.covered_until else First_Date
+        end = DataStore.normalize_date(end_date) if end_date else f"{int(today()[:4]) + 1}1231"
+        if start > end:
+            return 0
+        cal = client.trade_cal(exchange=self.exchange, start_date=start, end_date=end, fields='cal_date,is_open')
+        if cal is None or cal.empty:
+            return 0
+        dates = DataStore._normalize_date_column(cal['cal_date']).astype(np.int32).to_numpy()
+        is_open = cal['is_open'].astype(int).to_numpy() == 1
+        before = len(self.days)
+        self.days = np.union1d(self.days, dates[is_open]).astype(np.int32)
+        self.covered_until = max(self.covered_until or 0, int(dates.max()))
+        return len(self.days) - before
+
+    def save(self, root=Calendar_Dir):
+        """写入缓存目录（先写临时文件再替换）"""
+        os.makedirs(root, exist_ok=True)
+        path = os.path.join(root, self.exchange)
+        with open(f"{path}.tmp.npy", 'wb') as file:
+            np.save(file, self.days)
+        os.replace(f"{path}.tmp.npy", f"{path}.npy")
+        with open(f"{path}.json.tmp", 'w', encoding='utf-8') as file:
+            json.dump({'exchange': self.exchange, 'covered_until': self.covered_until, 'refreshed': time.time()},
+                      file)
+        os.replace(f"{path}.json.tmp", f"{path}.json")
+
+    @classmethod
+    def load(cls, exchange='SSE', root=Calendar_Dir):
+        """读取缓存的日历，不存在时返回None"""
+        path = os.path.join(root, exchange)
+        if not (os.path.exists(f"{path}.npy") and os.path.exists(f"{path}.json")):
+            return None
+        with open(f"{path}.json", 'r', encoding='utf-8') as file:
+            meta = json.load(file)
+        calendar = cls(np.load(f"{path}.npy"), meta.get('covered_until'), exchange)
+        calendar.refreshed = meta.get('refreshed', 0.0)
+        return calendar
+
+
+_shared_calendars = {}
+_shared_lock = threading.Lock()
+
+
+def get_calendar(exchange='SSE', end_date=None, client=None, root=Calendar_Dir):
+    """
+    全局共享的交易日历：首次使用时从缓存目录加载，未覆盖end_date（默认今天）时从trade_cal增量刷新并保存
+
+    参数:
+    exchange (str): 'SSE'或'SZSE'
+    end_date (str): 需要覆盖到的日期
+    client: Tushare客户端，默认共享的带缓存客户端
+    """
+    needed = DataStore.normalize_date(end_date) or today()
+    with _shared_lock:
+        key = (exchange, os.path.abspath(root))
+        calendar = _shared_calendars.get(key)
+        if calendar is None:
+            calendar = TradingCalendar.load(exchange, root) or TradingCalendar([], exchange=exchange)
+            _shared_calendars[key] = calendar
+        if not calendar.covers(needed) and time.time() - calendar.refreshed >= Refresh_Interval:
+            calendar.extend(client, end_date=max(needed, f"{int(today()[:4]) + 1}1231"))
+            calendar.save(root)
+            calendar.refreshed = time.time()
+        return calendar
+
+
+def set_calendar(calendar, root=Calendar_Dir):
+    """替换共享日历（如离线时使用TradingCalendar.weekdays()）"""
+    with _shared_lock:
+        _shared_calendars[(calendar.exchange, os.path.abspath(root))] = calendar
@@ -0,0 +1,241 @@
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from itertools import chain, islice
+
+# 数据库文件路径：优先取环境变量RABBITLE_DB_PATH，默认为本目录下的mydb.db
+Default_Path = os.environ.get('RABBITLE_DB_PATH',
+                              os.path.join(os.path.dirname(os.path.abspath(__file__)), 'mydb.db'))
+
+# 每个连接建立时执行一次的PRAGMA
+Default_Pragmas = {
+    'journal_mode': 'WAL',  # 读写并发，写入只追加WAL文件
+    'synchronous': 'NORMAL',  # WAL模式下NORMAL即可保证一致性，避免每次提交fsync
+    'cache_size': -64 * 1024,  # 页缓存64MB（负数单位为KB）
+    'mmap_size': 256 * 1024 ** 2,  # 内存映射读取256MB
+    'temp_store': 'MEMORY',
+    'foreign_keys': 'ON',
+}
+
+Chunk_Size = 50000  # executemany每批行数
+# 多行VALUES批量写入：每条语句的行数上限，以及SQLite允许的绑定参数个数（3.32之前为999）
+Rows_Per_Statement = 500
+Max_Variables = 32766 if sqlite3.sqlite_version_info >= (3, 32, 0) else 999
+Cached_Statements = 256  # 每个连接缓存的预编译语句数
+
+
+class Database:
+    """
+    SQLite连接池
+
+    - 连接建立后复用（PRAGMA只执行一次，预编译语句按SQL文本缓存在连接上）
+    - 线程从池中借出连接，用完归还；池空时阻塞等待，池内连接数不超过pool_size
+    - 批量写入在一个事务内按块executemany
+    """
+
+    def __init__(self, path=None, pool_size=4, pragmas=None, timeout=30.0):
+        """
+        参数:
+        path (str): 数据库文件路径，默认Default_Path
+        pool_size (int): 最大连接数
+        pragmas (dict): 覆盖Default_Pragmas中的设置
+        timeout (float): 等待写锁的秒数
+        """
+        self.path = path or Default_Path
+        self.pool_size = pool_size
+        self.pragmas = dict(Default_Pragmas)
+        self.pragmas.update(pragmas or {})
+        self.timeout = timeout
+        self._pool = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _connect(self):
+        dir_path = os.path.dirname(self.path)
+        if dir_path:
+            os.makedirs(dir_path, exist_ok=True)
+        # isolation_level=None：由本类显式BEGIN/COMMIT控制事务
+        conn = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False,
+                               isolation_level=None, cached_statements=Cached_Statements)
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+
+    def _acquire(self):
+        if self._closed:
+            raise sqlite3.ProgrammingError("数据库连接池已关闭")
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.pool_size:
+                self._created += 1
+                try:
+                    return self._connect()
+                except Exception:
+                    self._created -= 1
+                    raise
+        return self._pool.get()
+
+    def _release(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        if self._closed:
+            conn.close()
+        else:
+            self._pool.put(conn)
+
+    @contextmanager
+    def connection(self):
+        """借出一个连接，退出时归还（未提交的事务会回滚）"""
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            self._release(conn)
+
+    @contextmanager
+    def transaction(self):
+        """借出连接并开启事务，正常退出时提交，异常时回滚"""
+        with self.connection() as conn:
+            conn.execute("BEGIN")
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.commit()
+
+    def execute(self, sql, params=()):
+        """执行单条写语句并提交，返回影响的行数"""
+        with self.transaction() as conn:
+            return conn.execute(sql, params).rowcount
+
+    def executescript(self, script):
+        """执行多条语句（建表等）"""
+        with self.connection() as conn:
+            conn.executescript(script)
+
+    def executemany(self, sql, rows, chunk_size=Chunk_Size):
+        """
+        批量写入：rows可为列表或任意可迭代对象（按块消费，不整体载入内存），全部在一个事务内完成
+
+        返回:
+        int: 写入的行数
+        """
+        rows = iter(rows)
+        total = 0
+        with self.transaction() as conn:
+            while True:
+                chunk = list(islice(rows, chunk_size))
+                if not chunk:
+                    break
+                conn.executemany(sql, chunk)
+                total += len(chunk)
+        return total
+
+    def bulk_insert(self, table, columns, rows, chunk_size=Chunk_Size):
+        """
+        多行VALUES批量写入：每条INSERT语句写入多行，减少逐行绑定和执行语句的开销
+        （同样的表和数据，写入速度约为逐行executemany的2倍以上），全部在一个事务内完成
+
+        参数:
+        table (str): 表名
+        columns (list): 列名，与rows中每行的取值一一对应
+        rows: 行元组的列表或任意可迭代对象（按块消费）
+
+        返回:
+        int: 写入的行数
+        """
+        columns = list(columns)
+        width = len(columns)
+        per_statement = max(1, min(Rows_Per_Statement, Max_Variables // width))
+        head = f"INSERT INTO {table} ({', '.join(columns)}) VALUES "
+        row_sql = f"({', '.join(['?'] * width)})"
+        full_sql = head + ', '.join([row_sql] * per_statement)
+        step = per_statement * width
+
+        rows = iter(rows)
+        total = 0
+        with self.transaction() as conn:
+            while True:
+                chunk = list(islice(rows, chunk_size))
+                if not chunk:
+                    break
+                if set(map(len, chunk)) != {width}:
+                    raise ValueError(f"每行应有 {width} 个值: {columns}")
+                values = list(chain.from_iterable(chunk))
+                full = len(chunk) // per_statement * step
+                conn.executemany(full_sql, (values[i:i + step] for i in range(0, full, step)))
+                rest = len(chunk) % per_statement
+                if rest:
+                    conn.execute(head + ', '.join([row_sql] * rest), values[full:])
+                total += len(chunk)
+        return total
+
+    def query(self, sql, params=()):
+        """执行查询并返回全部结果（元组列表）"""
+        with self.connection() as conn:
+            return conn.execute(sql, params).fetchall()
+
+    def iter_query(self, sql, params=(), chunk_size=Chunk_Size):
+        """
+        流式查询：每次fetchmany取chunk_size行，内存占用与结果总行数无关
+
+        返回:
+        生成器，依次产生 (列名列表, 行元组列表)；生成器结束或被关闭时归还连接
+        """
+        with self.connection() as conn:
+            cursor = conn.execute(sql, params)
+            names = [item[0] for item in cursor.description]
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield names, rows
+
+    def table_columns(self, table):
+        """表的全部列名（按建表顺序）"""
+        with self.connection() as conn:
+            return [row[1] for row in conn.execute("SELECT * FROM pragma_table_info(?)", (table,))]
+
+    def query_one(self, sql, params=()):
+        """执行查询并返回第一行，无结果时返回None"""
+        with self.connection() as conn:
+            return conn.execute(sql, params).fetchone()
+
+    def close(self):
+        """关闭池内全部连接"""
+        self._closed = True
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+_shared_db = None
+_shared_lock = threading.Lock()
+
+
+def get_db():
+    """获取全局共享的数据库连接池"""
+    global _shared_db
+    with _shared_lock:
+        if _shared_db is None:
+            _shared_db = Database()
+        return _shared_db
+
+
+def configure(path=None, **kwargs):
+    """替换全局连接池（如切换数据库文件），参数同Database"""
+    global _shared_db
+    with _shared_lock:
+        if _shared_db is not None:
+            _shared_db.close()
+        _shared_db = Database(path, **kwargs)
+        return _shared_db
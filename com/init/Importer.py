@@ -0,0 +1,211 @@
+import argparse
+import os
+import time
+from itertools import islice
+
+import pandas as pd
+
+from com.init import Database, InitTable
+
+Chunk_Size = 20000  # 每块行数（每块一个事务）
+
+# 导入进度：每块写入与进度更新在同一个事务内提交，中断后从最后提交的块继续
+PROGRESS_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS import_progress(
+    source TEXT PRIMARY KEY,    -- 文件绝对路径#工作表
+    table_name TEXT NOT NULL,
+    file_size INTEGER NOT NULL,
+    file_mtime REAL NOT NULL,
+    rows_done INTEGER NOT NULL,
+    finished INTEGER NOT NULL DEFAULT 0);
+
+-- 没有业务主键（自增id）的表：记录每块写入的rowid区间，从头重新导入时先删除上次导入的行
+CREATE TABLE IF NOT EXISTS import_rows(
+    source TEXT NOT NULL,
+    first_rowid INTEGER NOT NULL,
+    last_rowid INTEGER NOT NULL);
+CREATE INDEX IF NOT EXISTS idx_import_rows_source ON import_rows(source);
+'''
+
+
+def _iter_csv(file_path, chunk_size, skip_rows):
+    """按块读取CSV，跳过已导入的skip_rows行数据"""
+    reader = pd.read_csv(file_path, chunksize=chunk_size, skiprows=range(1, skip_rows + 1))
+    for chunk in reader:
+        yield chunk
+
+
+def _iter_excel(file_path, sheet_name, chunk_size, skip_rows):
+    """以只读流模式逐行读取Excel，按块组装DataFrame（不整体载入工作簿）"""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[sheet_name] if isinstance(sheet_name, int) else workbook[sheet_name]
+        rows = sheet.iter_rows(values_only=True)
+        header = [str(name) for name in next(rows)]
+        for _ in islice(rows, skip_rows):
+            pass
+        while True:
+            block = list(islice(rows, chunk_size))
+            if not block:
+                break
+            yield pd.DataFrame.from_records(block, columns=header)
+    finally:
+        workbook.close()
+
+
+def _excel_rows(file_path, sheet_name):
+    """工作表的数据行数（取自表的维度信息，不可用时返回None）"""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file_path, read_only=True)
+    try:
+        sheet = workbook.worksheets[sheet_name] if isinstance(sheet_name, int) else workbook[sheet_name]
+        return sheet.max_row - 1 if sheet.max_row else None
+    finally:
+        workbook.close()
+
+
+def _convert_chunk(df, table_columns, date_column):
+    """把一块源数据转换为目标表的列：日期列转为timestamp（或YYYYMMDD整数），丢弃无效日期"""
+    df = df.rename(columns=lambda name: str(name).strip())
+    if date_column in df.columns:
+        if 'timestamp' in table_columns and 'timestamp' not in df.columns:
+            df['timestamp'] = InitTable.to_timestamp_column(df[date_column])
+            valid = df['timestamp'].notna()
+        else:
+            valid = InitTable._to_date_int(df[date_column]).notna()
+        if not valid.all():
+            print(f"警告：发现 {int((~valid).sum())} 个无效日期，已自动删除")
+            df = df[valid]
+    return df
+
+
+def _has_natural_key(db, table):
+    """表是否有业务主键（有则按主键upsert，重复导入不会产生重复行）"""
+    keys = [row[0] for row in db.query("SELECT name FROM pragma_table_info(?) WHERE pk > 0", (table,))]
+    return bool(keys) and keys != ['id']
+
+
+def _delete_imported(conn, source, table):
+    """删除source上次导入到无业务主键表中的行（与进度重置在同一事务内）"""
+    ranges = conn.execute("SELECT first_rowid, last_rowid FROM import_rows WHERE source = ?", (source,)).fetchall()
+    deleted = sum(conn.execute(f"DELETE FROM {table} WHERE rowid BETWEEN ? AND ?", bounds).rowcount
+                  for bounds in ranges)
+    conn.execute("DELETE FROM import_rows WHERE source = ?", (source,))
+    return deleted
+
+
+def import_file(file_path, table=InitTable.TABLE_NAME, sheet_name=0, date_column='trade_date',
+                chunk_size=Chunk_Size, restart=False):
+    """
+    分块导入CSV/Excel到SQLite表
+
+    - 源文件按块流式读取，内存占用只与chunk_size有关
+    - 列按名称映射到目标表，表中没有的列忽略
+    - 日期列向量化转换：目标表有timestamp列时写入当日0点（UTC）的时间戳，否则按YYYYMMDD整数写入
+    - 每块一个事务，块数据与导入进度同时提交；再次执行时从最后提交的块继续
+      （源文件大小或修改时间变化时从头导入）
+    - 从头重新导入到没有业务主键的表时，先删除该文件上次导入的行，不会产生重复行
+
+    参数:
+        file_path: .csv / .xlsx 文件路径
+        table: 目标表名，默认CN_MAKET_BASIC_ALL；有业务主键的表按主键upsert
+        sheet_name: Excel工作表名或序号
+        date_column: 源数据中的日期列
+        chunk_size: 每块行数
+        restart: True时忽略已有进度，从头导入
+
+    返回:
+        int: 本次导入的行数
+    """
+    db = Database.get_db()
+    db.executescript(PROGRESS_SCHEMA)
+    table_columns = db.table_columns(table)
+    if not table_columns:
+        raise ValueError(f"表不存在: {table}")
+
+    is_csv = file_path.lower().endswith('.csv')
+    source = os.path.abspath(file_path) + ('' if is_csv else f"#{sheet_name}")
+    stat = os.stat(file_path)
+
+    done = 0
+    progress = db.query_one("SELECT file_size, file_mtime, rows_done, finished, table_name FROM import_progress "
+                            "WHERE source = ?", (source,))
+    if progress and not restart:
+        if (progress[0], progress[1]) != (stat.st_size, stat.st_mtime):
+            print(f"{file_path} 已变化，从头导入")
+        elif progress[3]:
+            print(f"{file_path} 已导入完成（{progress[2]} 行），如需重新导入请指定restart")
+            return 0
+        else:
+            done = progress[2]
+            print(f"{file_path} 从第 {done + 1} 行继续导入")
+
+    keyed = _has_natural_key(db, table)
+    previous_table = progress[4] if progress and done == 0 and db.table_columns(progress[4]) else None
+    with db.transaction() as conn:
+        if previous_table:
+            deleted = _delete_imported(conn, source, previous_table)
+            if deleted:
+                print(f"已删除 {previous_table} 中上次导入的 {deleted} 行")
+        conn.execute("INSERT OR REPLACE INTO import_progress VALUES (?, ?, ?, ?, ?, 0)",
+                     (source, table, stat.st_size, stat.st_mtime, done))
+
+    total = None if is_csv else _excel_rows(file_path, sheet_name)
+    chunks = _iter_csv(file_path, chunk_size, done) if is_csv else \
+        _iter_excel(file_path, sheet_name, chunk_size, done)
+
+    imported = 0
+    started = time.monotonic()
+    sql = columns = None
+    for chunk in chunks:
+        source_rows = len(chunk)
+        chunk = _convert_chunk(chunk, table_columns, date_column)
+        if sql is None:
+            sql, columns = InitTable.prepare_insert(table, chunk.columns)
+        with db.transaction() as conn:
+            if not keyed:
+                first = conn.execute(f"SELECT COALESCE(MAX(rowid), 0) FROM {table}").fetchone()[0] + 1
+            conn.executemany(sql, InitTable.frame_rows(chunk, columns))
+            if not keyed:
+                last = conn.execute(f"SELECT COALESCE(MAX(rowid), 0) FROM {table}").fetchone()[0]
+                if last >= first:
+                    conn.execute("INSERT INTO import_rows VALUES (?, ?, ?)", (source, first, last))
+            done += source_rows
+            conn.execute("UPDATE import_progress SET rows_done = ? WHERE source = ?", (done, source))
+        imported += len(chunk)
+
+        rate = imported / max(time.monotonic() - started, 1e-9)
+        percent = f" ({done / total * 100:.1f}%)" if total else ''
+        print(f"{os.path.basename(file_path)}: 已处理 {done} 行{percent}，{rate:,.0f} 行/秒")
+
+    with db.transaction() as conn:
+        conn.execute("UPDATE import_progress SET finished = 1 WHERE source = ?", (source,))
+    print(f"{file_path} 导入完成，本次写入 {imported} 行到 {table}")
+    return imported
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='分块导入CSV/Excel到SQLite')
+    parser.add_argument('files', nargs='+', help='CSV或Excel文件')
+    parser.add_argument('--table', default=InitTable.TABLE_NAME, help='目标表名')
+    parser.add_argument('--sheet', default=0, help='Excel工作表名或序号')
+    parser.add_argument('--date-column', default='trade_date', help='源数据中的日期列')
+    parser.add_argument('--chunk-size', type=int, default=Chunk_Size, help='每块行数')
+    parser.add_argument('--db', default=None, help='数据库文件路径，默认同Database.Default_Path')
+    parser.add_argument('--restart', action='store_true', help='忽略已有进度，从头导入')
+    args = parser.parse_args(argv)
+
+    if args.db:
+        Database.configure(args.db)
+    sheet = int(args.sheet) if str(args.sheet).isdigit() else args.sheet
+    for file_path in args.files:
+        import_file(file_path, table=args.table, sheet_name=sheet, date_column=args.date_column,
+                    chunk_size=args.chunk_size, restart=args.restart)
+
+
+# 用法: python -m com.init.Importer test/SH_MARKET_20160101_20250630.xlsx test/SZ_MARKET_20160101_20250630.xlsx
+if __name__ == '__main__':
+    main()
@@ -1,16 +1,95 @@
 import sqlite3
 import datetime
-import sqlite3
-from typing import List, Tuple, Union
+from typing import Iterable, List, Tuple, Union
+
+import pandas as pd
+
+from com.init import Database
 
-DB_PATH = '/Users/xile/PycharmProjects/RabbitLe/com/init/mydb.db'
+DB_PATH = Database.Default_Path  # 默认路径可由环境变量RABBITLE_DB_PATH指定，运行时用Database.configure()切换
 TABLE_NAME = 'CN_MAKET_BASIC_ALL'
+INSERT_COLUMNS = ('timestamp', 'maket_name', 'com_count', 'total_mv', 'float_mv', 'amount', 'pe')
+INSERT_SQL = "INSERT INTO %s (" + ",".join(INSERT_COLUMNS) + ") VALUES (?, ?, ?, ?, ?, ?, ?)"
+
+# 市场整体指标表（与mydb.db一致）：自增id，按 (timestamp, maket_name) 建索引
+MAKET_BASIC_SCHEMA = f'''
+CREATE TABLE IF NOT EXISTS {TABLE_NAME}(
+    timestamp INTEGER NOT NULL,
+    maket_name TEXT NOT NULL,
+    com_count REAL,
+    total_mv REAL,
+    float_mv REAL,
+    amount REAL,
+    pe REAL,
+    id INTEGER PRIMARY KEY AUTOINCREMENT);
+CREATE INDEX IF NOT EXISTS idx_time ON {TABLE_NAME}(timestamp, maket_name);
+'''
+
+# 行情/基本面表：WITHOUT ROWID，数据按主键 (ts_code, 日期) 聚簇存放，日期为YYYYMMDD整数；
+# 单只证券的区间查询为一次B树定位加连续读取
+MARKET_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS daily_bar(
+    ts_code TEXT NOT NULL,
+    trade_date INTEGER NOT NULL,
+    open REAL,
+    high REAL,
+    low REAL,
+    close REAL,
+    pre_close REAL,
+    change REAL,
+    pct_chg REAL,
+    vol REAL,
+    amount REAL,
+    PRIMARY KEY (ts_code, trade_date)) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS daily_info(
+    ts_code TEXT NOT NULL,      -- 市场代码，如SH_A、SZ_MAIN
+    trade_date INTEGER NOT NULL,
+    ts_name TEXT,
+    com_count REAL,
+    total_share REAL,
+    float_share REAL,
+    total_mv REAL,
+    float_mv REAL,
+    amount REAL,
+    vol REAL,
+    trans_count REAL,
+    pe REAL,
+    tr REAL,
+    exchange TEXT,
+    PRIMARY KEY (ts_code, trade_date)) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS yield_curve(
+    ts_code TEXT NOT NULL,      -- 曲线代码，如1001.CB
+    trade_date INTEGER NOT NULL,
+    curve_type TEXT NOT NULL,   -- 0到期收益率 1即期收益率
+    curve_term REAL NOT NULL,   -- 期限（年）
+    yield REAL,
+    PRIMARY KEY (ts_code, trade_date, curve_type, curve_term)) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS fundamentals(
+    ts_code TEXT NOT NULL,
+    end_date INTEGER NOT NULL,  -- 报告期
+    ann_date INTEGER,
+    roe REAL,
+    roic REAL,
+    grossprofit_margin REAL,
+    netprofit_margin REAL,
+    debt_to_assets REAL,
+    current_ratio REAL,
+    quick_ratio REAL,
+    revenue_ps REAL,
+    profit_dedt REAL,
+    PRIMARY KEY (ts_code, end_date)) WITHOUT ROWID;
+'''
+
+# 以YYYYMMDD整数存储的日期列
+DATE_COLUMNS = ('trade_date', 'end_date', 'ann_date', 'f_ann_date')
+
 
 def createEmptyTable():
-    conn = sqlite3.connect(DB_PATH)
-    try:
-        cursor = conn.cursor()
-        create = '''
+    """建表（可重复执行）：旧的sensor_data表、市场整体指标表及行情/基本面表"""
+    Database.get_db().executescript('''
         CREATE TABLE IF NOT EXISTS sensor_data(
         timestamp INTEGER NOT NULL,
         value1 REAL,
@@ -19,156 +98,298 @@ def createEmptyTable():
         value4 REAL,
         value5 REAL,
         id INTEGER PRIMARY KEY AUTOINCREMENT);
-        '''
-        cursor.execute(create)
-        cursor.execute("CREATE INDEX idx_time ON sensor_data(timestamp);")
-        conn.commit()
-    finally:
-        if 'conn' in locals() and conn:
-            conn.close()  # 确保最终关闭
-
-
-    with sqlite3.connect(DB_PATH) as conn:
-        cursor = conn.cursor()
-        create = '''
-        CREATE TABLE IF NOT EXISTS sensor_data(
-        timestamp INTEGER NOT NULL,
-        value1 REAL,
-        value2 REAL,
-        value3 REAL,
-        value4 REAL,
-        value5 REAL,
-        id INTEGER PRIMARY KEY AUTOINCREMENT);
-        '''
-        cursor.execute(create)
-        cursor.execute("CREATE INDEX idx_time ON sensor_data(timestamp);")
-        conn.commit()
-        conn.close()
+        CREATE INDEX IF NOT EXISTS idx_sensor_time ON sensor_data(timestamp);
+    ''' + MAKET_BASIC_SCHEMA + MARKET_SCHEMA)
 
 
-def batch_insert(data: List[Tuple]) -> bool:
+def batch_insert(data: Iterable[Tuple], chunk_size: int = Database.Chunk_Size) -> bool:
     """
     执行SQLite批量插入操作
 
     参数:
-        data: 待插入数据列表，每个元素为一行数据的元组
-        table_name: 目标表名
-        db_path: 数据库文件路径（默认'app.db'）
+        data: 待插入数据，每个元素为一行数据的元组（列表或生成器，按块消费）
+        chunk_size: 每批的行数（多行VALUES写入，见Database.bulk_insert），全部批次在同一个事务内提交
 
     返回:
-        bool: True表示全部插入成功，False表示失败
+        bool: True表示全部插入成功，False表示失败（整个事务回滚）
     """
-    if not data:
+    if isinstance(data, list) and not data:
         print("警告：空数据集")
         return True  # 无数据视为成功
 
-    conn = None
     try:
-        # 1. 连接数据库（启用行工厂和连接追踪）
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        conn.execute("PRAGMA foreign_keys = ON")  # 启用外键约束[7]
-        cursor = conn.cursor()
-
-        # 2. 动态生成参数化查询（防止SQL注入）
-        placeholders = ', '.join(['?'] * len(data[0]))
-        sql = f"INSERT INTO %s (timestamp,maket_name,com_count,total_mv,float_mv,amount,pe) VALUES ({placeholders})" % TABLE_NAME
-
-        # 3. 事务控制（显式事务提升性能）[2,5]
-        conn.execute("BEGIN TRANSACTION")
-
-        # 4. 批量执行插入[1,3]
-        cursor.executemany(sql, data)
-
-        # 5. 提交事务
-        conn.commit()
-        print(f"成功插入 {cursor.rowcount} 行数据")
+        count = Database.get_db().bulk_insert(TABLE_NAME, INSERT_COLUMNS, data, chunk_size=chunk_size)
+        print(f"成功插入 {count} 行数据")
         return True
 
     except sqlite3.IntegrityError as e:
         # 唯一性约束/外键约束违反[6,8]
-        conn.rollback()
         print(f"数据约束冲突: {e}\n建议: 检查主键重复或外键引用")
         return False
 
     except sqlite3.OperationalError as e:
         # 表不存在/字段不匹配[7]
-        conn.rollback()
         print(f"操作失败: {e}\n建议: 检查表结构或SQL语法")
         return False
 
     except sqlite3.DatabaseError as e:
         # 数据库文件损坏/磁盘满
-        conn.rollback()
         print(f"数据库错误: {e}\n建议: 检查磁盘空间或数据库完整性")
         return False
 
     except Exception as e:
         # 捕获其他未知异常
-        if conn:
-            conn.rollback()
         print(f"未知错误: {type(e).__name__}: {e}")
         return False
 
-    finally:
-        # 确保连接关闭（资源清理）
-        if conn:
-            conn.close()
-
 
 def selectOne(beginDateInt, endDateInt):
-    beg_dt = datetime.datetime.strptime(str(beginDateInt), "%Y%m%d")
-    end_dt = datetime.datetime.strptime(str(endDateInt), "%Y%m%d")
-    beg_timestamp = int(beg_dt.timestamp())
-    end_timestamp = int(end_dt.timestamp())
+    beg_timestamp = _to_timestamp(beginDateInt)
+    end_timestamp = _to_timestamp(endDateInt)
 
     sql_query = """
         SELECT timestamp,value1,value2,value3,value4,value5 FROM sensor_data 
         WHERE timestamp >= ? AND timestamp < ?
         LIMIT 1;
     """
-    with sqlite3.connect(DB_PATH) as conn:
-        conn.row_factory = sqlite3.Row  # 可选：结果按列名访问
-        cursor = conn.cursor()
-        cursor.execute(sql_query, (beg_timestamp, end_timestamp))
-        one_row = cursor.fetchone()
-        if one_row:
-            row_tuple = tuple(one_row)  # 直接转换为元组
-            print(row_tuple)  # 输出：(1, 'Alice')
+    row_tuple = Database.get_db().query_one(sql_query, (beg_timestamp, end_timestamp))
+    if row_tuple:
+        print(row_tuple)  # 输出：(1, 'Alice')
     return row_tuple
 
 
-def selectMany(beginDateInt, endDateInt):
-    beg_dt = datetime.datetime.strptime(str(beginDateInt), "%Y%m%d")
-    end_dt = datetime.datetime.strptime(str(endDateInt), "%Y%m%d")
-    beg_timestamp = int(beg_dt.timestamp())
-    end_timestamp = int(end_dt.timestamp())
-    sql_query = """
-        SELECT timestamp,value1,value2,value3,value4,value5 FROM sensor_data 
+def _to_timestamp(dateInt):
+    """YYYYMMDD整数转换为当日0点（UTC）的秒级时间戳，与库中timestamp列的口径一致"""
+    dt = datetime.datetime.strptime(str(dateInt), "%Y%m%d")
+    return int(dt.replace(tzinfo=datetime.timezone.utc).timestamp())
+
+
+def to_timestamp_column(series):
+    """日期列向量化转换为timestamp（当日0点UTC的秒数），无效日期为NA"""
+    dates = pd.to_datetime(series.astype(str).str.replace('-', '', regex=False).str.slice(0, 8),
+                           format='%Y%m%d', errors='coerce')
+    return pd.Series(dates.to_numpy().astype('datetime64[s]').astype('int64'), index=series.index) \
+        .where(dates.notna()).astype('Int64')
+
+
+# 聚合周期：每个时间戳所属周期的标识（周以周一为标识，月以当月1日为标识）
+PERIOD_SQL = {
+    'W': "date(timestamp, 'unixepoch', 'weekday 0', '-6 days')",
+    'M': "date(timestamp, 'unixepoch', 'start of month')",
+}
+
+# 聚合方式 -> 窗口函数；ohlc展开为四列
+AGG_SQL = {
+    'first': 'first_value({col}) OVER w',
+    'last': 'last_value({col}) OVER w',
+    'max': 'max({col}) OVER w',
+    'min': 'min({col}) OVER w',
+    'sum': 'sum({col}) OVER w',
+    'mean': 'avg({col}) OVER w',
+    'count': 'count({col}) OVER w',
+}
+OHLC = (('open', 'first'), ('high', 'max'), ('low', 'min'), ('close', 'last'))
+
+
+def _check_columns(table, columns):
+    """列名只能来自表结构（列名需拼接进SQL，不能作为参数绑定）"""
+    existing = Database.get_db().table_columns(table)
+    if not existing:
+        raise ValueError(f"表不存在: {table}")
+    unknown = [col for col in columns if col not in existing]
+    if unknown:
+        raise ValueError(f"{table} 中不存在列: {unknown}")
+    return existing
+
+
+def _aggregate_sql(table, freq, agg, group_by):
+    """按周期（和分组列）聚合的SQL：窗口函数计算各组统计量，每组只保留最后一行"""
+    if freq not in PERIOD_SQL:
+        raise ValueError(f"不支持的聚合周期: {freq}")
+    outputs = {}
+    for col, how in agg.items():
+        if how == 'ohlc':
+            outputs.update({f"{col}_{name}": AGG_SQL[base].format(col=col) for name, base in OHLC})
+        elif how in AGG_SQL:
+            outputs[f"{col}_{how}"] = AGG_SQL[how].format(col=col)
+        else:
+            raise ValueError(f"不支持的聚合方式: {how}")
+
+    partition = ', '.join(['period'] + ([group_by] if group_by else []))
+    keys = ', '.join((['period', group_by] if group_by else ['period']) + ['timestamp'])
+    return f"""
+        SELECT {keys}, {', '.join(outputs)} FROM (
+            SELECT {keys}, {', '.join(f'{expr} AS {name}' for name, expr in outputs.items())},
+                   row_number() OVER (PARTITION BY {partition} ORDER BY timestamp DESC) AS _rn
+            FROM (SELECT {PERIOD_SQL[freq]} AS period, * FROM {table} WHERE timestamp >= ? AND timestamp < ?)
+            WINDOW w AS (PARTITION BY {partition} ORDER BY timestamp
+                         ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING)
+        ) WHERE _rn = 1 ORDER BY {keys};
+    """
+
+
+def iter_range(beginDateInt, endDateInt, columns=None, table=TABLE_NAME, chunk_size=100000, as_frame=False,
+               freq=None, agg=None, group_by='maket_name'):
+    """
+    流式范围查询，按块返回列式结果，内存占用只与chunk_size有关
+
+    参数:
+        beginDateInt, endDateInt: 日期范围[begin, end)，YYYYMMDD整数
+        columns: 需要读取的列（列投影），默认全部列
+        table: 表名
+        chunk_size: 每块行数
+        as_frame: True时每块为DataFrame，否则为 {列名: numpy数组}
+        freq: 在数据库内按周期聚合，'W'为周、'M'为月，默认不聚合
+        agg: 聚合方式 {列名: 'ohlc'|'first'|'last'|'max'|'min'|'sum'|'mean'|'count'}，
+             ohlc展开为 列名_open/_high/_low/_close，其余为 列名_方式
+        group_by: 聚合时的分组列（如maket_name），None表示不分组
+
+    返回:
+        生成器，按timestamp升序依次产生每块结果；聚合时每个周期（每组）一行，
+        timestamp为周期内最后一条记录的时间戳，period为周期标识
+    """
+    params = (_to_timestamp(beginDateInt), _to_timestamp(endDateInt))
+    if freq is None:
+        existing = _check_columns(table, columns or [])
+        columns = list(columns or existing)
+        sql = f"SELECT {', '.join(columns)} FROM {table} WHERE timestamp >= ? AND timestamp < ? ORDER BY timestamp;"
+    else:
+        if not agg:
+            raise ValueError("按周期聚合时需指定agg")
+        _check_columns(table, list(agg) + ([group_by] if group_by else []))
+        sql = _aggregate_sql(table, freq, agg, group_by)
+
+    yield from _iter_chunks(sql, params, chunk_size, as_frame)
+
+
+def _iter_chunks(sql, params, chunk_size, as_frame):
+    """流式执行查询，每块转换为DataFrame或 {列名: numpy数组}"""
+    for names, rows in Database.get_db().iter_query(sql, params, chunk_size=chunk_size):
+        frame = pd.DataFrame.from_records(rows, columns=names)
+        if as_frame:
+            yield frame
+        else:
+            yield {name: frame[name].to_numpy() for name in frame.columns}
+
+
+def _to_date_int(series):
+    """日期列（YYYYMMDD字符串/整数、YYYY-MM-DD或datetime）向量化转换为YYYYMMDD整数"""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return (series.dt.year * 10000 + series.dt.month * 100 + series.dt.day).astype('Int64')
+    digits = series.astype(str).str.replace('-', '', regex=False).str.slice(0, 8)
+    return pd.to_numeric(digits, errors='coerce').astype('Int64')
+
+
+def prepare_insert(table, columns, upsert=True):
+    """
+    生成批量写入语句
+
+    参数:
+        table: 目标表名
+        columns: 候选列名，只保留表中存在的列
+        upsert: True时按主键 ON CONFLICT DO UPDATE；表的主键为自增id时总是普通INSERT
+
+    返回:
+        tuple: (sql, 实际写入的列名列表)
+    """
+    db = Database.get_db()
+    existing = db.table_columns(table)
+    if not existing:
+        raise ValueError(f"表不存在: {table}")
+    keys = [row[0] for row in db.query("SELECT name FROM pragma_table_info(?) WHERE pk > 0 ORDER BY pk", (table,))]
+    columns = [col for col in columns if col in existing]
+    sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['?'] * len(columns))})"
+    if not upsert or keys == ['id']:
+        return sql, columns
+
+    missing = [key for key in keys if key not in columns]
+    if missing:
+        raise ValueError(f"缺少主键列: {missing}")
+    updates = [col for col in columns if col not in keys]
+    sql += f" ON CONFLICT({', '.join(keys)}) DO "
+    sql += f"UPDATE SET {', '.join(f'{col} = excluded.{col}' for col in updates)}" if updates else "NOTHING"
+    return sql, columns
+
+
+def frame_rows(df, columns):
+    """DataFrame按列转换为Python列表后逐行拼接（浮点NaN由SQLite存为NULL，日期列转为YYYYMMDD整数）"""
+    values = []
+    for col in columns:
+        series = df[col]
+        if col in DATE_COLUMNS:
+            series = _to_date_int(series)
+        if isinstance(series.dtype, pd.api.extensions.ExtensionDtype):
+            series = series.astype(object).where(series.notna(), None)
+        values.append(series.tolist())
+    return zip(*values)
+
+
+def upsert(table, df, chunk_size=Database.Chunk_Size):
+    """
+    批量写入：INSERT ... ON CONFLICT(主键) DO UPDATE，已存在的行以新数据为准
+
+    参数:
+        table: 目标表名（如daily_bar、daily_info、yield_curve、fundamentals）
+        df: DataFrame，按列名映射到表中同名列，表中没有的列忽略；日期列统一转为YYYYMMDD整数
+        chunk_size: 每批的行数（多行VALUES写入，见Database.bulk_insert），全部批次在同一个事务内提交
+
+    返回:
+        int: 写入的行数
+    """
+    sql, columns = prepare_insert(table, df.columns)
+    return Database.get_db().executemany(sql, frame_rows(df, columns), chunk_size=chunk_size)
+
+
+def iter_symbol(ts_code, beginDateInt=None, endDateInt=None, table='daily_bar', columns=None, chunk_size=100000,
+                as_frame=True, date_column=None):
+    """
+    按主键前缀读取单只证券的区间数据（聚簇表上的一次定位加顺序读取）
+
+    参数:
+        ts_code: 证券/市场/曲线代码
+        beginDateInt, endDateInt: 日期范围[begin, end]，YYYYMMDD整数，默认不限
+        date_column: 主键中的日期列，默认trade_date（fundamentals为end_date）
+
+    返回:
+        生成器，按日期升序依次产生每块结果（DataFrame或 {列名: numpy数组}）
+    """
+    date_column = date_column or ('end_date' if table == 'fundamentals' else 'trade_date')
+    existing = _check_columns(table, (columns or []) + [date_column])
+    columns = list(columns or existing)
+    sql = f"SELECT {', '.join(columns)} FROM {table} WHERE ts_code = ?"
+    params = [ts_code]
+    if beginDateInt is not None:
+        sql += f" AND {date_column} >= ?"
+        params.append(int(beginDateInt))
+    if endDateInt is not None:
+        sql += f" AND {date_column} <= ?"
+        params.append(int(endDateInt))
+    sql += f" ORDER BY ts_code, {date_column};"
+    yield from _iter_chunks(sql, tuple(params), chunk_size, as_frame)
+
+
+def selectMany(beginDateInt, endDateInt, table='sensor_data',
+               columns=('timestamp', 'value1', 'value2', 'value3', 'value4', 'value5')):
+    """
+    查询范围内的全部记录（元组列表）；大范围查询请使用iter_range按块处理
+    """
+    sql_query = f"""
+        SELECT {', '.join(columns)} FROM {table}
         WHERE timestamp >= ? AND timestamp < ?;
     """
-    with sqlite3.connect(DB_PATH) as conn:
-        conn.row_factory = sqlite3.Row  # 可选：结果按列名访问
-        cursor = conn.cursor()
-        cursor.execute(sql_query, (beg_timestamp, end_timestamp))
-        all_rows = cursor.fetchall()
-    for one_row in all_rows:
-        row_tuple = tuple(one_row)  # 直接转换为元组
-        print(row_tuple)
+    _check_columns(table, columns)
+    all_rows = []
+    for _, rows in Database.get_db().iter_query(sql_query, (_to_timestamp(beginDateInt), _to_timestamp(endDateInt))):
+        all_rows.extend(rows)
+    print(f"共查询到 {len(all_rows)} 行数据")
     return all_rows
 
 
-def execute(sql):
-    conn = sqlite3.connect(DB_PATH)
+def execute(sql, params=()):
     try:
-        cursor = conn.cursor()
-        cursor.execute(sql)
-        conn.commit()
+        return Database.get_db().execute(sql, params)
     except sqlite3.Error as e:
         print(f"数据库错误: {e}")
-    finally:
-        if 'conn' in locals() and conn:  # 检查conn是否存在且未关闭
-            conn.close()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,104 @@
+from unittest import TestCase
+from com.example.tools import ApiCache
+from com.example.tools.FetchScheduler import FetchScheduler
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+import tempfile
+import threading
+import time
+
+
+class FakePro:
+    """模拟pro_api，记录实际发出的请求次数"""
+
+    def __init__(self, delay=0.0):
+        self.calls = 0
+        self.delay = delay
+        self.lock = threading.Lock()
+
+    def query(self, api_name, fields='', **kwargs):
+        with self.lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        return pd.DataFrame({'trade_date': [kwargs.get('end_date', '')], 'close': [1.0]})
+
+
+class Test(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.scheduler = FetchScheduler(max_workers=8, rate_limits={'default': 60000})
+
+    def tearDown(self):
+        self.scheduler.shutdown()
+        self.tmp.cleanup()
+
+    def test_history_hits_cache_with_normalized_params(self):
+        fake = FakePro()
+        cache = ApiCache.ResponseCache(cache_dir=self.tmp.name)
+        pro = ApiCache.cached_client(fake, cache=cache, scheduler=self.scheduler)
+
+        first = pro.daily(ts_code='600519.SH', start_date='20200101', end_date='20201231')
+        second = pro.query('daily', end_date=20201231, start_date=20200101, ts_code='600519.SH', fields='')
+        self.assertEqual(fake.calls, 1)
+        pd.testing.assert_frame_equal(first, second)
+
+        # 重新打开缓存目录，历史数据仍然命中
+        pro = ApiCache.cached_client(fake, cache=ApiCache.ResponseCache(cache_dir=self.tmp.name),
+                                     scheduler=self.scheduler)
+        pro.daily(ts_code='600519.SH', start_date='20200101', end_date='20201231')
+        self.assertEqual(fake.calls, 1)
+
+    def test_ttl(self):
+        self.assertIsNone(ApiCache.ttl_for('daily', {'start_date': '20200101', 'end_date': '20201231'},
+                                           today='20250101'))
+        self.assertEqual(ApiCache.ttl_for('daily', {'trade_date': '20250101'}, today='20250101'),
+                         ApiCache.Recent_TTL)
+        self.assertEqual(ApiCache.ttl_for('stock_basic', {'ts_code': '600519.SH'}),
+                         ApiCache.Endpoint_TTL['stock_basic'])
+        # 历史报告期的报表仍可能被更正
+        self.assertEqual(ApiCache.ttl_for('income_vip', {'period': '20201231'}, today='20250101'), 24 * 3600)
+        self.assertEqual(ApiCache.ttl_for('fina_indicator', {'ts_code': '600519.SH', 'end_date': '20201231'},
+                                          today='20250101'), 24 * 3600)
+
+    def test_empty_history_expires(self):
+        cache = ApiCache.ResponseCache(cache_dir=self.tmp.name)
+        params = {'ts_code': '1001.CB', 'start_date': '20200101', 'end_date': '20200131'}
+        for endpoint, value in (('yc_cb', pd.DataFrame()), ('daily', pd.DataFrame({'close': [1.0]}))):
+            cache.put(ApiCache.make_key(endpoint, params), endpoint, params, value)
+        expires = dict(cache._db.execute("SELECT endpoint, expires FROM entries").fetchall())
+        # 空结果可能是数据尚未发布，只短期缓存；有数据的历史区间永久缓存
+        self.assertIsNotNone(expires['yc_cb'])
+        self.assertIsNone(expires['daily'])
+
+    def test_concurrent_identical_requests_coalesce(self):
+        fake = FakePro(delay=0.2)
+        cache = ApiCache.ResponseCache(cache_dir=self.tmp.name)
+        pro = ApiCache.cached_client(fake, cache=cache, scheduler=self.scheduler)
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(lambda _: pro.daily(ts_code='600519.SH', end_date='20201231'), range(8)))
+        self.assertEqual(fake.calls, 1)
+        self.assertEqual(len(results), 8)
+
+    def test_lru_eviction(self):
+        fake = FakePro()
+        cache = ApiCache.ResponseCache(cache_dir=self.tmp.name, max_bytes=1)
+        pro = ApiCache.cached_client(fake, cache=cache, scheduler=self.scheduler)
+
+        pro.daily(ts_code='600519.SH', end_date='20201231')
+        pro.daily(ts_code='000001.SZ', end_date='20201231')
+        # 容量不足时只保留最新写入的一条
+        pro.daily(ts_code='000001.SZ', end_date='20201231')
+        pro.daily(ts_code='600519.SH', end_date='20201231')
+        self.assertEqual(fake.calls, 3)
+
+    def test_pro_api_keeps_explicit_token(self):
+        previous = ApiCache.set_api(None)
+        try:
+            shared = ApiCache.pro_api('token-a')
+            self.assertEqual(ApiCache.pro_api('token-b')._token, 'token-b')
+            # 未指定token或token相同时使用共享客户端
+            self.assertIs(ApiCache.pro_api(), shared)
+            self.assertIs(ApiCache.pro_api('token-a'), shared)
+        finally:
+            ApiCache.set_api(previous)
@@ -0,0 +1,36 @@
+from unittest import TestCase
+import json
+import os
+import tempfile
+from com.example import Benchmark
+
+Tiny = {'days': 120, 'symbols': 3, 'stocks': 30, 'excel_rows': 50, 'insert_rows': 200}
+
+
+class Test(TestCase):
+    def test_run_writes_json_and_compare_flags_regressions(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            output = os.path.join(tmp, 'bench.json')
+            report = Benchmark.run('small', repeat=1, output=output, params=Tiny)
+            with open(output, 'r', encoding='utf-8') as file:
+                saved = json.load(file)
+
+        self.assertEqual(saved['params'], dict(Benchmark.Scales['small'], **Tiny))
+        expected = {'backtest.loop', 'backtest.vectorized', 'metrics.calc_maotai_data', 'screening.stock_filter',
+                    'io.excel_read', 'io.store_read', 'io.sqlite_read', 'insert.batch_insert'}
+        self.assertTrue(expected <= set(saved['results']))
+        for result in saved['results'].values():
+            self.assertGreater(result['best_s'], 0)
+            self.assertGreaterEqual(result['peak_mb'], 0)
+
+        slower = json.loads(json.dumps(report))
+        slower['results']['backtest.loop']['best_s'] *= 2
+        diff = Benchmark.compare(report, slower).set_index('case')
+        self.assertTrue(diff.loc['backtest.loop', 'regression'])
+        self.assertFalse(diff.loc['backtest.vectorized', 'regression'])
+
+    def test_random_walk_bars_shape(self):
+        bars = Benchmark.random_walk_bars(50, symbols=4)
+        self.assertEqual(len(bars), 200)
+        self.assertTrue((bars['close'] > 0).all())
+        self.assertTrue((bars['high'] >= bars[['open', 'close']].max(axis=1)).all())
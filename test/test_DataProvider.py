@@ -0,0 +1,79 @@
+from unittest import TestCase
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import threading
+from com.example.tools import DataProvider
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # 支持keep-alive
+
+    def _reply(self, body, content_type='application/json'):
+        body = body.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        self.server.peers.add(self.client_address)
+        payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        if payload['api_name'] == 'bad':
+            self._reply(json.dumps({'code': 40203, 'msg': '抱歉，您每分钟最多访问该接口2次'}))
+            return
+        self._reply(json.dumps({'code': 0, 'data': {
+            'fields': ['ts_code', 'trade_date', 'token'],
+            'items': [[payload['params']['ts_code'], '20250101', payload['token']]]}}))
+
+    def do_GET(self):
+        self._reply('observation_date,GDP\n2025-01-01,29962.047\n2025-04-01,.\n', 'text/csv')
+
+    def log_message(self, *args):
+        pass
+
+
+class Test(TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        self.server.peers = set()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        self.session = DataProvider.create_session(pool_size=2)
+
+    def tearDown(self):
+        self.session.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_tushare_protocol_and_connection_reuse(self):
+        provider = DataProvider.TushareProvider('secret', url=self.url, session=self.session)
+        for _ in range(5):
+            df = provider.daily(ts_code='600519.SH', fields='ts_code,trade_date')
+        self.assertEqual(df.loc[0, 'ts_code'], '600519.SH')
+        self.assertEqual(df.loc[0, 'token'], 'secret')
+        # 5次请求复用同一个TCP连接
+        self.assertEqual(len(self.server.peers), 1)
+
+        with self.assertRaisesRegex(Exception, '每分钟最多访问'):
+            provider.query('bad')
+
+    def test_fred_series(self):
+        original = DataProvider.Fred_Csv_Url
+        DataProvider.Fred_Csv_Url = self.url + '/fredgraph.csv'
+        try:
+            df = DataProvider.FredProvider(session=self.session).series('GDP', start='2025-01-01')
+        finally:
+            DataProvider.Fred_Csv_Url = original
+        self.assertEqual(df.index.name, 'DATE')
+        self.assertAlmostEqual(df['GDP'].iloc[0], 29962.047)
+        self.assertTrue(df['GDP'].isna().iloc[1])
+
+    def test_shared_provider_per_token(self):
+        first = DataProvider.get_provider('tushare', token='token-a')
+        try:
+            self.assertIs(DataProvider.get_provider('tushare', token='token-a'), first)
+            self.assertEqual(DataProvider.get_provider('tushare', token='token-b')._token, 'token-b')
+        finally:
+            for token in ('token-a', 'token-b'):
+                DataProvider._shared_providers.pop(('tushare', (('token', token),)), None)
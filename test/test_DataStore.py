@@ -0,0 +1,62 @@
+from unittest import TestCase
+from com.example.tools import DataStore
+import pandas as pd
+import tempfile
+
+
+class Test(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_read_with_projection_and_date_range(self):
+        df = pd.DataFrame({
+            'ts_code': ['600519.SH'] * 3 + ['000001.SZ'] * 2,
+            'trade_date': [20241230, 20250102, 20250103, 20250102, 20250103],
+            'close': [1.0, 2.0, 3.0, 4.0, 5.0],
+            'vol': [10, 20, 30, 40, 50],
+        })
+        DataStore.write_dataset(df, 'daily', root=self.root)
+
+        result = DataStore.read_dataset('daily', columns=['trade_date', 'close'], ts_codes=['600519.SH'],
+                                        start_date='20250101', root=self.root)
+        self.assertEqual(list(result.columns), ['trade_date', 'close'])
+        self.assertEqual(result['trade_date'].tolist(), ['20250102', '20250103'])
+        self.assertEqual(result['close'].tolist(), [2.0, 3.0])
+
+    def test_upsert_by_year_partition(self):
+        DataStore.upsert_dataset(pd.DataFrame({'trade_date': ['20241231', '20250102'], '1Y_YTM': [1.0, 2.0]}),
+                                 'bond_yields', keys=('trade_date',), root=self.root)
+        DataStore.upsert_dataset(pd.DataFrame({'trade_date': ['20250102', '20250103'], '1Y_YTM': [9.0, 3.0]}),
+                                 'bond_yields', keys=('trade_date',), root=self.root)
+
+        result = DataStore.read_dataset('bond_yields', root=self.root)
+        self.assertEqual(list(result.columns), ['trade_date', '1Y_YTM'])
+        self.assertEqual(result['trade_date'].tolist(), ['20241231', '20250102', '20250103'])
+        self.assertEqual(result['1Y_YTM'].tolist(), [1.0, 9.0, 3.0])
+
+    def test_missing_dataset(self):
+        self.assertTrue(DataStore.read_dataset('missing', root=self.root).empty)
+
+    def test_append_only_writes_new_rows(self):
+        import glob
+        import os
+        DataStore.append_dataset(pd.DataFrame({'trade_date': ['20241231', '20250102'], '1Y_YTM': [1.0, 2.0]}),
+                                 'bond_yields', keys=('trade_date',), root=self.root)
+        self.assertEqual(DataStore.high_water_mark('bond_yields', root=self.root), '20250102')
+        files_2024 = glob.glob(os.path.join(self.root, 'bond_yields', 'year=2024', '*.parquet'))
+
+        # 重叠日期以新数据为准，新日期追加为新文件，未涉及的2024分区不被改写
+        DataStore.append_dataset(pd.DataFrame({'trade_date': ['20250102', '20250103', '20250103'],
+                                               '1Y_YTM': [9.0, 3.0, 4.0]}),
+                                 'bond_yields', keys=('trade_date',), root=self.root)
+        self.assertEqual(glob.glob(os.path.join(self.root, 'bond_yields', 'year=2024', '*.parquet')), files_2024)
+
+        result = DataStore.read_dataset('bond_yields', root=self.root)
+        self.assertEqual(result['trade_date'].tolist(), ['20241231', '20250102', '20250103'])
+        self.assertEqual(result['1Y_YTM'].tolist(), [1.0, 9.0, 4.0])
+        self.assertEqual(DataStore.high_water_mark('bond_yields', root=self.root), '20250103')
+        self.assertEqual(DataStore.high_water_mark('bond_yields', partition=2024, root=self.root), '20241231')
@@ -0,0 +1,57 @@
+from unittest import TestCase
+from com.init import Database
+from concurrent.futures import ThreadPoolExecutor
+import os
+import sqlite3
+import tempfile
+
+
+class Test(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = Database.Database(os.path.join(self.tmp.name, 'test.db'), pool_size=2)
+        self.db.executescript("CREATE TABLE t(k INTEGER PRIMARY KEY, v REAL);")
+
+    def tearDown(self):
+        self.db.close()
+        self.tmp.cleanup()
+
+    def test_pragmas_applied(self):
+        with self.db.connection() as conn:
+            self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], 'wal')
+            self.assertEqual(conn.execute("PRAGMA synchronous").fetchone()[0], 1)  # NORMAL
+
+    def test_executemany_chunks_in_one_transaction(self):
+        count = self.db.executemany("INSERT INTO t VALUES (?, ?)", ((i, i * 0.5) for i in range(1000)), chunk_size=64)
+        self.assertEqual(count, 1000)
+        self.assertEqual(self.db.query_one("SELECT COUNT(*), SUM(k) FROM t"), (1000, 499500))
+
+        # 任一块失败时整个批次回滚
+        with self.assertRaises(sqlite3.IntegrityError):
+            self.db.executemany("INSERT INTO t VALUES (?, ?)", [(2000, 0.0), (2001, 0.0), (5, 0.0)], chunk_size=2)
+        self.assertEqual(self.db.query_one("SELECT COUNT(*) FROM t")[0], 1000)
+
+    def test_pool_reuses_connections_across_threads(self):
+        def work(i):
+            self.db.execute("INSERT INTO t VALUES (?, ?)", (i, 1.0))
+            return self.db.query_one("SELECT v FROM t WHERE k = ?", (i,))[0]
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            self.assertEqual(list(executor.map(work, range(200))), [1.0] * 200)
+        self.assertLessEqual(self.db._created, 2)
+
+    def test_bulk_insert_multi_row_statements(self):
+        Database.Rows_Per_Statement, original = 7, Database.Rows_Per_Statement
+        try:
+            count = self.db.bulk_insert('t', ['k', 'v'], ((i, i * 0.5) for i in range(1000)), chunk_size=64)
+        finally:
+            Database.Rows_Per_Statement = original
+        self.assertEqual(count, 1000)
+        self.assertEqual(self.db.query_one("SELECT COUNT(*), SUM(k), SUM(v) FROM t"), (1000, 499500, 249750.0))
+
+        # 列数不符或任一块失败时整个批次回滚
+        with self.assertRaises(ValueError):
+            self.db.bulk_insert('t', ['k', 'v'], [(2000, 0.0), (2001,)])
+        with self.assertRaises(sqlite3.IntegrityError):
+            self.db.bulk_insert('t', ['k', 'v'], [(2000, 0.0), (2001, 0.0), (5, 0.0)], chunk_size=2)
+        self.assertEqual(self.db.query_one("SELECT COUNT(*) FROM t")[0], 1000)
@@ -0,0 +1,103 @@
+from unittest import TestCase
+import tempfile
+import threading
+import pandas as pd
+from com.example.tools import DataStore, FetchPlanner, FetchScheduler, TradingCalendar
+
+Tenors = [0.5, 1.0, 2.0, 3.0, 5.0, 7.0, 10.0, 20.0, 30.0, 50.0] * 3  # 每日30个期限（含重复的曲线点）
+
+
+class FakeCurveApi:
+    """模拟yc_cb：工作日有数据，每次最多返回2000行（超出部分截断）"""
+
+    def __init__(self):
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def yc_cb(self, ts_code, curve_type, start_date, end_date, curve_term=None, fields=''):
+        with self.lock:
+            self.calls.append((start_date, end_date, curve_term))
+        days = pd.bdate_range(start_date, end_date).strftime('%Y%m%d')
+        terms = Tenors if curve_term is None else [float(curve_term)]
+        df = pd.DataFrame([(day, ts_code, curve_type, term, float(day[-4:]) / 1000 + term)
+                           for day in days for term in terms],
+                          columns=['trade_date', 'ts_code', 'curve_type', 'curve_term', 'yield'])
+        return df.iloc[:2000]
+
+
+class Test(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.scheduler = FetchScheduler.FetchScheduler(max_workers=4)
+        self.calendar = TradingCalendar.TradingCalendar.weekdays('20100101', '20301231')
+        FetchPlanner.Tenors_Per_Day.clear()
+
+    def tearDown(self):
+        self.scheduler.shutdown()
+        self.tmp.cleanup()
+        FetchPlanner.Tenors_Per_Day.clear()
+
+    def test_range_arithmetic(self):
+        self.assertEqual(FetchPlanner.subtract_ranges('20240101', '20241231', [['20240301', '20240630']]),
+                         [['20240101', '20240229'], ['20240701', '20241231']])
+        self.assertEqual(DataStore.merge_ranges([['20240105', '20240110'], ['20240101', '20240104']]),
+                         [['20240101', '20240110']])
+        chunks = FetchPlanner.chunk_range('20240101', '20241231', rows_per_day=30, row_limit=2000,
+                                          calendar=self.calendar)
+        self.assertTrue(all(FetchPlanner.business_days(start, end, self.calendar) * 30 <= 2000
+                            for start, end in chunks))
+        self.assertEqual((chunks[0][0], chunks[-1][1]), ('20240101', '20241231'))
+        # 只含休市日的区间不请求
+        self.assertEqual(FetchPlanner.chunk_range('20240106', '20240107', 30, 2000, calendar=self.calendar), [])
+
+    def test_plan_prefers_fewer_calls(self):
+        missing = [['20160101', '20251231']]
+        all_tenors = FetchPlanner.plan_requests(missing, [1, 3, 5, 10], tenors_per_day=4,
+                                                calendar=self.calendar)
+        self.assertTrue(all(request['curve_term'] is None for request in all_tenors))
+        per_term = FetchPlanner.plan_requests(missing, [10], tenors_per_day=200, calendar=self.calendar)
+        self.assertTrue(all(request['curve_term'] == 10 for request in per_term))
+        self.assertLess(len(per_term), len(FetchPlanner.plan_requests(missing, [10], tenors_per_day=None,
+                                                                      calendar=self.calendar)))
+
+    def test_fetch_pivots_once_and_skips_stored_ranges(self):
+        api = FakeCurveApi()
+        kwargs = dict(terms=(1, 10), dataset='curve', client=api, scheduler=self.scheduler, calendar=self.calendar,
+                      root=self.tmp.name)
+
+        df, fetched = FetchPlanner.fetch_yield_curve('20230101', '20241231', **kwargs)
+        self.assertEqual(list(df.columns), ['trade_date', '1Y_YTM', '10Y_YTM'])
+        self.assertEqual(len(df), len(pd.bdate_range('20230101', '20241231')))
+        self.assertAlmostEqual(df.set_index('trade_date').loc['20240102', '10Y_YTM'], 0.102 + 10)
+        self.assertFalse(df[['1Y_YTM', '10Y_YTM']].isna().any().any())
+        # 首个区间按估计大小请求，之后按实测的每日期限数规划，远少于逐期限×逐区间
+        first_round = len(api.calls)
+        self.assertLessEqual(first_round, 2 + -(-len(df) * 30 // 2000))
+
+        DataStore.write_dataset(df, 'curve', partition_by='year', root=self.tmp.name)
+        FetchPlanner.record_fetched('curve', fetched, root=self.tmp.name)
+
+        # 再次请求只拉取新增的日期
+        df, fetched = FetchPlanner.fetch_yield_curve('20230101', '20250131', **kwargs)
+        self.assertEqual(df['trade_date'].min(), '20250101')
+        self.assertEqual(len(api.calls), first_round + 1)
+        self.assertEqual(fetched[10], [['20250101', '20250131']])
+
+    def test_unpublished_days_are_not_recorded(self):
+        class LateCurveApi(FakeCurveApi):
+            """20240110之后的数据尚未发布"""
+
+            def yc_cb(self, ts_code, curve_type, start_date, end_date, curve_term=None, fields=''):
+                df = super().yc_cb(ts_code, curve_type, start_date, end_date, curve_term, fields)
+                return df[df['trade_date'] <= '20240110'].reset_index(drop=True)
+
+        api = LateCurveApi()
+        kwargs = dict(terms=(1, 10), client=api, scheduler=self.scheduler, calendar=self.calendar,
+                      root=self.tmp.name)
+        _, fetched = FetchPlanner.fetch_yield_curve('20240101', '20240115', **kwargs)
+        self.assertEqual(fetched[1], [['20240101', '20240110']])
+        _, fetched = FetchPlanner.fetch_yield_curve('20240111', '20240115', **kwargs)
+        self.assertEqual(fetched[10], [])
+        # 最后一个有数据的日期之后只有休市日时记录整个区间
+        self.assertEqual(FetchPlanner.covered_end(api.yc_cb('1001.CB', '1', '20240105', '20240107'),
+                                                  '20240105', '20240107', self.calendar), '20240107')
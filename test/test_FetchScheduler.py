@@ -0,0 +1,45 @@
+from unittest import TestCase
+from com.example.tools.FetchScheduler import FetchScheduler
+import threading
+import time
+
+
+class Test(TestCase):
+    def test_rate_limit_and_concurrency(self):
+        scheduler = FetchScheduler(max_workers=4, rate_limits={'fast': 600})  # 每0.1秒一次
+        calls = []
+
+        def fetch(i):
+            calls.append(time.monotonic())
+            time.sleep(0.2)  # 模拟网络延迟
+            return i
+
+        start = time.monotonic()
+        results = {key: value for key, value, error in scheduler.imap('fast', fetch, {i: {'i': i} for i in range(6)})}
+        elapsed = time.monotonic() - start
+        scheduler.shutdown()
+
+        self.assertEqual(results, {i: i for i in range(6)})
+        gaps = [b - a for a, b in zip(sorted(calls), sorted(calls)[1:])]
+        self.assertGreaterEqual(min(gaps), 0.09)
+        # 延迟与限流等待重叠执行，明显快于串行的6*(0.2+0.1)秒
+        self.assertLess(elapsed, 1.4)
+
+    def test_backoff_on_quota_error(self):
+        scheduler = FetchScheduler(max_workers=1, backoff=0.05)
+        attempts = []
+        lock = threading.Lock()
+
+        def fetch():
+            with lock:
+                attempts.append(1)
+                if len(attempts) < 3:
+                    raise Exception("抱歉，您每分钟最多访问该接口2次")
+            return 'ok'
+
+        self.assertEqual(scheduler.call('yc_test', fetch), 'ok')
+        self.assertEqual(len(attempts), 3)
+
+        with self.assertRaises(ValueError):
+            scheduler.call('yc_test', lambda: (_ for _ in ()).throw(ValueError("参数错误")))
+        scheduler.shutdown()
@@ -0,0 +1,131 @@
+from unittest import TestCase
+import tempfile
+import threading
+import numpy as np
+import pandas as pd
+from com.example.tools import ApiCache, FetchScheduler, Fundamentals
+
+Columns = ['ts_code', 'ann_date', 'f_ann_date', 'end_date', 'report_type', 'update_flag', 'n_income']
+
+
+def make_versions():
+    return pd.DataFrame([
+        ('A', '20230320', '20230320', '20221231', '1', '0', 100.0),
+        ('A', '20230420', '20230420', '20230331', '1', '0', 30.0),
+        # 2022年报在2023Q1季报之后更正：只影响报告期为2022年报的查询
+        ('A', '20230320', '20230601', '20221231', '1', '1', 90.0),
+        ('A', '20240325', '20240325', '20231231', '1', '0', 120.0),
+        ('A', '20240325', '20240325', '20231231', '2', '0', 999.0),  # 母公司报表
+        ('B', '20230410', None, '20221231', '1', '0', 50.0),
+    ], columns=Columns)
+
+
+class FakeStatementApi:
+    def __init__(self, versions):
+        self.versions = versions
+        self.lock = threading.Lock()
+        self.calls = []
+
+    def query(self, api_name, period, limit, offset, fields=''):
+        with self.lock:
+            self.calls.append((api_name, period, offset))
+        df = self.versions[self.versions['end_date'] == period]
+        return df.iloc[offset:offset + limit].reset_index(drop=True)
+
+
+class Test(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_point_in_time(self):
+        versions = make_versions()
+        before = Fundamentals.point_in_time(versions, '20230501')
+        self.assertEqual(before[before['ts_code'] == 'A'].sort_values('end_date')['n_income'].tolist(), [100.0, 30.0])
+        after = Fundamentals.point_in_time(versions, '20230601')
+        self.assertEqual(after[(after['ts_code'] == 'A') & (after['end_date'] == '20221231')]['n_income'].tolist(),
+                         [90.0])
+        # 公告之前不可见
+        self.assertEqual(Fundamentals.point_in_time(versions, '20230319').empty, True)
+        with self.assertRaises(ValueError):
+            Fundamentals.point_in_time(versions.drop(columns=['ann_date', 'f_ann_date']), '20230601')
+
+    def test_as_of_panel(self):
+        versions = make_versions()
+        queries = pd.DataFrame({'ts_code': ['A', 'A', 'A', 'A', 'B', 'B', 'C'],
+                                'trade_date': ['20230101', '20230321', '20230421', '20230701', '20230409',
+                                               '20230411', '20230411']})
+        latest = Fundamentals.as_of(queries, versions, fields=['n_income'])
+        self.assertEqual(latest['trade_date'].tolist(), queries['trade_date'].tolist())
+        # 更正发生在更新的报告期之后，最新一期仍为2023Q1；公告前为NaN；没有f_ann_date时用ann_date
+        np.testing.assert_array_equal(latest['n_income'].to_numpy(), [np.nan, 100.0, 30.0, 30.0, np.nan, 50.0, np.nan])
+        annual = Fundamentals.as_of(queries, versions, fields=['n_income'], period='annual')
+        np.testing.assert_array_equal(annual['n_income'].to_numpy()[:4], [np.nan, 100.0, 100.0, 90.0])
+        self.assertEqual(annual['end_date'].tolist()[3], '20221231')
+
+        # 大面板与逐行point_in_time结果一致
+        rng = np.random.default_rng(0)
+        codes = [f'{i:06d}.SZ' for i in range(200)]
+        rows = []
+        for code in codes:
+            for year in range(2015, 2024):
+                ann = f"{year + 1}{rng.integers(1, 5):02d}{rng.integers(10, 28):02d}"
+                rows.append((code, ann, ann, f'{year}1231', '1', '0', rng.normal()))
+                if rng.random() < 0.3:
+                    fix = f"{year + 1}{rng.integers(5, 13):02d}{rng.integers(10, 28):02d}"
+                    rows.append((code, ann, fix, f'{year}1231', '1', '1', rng.normal()))
+        versions = pd.DataFrame(rows, columns=Columns)
+        dates = pd.bdate_range('20160101', '20241231', freq='20B').strftime('%Y%m%d')
+        queries = pd.DataFrame([(code, date) for code in codes for date in dates], columns=['ts_code', 'trade_date'])
+        latest = Fundamentals.as_of(queries, versions, fields=['n_income'])
+        for code, date in [(codes[0], dates[5]), (codes[7], dates[40]), (codes[199], dates[-1])]:
+            known = Fundamentals.point_in_time(versions[versions['ts_code'] == code], date)
+            expected = known.sort_values('end_date')['n_income'].iloc[-1] if not known.empty else np.nan
+            row = latest[(latest['ts_code'] == code) & (latest['trade_date'] == date)]
+            np.testing.assert_allclose(row['n_income'].to_numpy(), [expected])
+
+    def test_store_keeps_versions(self):
+        versions = make_versions()
+        api = FakeStatementApi(versions)
+        scheduler = FetchScheduler.FetchScheduler(max_workers=2)
+        page_size = Fundamentals.Page_Size
+        Fundamentals.Page_Size = 2
+        try:
+            written = Fundamentals.ingest(['20221231', '20230331', '20231231'], names=('income',), client=api,
+                                          scheduler=scheduler, root=self.tmp.name)
+            Fundamentals.ingest(['20221231'], names=('income',), client=api, scheduler=scheduler, root=self.tmp.name)
+        finally:
+            Fundamentals.Page_Size = page_size
+            scheduler.shutdown()
+        self.assertEqual(written, {'income': len(versions)})
+        self.assertIn(('income_vip', '20221231', 2), api.calls)
+
+        stored = Fundamentals.load_versions('income', root=self.tmp.name)
+        self.assertEqual(len(stored), len(versions))
+        known = Fundamentals.load_versions('income', as_of_date='20230501', columns=['n_income'], root=self.tmp.name)
+        self.assertEqual(sorted(known['n_income'].tolist()), [30.0, 50.0, 100.0])
+        queries = pd.DataFrame({'ts_code': ['A', 'A'], 'trade_date': ['20230501', '20240401']})
+        latest = Fundamentals.as_of(queries, stored, fields=['n_income'])
+        self.assertEqual(latest['n_income'].tolist(), [30.0, 120.0])
+
+    def test_ingest_picks_up_corrections(self):
+        versions = make_versions()
+        api = FakeStatementApi(versions[versions['update_flag'] == '0'])
+        scheduler = FetchScheduler.FetchScheduler(max_workers=2)
+        previous = ApiCache.set_api(api)
+        try:
+            Fundamentals.ingest(['20221231'], names=('income',), scheduler=scheduler, root=self.tmp.name)
+            # 同一报告期之后发布的更正：再次拉取时必须重新请求，而不是命中缓存
+            api.versions = versions
+            Fundamentals.ingest(['20221231'], names=('income',), scheduler=scheduler, root=self.tmp.name)
+        finally:
+            ApiCache.set_api(previous)
+            scheduler.shutdown()
+        self.assertEqual(len(api.calls), 2)
+        stored = Fundamentals.load_versions('income', root=self.tmp.name)
+        self.assertEqual(len(stored), 3)
+        self.assertEqual(sorted(stored['f_ann_date'].dropna().tolist()), ['20230320', '20230601'])
+        latest = Fundamentals.point_in_time(stored, '20230601')
+        self.assertEqual(latest[latest['ts_code'] == 'A']['n_income'].tolist(), [90.0])
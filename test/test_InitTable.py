@@ -1,11 +1,75 @@
 from unittest import TestCase
-from com.init import InitTable
+from com.init import Database, Importer, InitTable
 import sqlite3  # 或 pymysql/psycopg2
 import pandas as pd
 import os
-from datetime import datetime
+import tempfile
+from datetime import datetime, timezone
 
 class Test(TestCase):
+    def setUp(self):
+        # 使用临时数据库，避免改动仓库中的mydb.db
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = Database.configure(os.path.join(self.tmp.name, 'test.db'))
+        self.db.executescript('''
+            CREATE TABLE CN_MAKET_BASIC_ALL(
+            timestamp INTEGER NOT NULL,
+            maket_name TEXT NOT NULL,
+            com_count REAL,
+            total_mv REAL,
+            float_mv REAL,
+            amount REAL,
+            pe REAL,
+            id INTEGER PRIMARY KEY AUTOINCREMENT);
+        ''')
+
+    def tearDown(self):
+        Database.configure()
+        self.tmp.cleanup()
+
+    def test_iter_range_streams_projected_chunks(self):
+        days = pd.bdate_range('2024-01-01', '2024-03-29')
+        rows = [(int(day.timestamp()), market, 1.0, float(i), 1.0, 1.0, 10.0)
+                for i, day in enumerate(days) for market in ('SH', 'SZ')]
+        InitTable.batch_insert(rows)
+
+        chunks = list(InitTable.iter_range(20240101, 20240401, columns=['timestamp', 'total_mv'], chunk_size=50))
+        self.assertEqual([len(chunk['timestamp']) for chunk in chunks], [50, 50, 30])
+        self.assertEqual(list(chunks[0]), ['timestamp', 'total_mv'])
+        self.assertEqual(chunks[-1]['total_mv'][-1], len(days) - 1)
+
+        monthly = pd.concat(InitTable.iter_range(20240101, 20240401, freq='M', as_frame=True,
+                                                 agg={'total_mv': 'ohlc', 'amount': 'sum'}))
+        self.assertEqual(monthly['period'].tolist(), ['2024-01-01'] * 2 + ['2024-02-01'] * 2 + ['2024-03-01'] * 2)
+        jan = monthly.iloc[0]
+        self.assertEqual((jan['total_mv_open'], jan['total_mv_high'], jan['total_mv_low'], jan['total_mv_close']),
+                         (0.0, 22.0, 0.0, 22.0))
+        self.assertEqual(jan['amount_sum'], 23.0)
+
+        with self.assertRaises(ValueError):
+            next(InitTable.iter_range(20240101, 20240401, columns=['timestamp; DROP TABLE x']))
+
+    def test_schema_upsert_and_symbol_range(self):
+        InitTable.createEmptyTable()
+        InitTable.createEmptyTable()  # 可重复执行
+        self.assertEqual([row[0] for row in self.db.query("SELECT name FROM pragma_index_info('idx_time')")],
+                         ['timestamp', 'maket_name'])
+
+        bars = pd.DataFrame({'ts_code': ['600519.SH', '600519.SH', '000001.SZ'],
+                             'trade_date': ['20250102', '2025-01-03', '20250102'],
+                             'close': [1500.0, 1510.0, 11.0], 'unknown': [0, 0, 0]})
+        self.assertEqual(InitTable.upsert('daily_bar', bars), 3)
+        InitTable.upsert('daily_bar', pd.DataFrame({'ts_code': ['600519.SH', '600519.SH'],
+                                                    'trade_date': [20250103, 20250106], 'close': [1520.0, 1530.0]}))
+
+        result = pd.concat(InitTable.iter_symbol('600519.SH', 20250103, columns=['trade_date', 'close']))
+        self.assertEqual(result['trade_date'].tolist(), [20250103, 20250106])
+        self.assertEqual(result['close'].tolist(), [1520.0, 1530.0])
+        self.assertEqual(self.db.query_one("SELECT COUNT(*) FROM daily_bar")[0], 4)
+
+        with self.assertRaises(ValueError):
+            InitTable.upsert('daily_bar', pd.DataFrame({'ts_code': ['600519.SH'], 'close': [1.0]}))
+
     def test_batch_insert(self):
         list_row = [
             (1577837800,0.1,0.2,0.3,0.4,0.5),
@@ -21,20 +85,69 @@ class Test(TestCase):
         InitTable.execute(sql)
 
     def test_convert_dataformat_from_csv(self, date_column='trade_date'):
-        #file_path = '/Users/xile/PycharmProjects/RabbitLe/test/SH_MARKET_20160101_20250630.xlsx'
-        file_path = '/Users/xile/PycharmProjects/RabbitLe/test/SZ_MARKET_20160101_20250630.xlsx'
-        if not os.path.exists(file_path):
-            raise FileNotFoundError(f"文件不存在: {file_path}")
-        df = pd.read_excel(file_path)
-        df[date_column] = pd.to_datetime(df[date_column], format='%Y%m%d', errors='coerce')
-        df['timestamp'] = df[date_column].astype('int64') // 10**9
-        if df[date_column].isnull().any():
-            print(f"警告：发现 {df[date_column].isnull().sum()} 个无效日期，已自动删除")
-            df = df.dropna(subset=[date_column])
-        columns = [col for col in df.columns if col not in [date_column, 'timestamp']]  # 排除原日期列
-        data_list = list(df[['timestamp'] + columns].itertuples(index=False, name=None))
-        InitTable.batch_insert(data_list)
+        test_dir = os.path.dirname(os.path.abspath(__file__))
+        for name in ('SH_MARKET_20160101_20250630.xlsx', 'SZ_MARKET_20160101_20250630.xlsx'):
+            file_path = os.path.join(test_dir, name)
+            if not os.path.exists(file_path):
+                raise FileNotFoundError(f"文件不存在: {file_path}")
+            Importer.import_file(file_path, date_column=date_column, chunk_size=1000)
+
+        counts = dict(self.db.query("SELECT maket_name, COUNT(*) FROM CN_MAKET_BASIC_ALL GROUP BY maket_name"))
+        self.assertEqual(counts, {'SH': 1592, 'SZ': 2324})
+        # 日期转换为当日0点（UTC）的时间戳
+        self.assertEqual(self.db.query_one("SELECT MAX(timestamp) FROM CN_MAKET_BASIC_ALL")[0],
+                         int(datetime(2025, 7, 28, tzinfo=timezone.utc).timestamp()))
+
+    def test_import_resumes_from_last_committed_chunk(self):
+        csv_path = os.path.join(self.tmp.name, 'market.csv')
+        pd.DataFrame({'trade_date': [20250101 + i for i in range(10)], 'maket_name': 'SH',
+                      'pe': [float(i) for i in range(10)]}).to_csv(csv_path, index=False)
+
+        # 第3块写入时失败，前两块已提交
+        original = InitTable.frame_rows
+        calls = []
+
+        def failing_rows(df, columns):
+            calls.append(len(df))
+            if len(calls) == 3:
+                raise RuntimeError("模拟中断")
+            return original(df, columns)
+
+        InitTable.frame_rows = failing_rows
+        try:
+            with self.assertRaises(RuntimeError):
+                Importer.import_file(csv_path, chunk_size=3)
+        finally:
+            InitTable.frame_rows = original
+        self.assertEqual(self.db.query_one("SELECT COUNT(*) FROM CN_MAKET_BASIC_ALL")[0], 6)
 
+        self.assertEqual(Importer.import_file(csv_path, chunk_size=3), 4)
+        self.assertEqual([row[0] for row in self.db.query("SELECT pe FROM CN_MAKET_BASIC_ALL ORDER BY timestamp")],
+                         [float(i) for i in range(10)])
+        self.assertEqual(Importer.import_file(csv_path, chunk_size=3), 0)  # 已完成的文件不重复导入
 
+    def test_reimport_replaces_previous_rows(self):
+        csv_path = os.path.join(self.tmp.name, 'market.csv')
+        frame = pd.DataFrame({'trade_date': [20250101 + i for i in range(5)], 'maket_name': 'SZ',
+                              'pe': [float(i) for i in range(5)]})
+        frame.to_csv(csv_path, index=False)
+        other_path = os.path.join(self.tmp.name, 'other.csv')
+        frame.assign(maket_name='SH').to_csv(other_path, index=False)
+        Importer.import_file(csv_path, chunk_size=2)
+        Importer.import_file(other_path, chunk_size=2)
 
+        # 源文件变化或指定restart时从头导入，自增id表中不保留上次导入的行，其他文件的行不受影响
+        frame.assign(pe=frame['pe'] * 10).iloc[:4].to_csv(csv_path, index=False)
+        self.assertEqual(Importer.import_file(csv_path, chunk_size=2), 4)
+        self.assertEqual(Importer.import_file(csv_path, chunk_size=2, restart=True), 4)
+        counts = dict(self.db.query("SELECT maket_name, COUNT(*) FROM CN_MAKET_BASIC_ALL GROUP BY maket_name"))
+        self.assertEqual(counts, {'SH': 5, 'SZ': 4})
+        self.assertEqual([row[0] for row in self.db.query(
+            "SELECT pe FROM CN_MAKET_BASIC_ALL WHERE maket_name = 'SZ' ORDER BY timestamp")], [0.0, 10.0, 20.0, 30.0])
 
+    def test_select_one_uses_utc_dates(self):
+        InitTable.createEmptyTable()
+        midnight = int(datetime(2025, 1, 2, tzinfo=timezone.utc).timestamp())
+        self.db.execute("INSERT INTO sensor_data (timestamp, value1) VALUES (?, ?)", (midnight, 1.0))
+        self.assertEqual(InitTable.selectOne(20250102, 20250103)[0], midnight)
+        self.assertIsNone(InitTable.selectOne(20250103, 20250104))
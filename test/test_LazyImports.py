@@ -0,0 +1,38 @@
+from unittest import TestCase
+import os
+import subprocess
+import sys
+
+_root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+Heavy = ('tushare', 'matplotlib', 'yfinance', 'schedule', 'pandas_datareader', 'pyarrow.dataset')
+
+
+def _import_and_report(modules):
+    """在子进程中导入模块，返回已加载的重量级依赖"""
+    code = (f"import sys\n"
+            f"for name in {list(modules)!r}: __import__(name)\n"
+            f"print(','.join(m for m in {Heavy!r} if m in sys.modules))")
+    out = subprocess.run([sys.executable, '-c', code], cwd=_root, capture_output=True, text=True,
+                         env=dict(os.environ, PYTHONPATH=_root))
+    if out.returncode != 0:
+        raise AssertionError(out.stderr)
+    return [name for name in out.stdout.strip().split(',') if name]
+
+
+class Test(TestCase):
+    def test_import_does_not_load_heavy_dependencies(self):
+        # 导入时不读取token（测试环境没有配置文件）、不导入tushare/matplotlib/pyarrow等
+        loaded = _import_and_report(['com.example', 'com.example.CalcuMaoTai', 'com.example.ETFDataGet',
+                                     'com.example.BondsDataGet', 'com.example.MaoTai_20_Strategy',
+                                     'com.example.StrategySweep', 'com.example.DataGet',
+                                     'com.example.tools.Metrics'])
+        self.assertEqual(loaded, [])
+
+    def test_lazy_client_defers_construction(self):
+        from com.example.tools import ApiCache
+
+        client = ApiCache.lazy_client()
+        self.assertIsNone(ApiCache._shared_client)
+        with self.assertRaises(AttributeError):
+            client._private
@@ -0,0 +1,38 @@
+from unittest import TestCase
+from com.example.MaoTai_20_Strategy import MA20Strategy
+import numpy as np
+import pandas as pd
+
+
+def make_sample_data(n=3000, seed=42):
+    """生成随机游走的模拟收盘价"""
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(start='2015-01-01', periods=n, freq='B')
+    close = np.maximum(150 + np.cumsum(rng.normal(0, 2, n)), 5)
+    return pd.DataFrame({'close': close}, index=pd.Index(dates, name='trade_date'))
+
+
+class Test(TestCase):
+    def test_vectorized_backtest_matches_loop(self):
+        strategy = MA20Strategy(window=20)
+        strategy.data = make_sample_data()
+        self.assertTrue(strategy.generate_signals())
+
+        self.assertTrue(strategy.backtest())
+        loop_results = strategy.results
+        self.assertTrue(strategy.backtest(vectorized=True))
+        vectorized_results = strategy.results
+
+        for column in ['cash', 'shares', 'total_assets']:
+            np.testing.assert_array_equal(loop_results[column].to_numpy(),
+                                          vectorized_results[column].to_numpy())
+
+    def test_vectorized_backtest_insufficient_cash(self):
+        strategy = MA20Strategy(window=5)
+        strategy.data = make_sample_data(n=500)
+        strategy.generate_signals()
+
+        # 资金不足一手时不应产生任何持仓
+        strategy.backtest(initial_capital=1000.0, vectorized=True)
+        self.assertTrue((strategy.results['shares'] == 0).all())
+        self.assertTrue((strategy.results['total_assets'] == 1000.0).all())
@@ -0,0 +1,85 @@
+from unittest import TestCase
+import os
+import tempfile
+import threading
+import pandas as pd
+from com.example.tools import DataStore, FetchScheduler, MarketIngest, TradingCalendar
+
+Codes = [f'{i:06d}.SZ' for i in range(1, 8)]
+
+
+class FakeMarketApi:
+    """模拟按交易日的截面接口：工作日开市，每个截面7只代码，每页最多5行"""
+
+    def __init__(self):
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def _section(self, endpoint, trade_date, offset=0, limit=5):
+        with self.lock:
+            self.calls.append((endpoint, trade_date, offset))
+        rows = [(code, trade_date, float(trade_date[-2:]) + i, 100 + i) for i, code in enumerate(Codes)]
+        df = pd.DataFrame(rows, columns=['ts_code', 'trade_date', 'close', 'vol'])
+        if endpoint.endswith('adj_factor'):
+            df = df[['ts_code', 'trade_date']].assign(adj_factor=1.5)
+        return df.iloc[offset:offset + limit].reset_index(drop=True)
+
+    def daily(self, trade_date, offset=0, limit=5, fields=''):
+        return self._section('daily', trade_date, offset, limit)
+
+    def adj_factor(self, trade_date, offset=0, limit=5, fields=''):
+        return self._section('adj_factor', trade_date, offset, limit)
+
+
+class Test(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.scheduler = FetchScheduler.FetchScheduler(max_workers=4)
+        self.calendar = TradingCalendar.TradingCalendar.weekdays('20240101', '20251231')
+        self.limits = dict(MarketIngest.Page_Limits)
+        MarketIngest.Page_Limits.update(daily=5, adj_factor=5)
+
+    def tearDown(self):
+        MarketIngest.Page_Limits.clear()
+        MarketIngest.Page_Limits.update(self.limits)
+        self.scheduler.shutdown()
+        self.tmp.cleanup()
+
+    def test_day_runs(self):
+        days = ['20241230', '20241231', '20250102', '20250103', '20250106']
+        self.assertEqual(MarketIngest.day_runs(['20250106', '20241230', '20241231', '20250103'], days),
+                         [['20241230', '20241231'], ['20250103', '20250106']])
+        self.assertEqual(MarketIngest.day_runs([], days), [])
+
+    def test_ingest_cross_sections(self):
+        api = FakeMarketApi()
+        written = MarketIngest.ingest('20241223', '20250110', endpoints=('daily', 'adj_factor'), client=api,
+                                      scheduler=self.scheduler, calendar=self.calendar, root=self.tmp.name)
+        days = pd.bdate_range('20241223', '20250110').strftime('%Y%m%d')
+        self.assertEqual(written, {'daily': 7 * len(days), 'adj_factor': 7 * len(days)})
+        # 每个交易日每个接口一次请求，截面超过一页时翻页一次
+        self.assertEqual(len(api.calls), 2 * 2 * len(days))
+        self.assertEqual(sorted({offset for _, _, offset in api.calls}), [0, 5])
+
+        df = DataStore.read_dataset('market_daily', root=self.tmp.name)
+        self.assertEqual(len(df), 7 * len(days))
+        self.assertEqual(sorted(os.listdir(os.path.join(self.tmp.name, 'market_daily')))[:2],
+                         ['_meta.json', 'year=2024'])
+        self.assertEqual(DataStore.fetched_ranges('market_daily', MarketIngest.Fetched_Key, root=self.tmp.name),
+                         [['20241223', '20250110']])
+
+        # 已拉取的交易日不再请求，只补新增的交易日
+        api.calls.clear()
+        MarketIngest.update('20250114', days=10, endpoints=('daily', 'adj_factor'), client=api,
+                            scheduler=self.scheduler, calendar=self.calendar, root=self.tmp.name)
+        self.assertEqual(sorted({day for _, day, _ in api.calls}), ['20250113', '20250114'])
+
+        panel = MarketIngest.load_panel('daily', cache_dir=os.path.join(self.tmp.name, 'panels'),
+                                        root=self.tmp.name)
+        self.assertEqual(panel.symbols.tolist(), Codes)
+        self.assertEqual(panel.dates[-1], 20250114)
+        self.assertEqual(panel['close'].shape, (7, len(days) + 2))
+        self.assertEqual(panel['close'][6, -1], 14 + 6)
+        factors = MarketIngest.load_panel('adj_factor', cache_dir=os.path.join(self.tmp.name, 'panels'),
+                                          root=self.tmp.name)
+        self.assertEqual(list(factors.columns), ['adj_factor'])
@@ -0,0 +1,74 @@
+from unittest import TestCase
+from com.example.tools import Metrics
+import numpy as np
+import pandas as pd
+
+
+class Test(TestCase):
+    def test_summarize_matches_single_series(self):
+        rng = np.random.default_rng(7)
+        index = pd.bdate_range('2020-01-01', periods=500)
+        returns = pd.DataFrame(rng.normal(0.0005, 0.015, (500, 3)), index=index, columns=['a', 'b', 'c'])
+        returns.iloc[:100, 2] = np.nan  # 晚上市的标的
+
+        result = Metrics.summarize(returns)
+        for name in returns.columns:
+            series = returns[name].dropna()
+            wealth = (1 + series).cumprod()
+            max_drawdown = (1 - wealth / wealth.cummax()).max()
+            cagr = wealth.iloc[-1] ** (252 / len(series)) - 1
+            self.assertAlmostEqual(result.loc[name, 'total_return'], wealth.iloc[-1] - 1)
+            self.assertAlmostEqual(result.loc[name, 'cagr'], cagr)
+            self.assertAlmostEqual(result.loc[name, 'sharpe'], series.mean() * 252 / (series.std() * np.sqrt(252)))
+            self.assertAlmostEqual(result.loc[name, 'max_drawdown'], max_drawdown)
+            self.assertAlmostEqual(result.loc[name, 'calmar'], cagr / max_drawdown)
+
+    def test_drawdown_episodes_and_longest_duration(self):
+        # 净值: 1.1 1.0 1.05 1.21 1.089 1.2 -> 两次回撤，第二次未修复
+        wealth = np.array([1.1, 1.0, 1.05, 1.21, 1.089, 1.2])
+        returns = pd.Series(np.diff(np.r_[1.0, wealth]) / np.r_[1.0, wealth[:-1]],
+                            index=pd.to_datetime(['2025-01-01', '2025-01-02', '2025-01-03',
+                                                  '2025-01-06', '2025-01-07', '2025-01-10']))
+        episodes = Metrics.drawdown_episodes(returns)
+
+        self.assertEqual(len(episodes), 2)
+        first, second = episodes.iloc[0], episodes.iloc[1]
+        self.assertEqual(first['peak'], pd.Timestamp('2025-01-01'))
+        self.assertEqual(first['trough'], pd.Timestamp('2025-01-02'))
+        self.assertEqual(first['recovery'], pd.Timestamp('2025-01-06'))
+        self.assertAlmostEqual(first['depth'], 1 - 1.0 / 1.1)
+        self.assertEqual((first['bars'], first['duration']), (3, 5))
+        self.assertTrue(pd.isna(second['recovery']))
+        self.assertEqual(second['duration'], 4)  # 未修复的回撤计至最后一日
+
+        summary = Metrics.summarize(returns)
+        self.assertEqual(summary['max_drawdown_duration'].iloc[0], 5)
+
+    def test_rolling_matches_summarize_on_each_window(self):
+        rng = np.random.default_rng(11)
+        returns = pd.DataFrame(rng.normal(0.0005, 0.02, (200, 3)), index=pd.bdate_range('2022-01-01', periods=200),
+                               columns=['a', 'b', 'c'])
+        returns.iloc[30:35, 2] = np.nan
+        result = Metrics.rolling(returns, windows=(20, 60), risk_free=0.02)
+
+        self.assertTrue(result[60].iloc[:59].isna().all().all())
+        for window in (20, 60):
+            for end in (window - 1, 100, 199):
+                expected = Metrics.summarize(returns.iloc[end - window + 1:end + 1], risk_free=0.02)
+                for field in Metrics.Rolling_Fields:
+                    np.testing.assert_allclose(result[window][field].iloc[end, :2], expected[field].iloc[:2])
+        # 窗口内有缺失收益时为NaN
+        self.assertTrue(np.isnan(result[20]['sharpe'].iloc[40, 2]))
+
+    def test_rolling_state_append_matches_batch(self):
+        rng = np.random.default_rng(5)
+        returns = pd.DataFrame(rng.normal(0.0, 0.015, (150, 2)), columns=['a', 'b'])
+        batch = Metrics.rolling(returns, windows=(10, 30))
+
+        state = Metrics.RollingState.from_history(returns.iloc[:40], windows=(10, 30))
+        for t in range(40, 150):
+            latest = state.append(returns.iloc[t].to_numpy(), t).latest()
+            for window in (10, 30):
+                for field in Metrics.Rolling_Fields:
+                    np.testing.assert_allclose(latest[(window, field)].to_numpy(),
+                                               batch[window][field].iloc[t].to_numpy())
@@ -0,0 +1,57 @@
+from unittest import TestCase
+from com.example.tools import PanelCache
+import numpy as np
+import os
+import pandas as pd
+import tempfile
+
+
+class Test(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.tmp.name, 'cache')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_build_and_memory_map(self):
+        df = pd.DataFrame({
+            'ts_code': ['B', 'A', 'A', 'A', 'B'],
+            'trade_date': ['20250103', '20250102', '20250103', '20250103', 'bad'],
+            'close': [10.0, 1.0, 2.0, 3.0, 99.0],
+            'vol': [5, 6, 7, 8, 9],
+        })
+        panel = PanelCache.build_panel(df, os.path.join(self.cache_dir, 'p'), dtype=np.float32)
+
+        self.assertEqual(panel.dates.tolist(), [20250102, 20250103])
+        self.assertEqual(panel.dates.dtype, np.int32)
+        self.assertEqual(panel.symbols.tolist(), ['A', 'B'])
+        self.assertIsInstance(panel['close'], np.memmap)
+        self.assertEqual(panel['close'].dtype, np.float32)
+        # 重复的代码+日期保留最后一行，缺失为NaN，无效日期丢弃
+        np.testing.assert_array_equal(panel['close'], [[1.0, 3.0], [np.nan, 10.0]])
+
+        b = panel.frame('B')
+        self.assertEqual(b.index.tolist(), [pd.Timestamp('2025-01-03')])
+        self.assertEqual(panel.cross_section(20250102)['vol'].tolist()[0], 6.0)
+
+    def test_load_file_invalidated_by_mtime(self):
+        path = os.path.join(self.tmp.name, 'daily.csv')
+        pd.DataFrame({'trade_date': [20250102, 20250103], 'close': [1.0, 2.0]}).to_csv(path, index=False)
+        reads = []
+
+        def read(file_path):
+            reads.append(file_path)
+            return pd.read_csv(file_path)
+
+        first = PanelCache.load_file(path, read=read, cache_dir=self.cache_dir)
+        second = PanelCache.load_file(path, read=read, cache_dir=self.cache_dir)
+        self.assertEqual(len(reads), 1)
+        self.assertEqual(second.frame()['close'].tolist(), [1.0, 2.0])
+
+        pd.DataFrame({'trade_date': [20250102, 20250103, 20250106], 'close': [1.0, 2.0, 3.0]}) \
+            .to_csv(path, index=False)
+        os.utime(path, ns=(first.meta['source']['mtime_ns'] + 10 ** 9,) * 2)
+        third = PanelCache.load_file(path, read=read, cache_dir=self.cache_dir)
+        self.assertEqual(len(reads), 2)
+        self.assertEqual(third.frame()['close'].tolist(), [1.0, 2.0, 3.0])
@@ -0,0 +1,38 @@
+from unittest import TestCase
+from com.example.PortfolioStrategy import MA20Portfolio
+from com.example.MaoTai_20_Strategy import MA20Strategy
+from test.test_MaoTai_20_Strategy import make_sample_data
+import numpy as np
+
+
+class Test(TestCase):
+    def test_holding_matches_single_strategy_signals(self):
+        prices = {f'{i:06d}.SH': make_sample_data(n=800, seed=i) for i in range(3)}
+        portfolio = MA20Portfolio(window=20, max_weight=0.4)
+        self.assertTrue(portfolio.load_data(prices))
+        self.assertTrue(portfolio.generate_signals())
+        self.assertTrue(portfolio.backtest())
+
+        for ts_code, data in prices.items():
+            strategy = MA20Strategy(window=20)
+            strategy.data = data.copy()
+            strategy.generate_signals()
+            position = strategy.data['position']
+            expected = position.where(position.abs() == 2).map({2: 1.0, -2: 0.0}).ffill().fillna(0)
+            np.testing.assert_array_equal(portfolio.holding[ts_code].to_numpy(), expected.to_numpy())
+
+        # 等权且单一标的不超过40%
+        self.assertTrue((portfolio.weights.to_numpy() <= 0.4 + 1e-12).all())
+        self.assertTrue((portfolio.results['cash_weight'] >= -1e-12).all())
+
+    def test_frictionless_single_asset(self):
+        data = make_sample_data(n=500)
+        portfolio = MA20Portfolio(window=10)
+        portfolio.load_data({'600519.SH': data})
+        portfolio.generate_signals()
+        portfolio.backtest(slippage=0, commision_rate=0)
+
+        held = portfolio.holding['600519.SH'].shift(1, fill_value=0).to_numpy()
+        returns = data['close'].pct_change().fillna(0).to_numpy()
+        expected = 1000000.0 * np.cumprod(1 + held * returns)
+        np.testing.assert_allclose(portfolio.results['total_assets'].to_numpy(), expected)
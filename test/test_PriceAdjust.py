@@ -0,0 +1,171 @@
+from unittest import TestCase
+import os
+import tempfile
+import threading
+import numpy as np
+import pandas as pd
+from com.example.MaoTai_20_Strategy import MA20Strategy
+from com.example.tools import DataStore, FetchScheduler, PriceAdjust, TradingCalendar
+
+
+def make_bars():
+    days = pd.bdate_range('20240101', '20240131').strftime('%Y%m%d')
+    rows = []
+    for ts_code, base in (('000001.SZ', 10.0), ('600519.SH', 1500.0)):
+        for i, day in enumerate(days):
+            close = base + i
+            rows.append((ts_code, day, close - 0.5, close + 1, close - 1, close, close - 1, 1.0, 100.0))
+    return pd.DataFrame(rows, columns=['ts_code', 'trade_date', 'open', 'high', 'low', 'close', 'pre_close',
+                                       'change', 'vol'])
+
+
+def make_factors():
+    # 000001.SZ 在20240115除权（因子由1.0变为1.2），600519.SH只有首日的因子
+    return pd.DataFrame([('000001.SZ', '20240101', 1.0), ('000001.SZ', '20240115', 1.2),
+                         ('600519.SH', '20240101', 8.0)],
+                        columns=['ts_code', 'trade_date', 'adj_factor'])
+
+
+class FakeDailyApi:
+    """模拟daily/adj_factor：按日期区间返回make_bars/make_factors的对应行"""
+
+    def __init__(self, bars, factors):
+        self.bars, self.factors = bars, factors
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def _slice(self, df, ts_code, start_date, end_date):
+        return df[(df['ts_code'] == ts_code) & (df['trade_date'] >= start_date)
+                  & (df['trade_date'] <= end_date)].reset_index(drop=True)
+
+    def daily(self, ts_code, start_date, end_date, fields=''):
+        with self.lock:
+            self.calls.append(('daily', start_date, end_date))
+        return self._slice(self.bars, ts_code, start_date, end_date)
+
+    def adj_factor(self, ts_code, start_date, end_date, fields=''):
+        with self.lock:
+            self.calls.append(('adj_factor', start_date, end_date))
+        return self._slice(self.factors, ts_code, start_date, end_date)
+
+
+class Test(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_adjust_modes(self):
+        bars, factors = make_bars(), make_factors()
+        raw = PriceAdjust.adjust_prices(bars, factors, adj=None)
+        hfq = PriceAdjust.adjust_prices(bars, factors, adj='hfq')
+        qfq = PriceAdjust.adjust_prices(bars, factors, adj='qfq')
+
+        pingan = raw['ts_code'] == '000001.SZ'
+        factor = np.where(raw['trade_date'] >= '20240115', 1.2, 1.0)
+        np.testing.assert_allclose(hfq.loc[pingan, 'close'], raw.loc[pingan, 'close'] * factor[pingan])
+        np.testing.assert_allclose(qfq.loc[pingan, 'close'], raw.loc[pingan, 'close'] * factor[pingan] / 1.2)
+        # 缺少当日因子时沿用之前的因子；前复权以最新因子为基准，价格不变
+        np.testing.assert_allclose(hfq.loc[~pingan, 'open'], raw.loc[~pingan, 'open'] * 8.0)
+        np.testing.assert_allclose(qfq.loc[~pingan, 'open'], raw.loc[~pingan, 'open'])
+        np.testing.assert_allclose(qfq['change'], qfq['close'] - qfq['pre_close'])
+        np.testing.assert_array_equal(qfq['vol'], raw['vol'])
+
+        with self.assertRaises(ValueError):
+            PriceAdjust.adjust_prices(bars, factors, adj='bad')
+
+    def test_base_date(self):
+        bars, factors = make_bars(), make_factors()
+        # 20240113是周六：取之前最近的因子（1.0），除权前的价格保持不变
+        qfq = PriceAdjust.adjust_prices(bars, factors, adj='qfq', base_date='2024-01-13')
+        pingan = qfq[qfq['ts_code'] == '000001.SZ']
+        raw = bars[bars['ts_code'] == '000001.SZ'].reset_index(drop=True)
+        before = (raw['trade_date'] < '20240115').to_numpy()
+        np.testing.assert_allclose(pingan['close'].to_numpy()[before], raw['close'].to_numpy()[before])
+        np.testing.assert_allclose(pingan['close'].to_numpy()[~before], raw['close'].to_numpy()[~before] * 1.2)
+        self.assertEqual(PriceAdjust.base_factors(factors, '20240113').to_dict(),
+                         {'000001.SZ': 1.0, '600519.SH': 8.0})
+
+    def test_base_date_before_factor_history(self):
+        bars = make_bars()
+        factors = make_factors().assign(trade_date=lambda df: df['trade_date'].replace('20240101', '20240102'))
+        # 基准日早于第一个因子：以最早的因子为基准，而不是全部为NaN
+        self.assertEqual(PriceAdjust.base_factors(factors, '20231229').to_dict(), {'000001.SZ': 1.0, '600519.SH': 8.0})
+        qfq = PriceAdjust.adjust_prices(bars, factors, adj='qfq', base_date='20231229')
+        later = (qfq['trade_date'] >= '20240102').to_numpy()
+        self.assertFalse(qfq.loc[later, 'close'].isna().any())
+        pingan = (qfq['ts_code'] == '000001.SZ').to_numpy()
+        np.testing.assert_allclose(qfq.loc[pingan & later, 'close'],
+                                   bars.loc[pingan & later, 'close'] * np.where(
+                                       bars.loc[pingan & later, 'trade_date'] >= '20240115', 1.2, 1.0))
+
+    def test_update_and_read(self):
+        bars, factors = make_bars(), make_factors()
+        api = FakeDailyApi(bars, factors)
+        scheduler = FetchScheduler.FetchScheduler(max_workers=2)
+        calendar = TradingCalendar.TradingCalendar.weekdays('20240101', '20241231')
+        codes = ['000001.SZ', '600519.SH']
+        try:
+            added = PriceAdjust.update_daily(codes, api.daily, api.adj_factor, 'daily', 'factor', '20240101',
+                                             end_date='20240112', scheduler=scheduler, calendar=calendar,
+                                             root=self.tmp.name)
+            self.assertEqual(added['000001.SZ'], (10, 1))
+            # 高水位之后没有新的交易日（周末）时不发请求
+            api.calls.clear()
+            PriceAdjust.update_daily(codes, api.daily, api.adj_factor, 'daily', 'factor', '20240101',
+                                     end_date='20240114', scheduler=scheduler, calendar=calendar, root=self.tmp.name)
+            self.assertNotIn('daily', [kind for kind, _, _ in api.calls])
+            api.calls.clear()
+            PriceAdjust.update_daily(codes, api.daily, api.adj_factor, 'daily', 'factor', '20240101',
+                                     end_date='20240131', scheduler=scheduler, calendar=calendar, root=self.tmp.name)
+        finally:
+            scheduler.shutdown()
+        # 之后只请求高水位之后的交易日
+        self.assertIn(('daily', '20240115', '20240131'), api.calls)
+        self.assertIn(('adj_factor', '20240102', '20240131'), api.calls)
+
+        stored = PriceAdjust.read_adjusted('daily', 'factor', adj='qfq', root=self.tmp.name)
+        expected = PriceAdjust.adjust_prices(bars, factors, adj='qfq')
+        np.testing.assert_allclose(stored['close'], expected['close'])
+        # 读取部分日期时，前复权仍以最新因子为基准
+        early = PriceAdjust.read_adjusted('daily', 'factor', adj='qfq', end_date='20240105', root=self.tmp.name)
+        np.testing.assert_allclose(early.loc[early['ts_code'] == '000001.SZ', 'close'],
+                                   [10 / 1.2, 11 / 1.2, 12 / 1.2, 13 / 1.2, 14 / 1.2])
+        # 区间首日之前的因子仍然生效
+        late = PriceAdjust.read_adjusted('daily', 'factor', adj='hfq', start_date='20240116', root=self.tmp.name)
+        np.testing.assert_allclose(late.loc[late['ts_code'] == '600519.SH', 'close'],
+                                   bars.loc[(bars['ts_code'] == '600519.SH') & (bars['trade_date'] >= '20240116'),
+                                            'close'] * 8.0)
+
+    def test_adjusted_panel_and_strategy_load(self):
+        bars, factors = make_bars(), make_factors()
+        DataStore.append_dataset(bars[bars['trade_date'] < '20240115'], 'stock_daily', partition_by='ts_code',
+                                 root=self.tmp.name)
+        DataStore.append_dataset(factors.iloc[:1], 'adj_factor', partition_by='ts_code', root=self.tmp.name)
+        cache_dir = os.path.join(self.tmp.name, 'panels')
+        panel = PriceAdjust.load_panel('stock_daily', 'adj_factor', cache_dir=cache_dir, root=self.tmp.name)
+        self.assertEqual(panel.frame('000001.SZ')['close'].iloc[0], 10.0)
+
+        # 新的复权因子写入后面板重新构建，前复权价格以新因子为基准
+        DataStore.append_dataset(bars[bars['trade_date'] >= '20240115'], 'stock_daily', partition_by='ts_code',
+                                 root=self.tmp.name)
+        DataStore.append_dataset(factors.iloc[1:], 'adj_factor', partition_by='ts_code', root=self.tmp.name)
+        panel = PriceAdjust.load_panel('stock_daily', 'adj_factor', cache_dir=cache_dir, root=self.tmp.name)
+        expected = PriceAdjust.adjust_prices(bars, factors, adj='qfq')
+        pingan = expected[expected['ts_code'] == '000001.SZ']
+        np.testing.assert_allclose(panel.frame('000001.SZ')['close'].to_numpy(), pingan['close'].to_numpy())
+
+        # 策略按代码读取前复权数据（有缓存与无缓存的结果一致）
+        strategy = MA20Strategy(ts_code='000001.SZ')
+        original = PriceAdjust.load_panel
+
+        def load_panel(*args, **kwargs):
+            return original(*args, cache_dir=cache_dir, root=self.tmp.name, **kwargs)
+
+        PriceAdjust.load_panel = load_panel
+        try:
+            self.assertTrue(strategy.load_data())
+        finally:
+            PriceAdjust.load_panel = original
+        np.testing.assert_allclose(strategy.data['close'].to_numpy(), pingan['close'].to_numpy())
@@ -0,0 +1,90 @@
+from unittest import TestCase
+import importlib.util
+import os
+import numpy as np
+import pandas as pd
+
+# 模块文件名中含有不可见字符，按路径加载
+_path = os.path.join(os.path.dirname(__file__), '..', 'com', 'example', 'QuantitativeMultifactorFiltering​.py')
+_spec = importlib.util.spec_from_file_location('QuantitativeMultifactorFiltering', _path)
+qmf = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(qmf)
+
+Criteria = {
+    'roe': {'min': 15, 'years': 3},
+    'debt_to_asset': {'max': 60},
+    'cash_flow_to_profit': {'min': 0.8},
+    'revenue_growth': {'min': 8, 'years': 3},
+    'pe': {'max': 25},
+}
+
+
+def make_panels():
+    """三只股票的年报：A全部达标，B第三年ROE不足，C只有两期年报"""
+    rows = []
+    for ts_code, roes in (('A', [20, 18, 16]), ('B', [20, 18, 10]), ('C', [20, 18])):
+        for i, roe in enumerate(roes):
+            rows.append({'ts_code': ts_code, 'end_date': f'{2024 - i}1231', 'report_type': 1, 'roe': roe,
+                         'roic': 12.0, 'grossprofit_margin': 50.0, 'netprofit_margin': 20.0,
+                         'debt_to_assets': 40.0, 'current_ratio': 2.0, 'quick_ratio': 1.5,
+                         'revenue_ps': 1.2 ** (2 - i), 'profit_dedt': 1.0,
+                         'im_net_cashflow_oper_act': 1.0, 'net_profit': 1.0})
+    fina = pd.DataFrame(rows)
+    return {
+        'fina_indicator': fina,
+        'cashflow': fina[['ts_code', 'end_date', 'report_type', 'im_net_cashflow_oper_act', 'net_profit']],
+        'valuation': pd.DataFrame({'ts_code': ['A', 'B', 'C'], 'pe_ttm': [10.0, 10.0, np.nan],
+                                   'pb': 1.0, 'dv_ttm': 3.0}),
+        'stock_basic': pd.DataFrame({'ts_code': ['A', 'B', 'C'], 'name': ['甲', '乙', '丙'],
+                                     'industry': '白酒'}).set_index('ts_code', drop=False),
+    }
+
+
+class Test(TestCase):
+    def test_evaluate_mask_and_reasons(self):
+        engine = qmf.ScreeningEngine(Criteria)
+        passed, mask, reasons = engine.evaluate(make_panels(), ['A', 'B', 'C', 'D'])
+
+        self.assertEqual(passed.tolist(), [True, False, False, False])
+        self.assertEqual(list(mask.columns), list(Criteria))
+        self.assertFalse(mask.loc['B', 'roe'])
+        self.assertTrue(mask.loc['B', 'pe'])
+        # 年报期数不足、缺失估值均视为不满足
+        self.assertEqual(reasons['C'], 'roe;revenue_growth;pe')
+        self.assertEqual(reasons['A'], '')
+        self.assertFalse(mask.loc['D'].any())
+
+    def test_percentile_rule_uses_history(self):
+        criteria = {'pe': {'max': 25, 'percentile': 50}}
+        history = pd.DataFrame({'ts_code': ['A'] * 4 + ['B'] * 4, 'trade_date': list('1234') * 2,
+                                'pe_ttm': [5.0, 6.0, 7.0, 8.0, 20.0, 30.0, 40.0, 50.0]})
+        passed, _, _ = qmf.ScreeningEngine(criteria).evaluate(make_panels(), ['A', 'B'], valuation_history=history)
+        # A的当前PE高于全部历史值，B低于全部历史值
+        self.assertEqual(passed.tolist(), [False, True])
+
+    def test_collect_columns(self):
+        out = qmf.ScreeningEngine(Criteria).collect(make_panels(), ['A'])
+        self.assertEqual(out.loc[0, '股票名称'], '甲')
+        self.assertEqual(out.loc[0, '最新年报日期'], '20241231')
+        self.assertAlmostEqual(out.loc[0, '近3年营收复合增速(%)'], (1.44 ** (1 / 3) - 1) * 100)
+
+    def test_filter_stocks_passes_valuation_history(self):
+        class Provider:
+            requested = None
+
+            def get_stock_pool(self):
+                return ['A', 'B', 'C']
+
+            def get_panels(self):
+                return make_panels()
+
+            def get_valuation_history(self, stocks):
+                Provider.requested = stocks
+                return pd.DataFrame({'ts_code': ['A', 'B'], 'trade_date': ['1', '1'], 'pe_ttm': [1.0, 50.0],
+                                     'pb': [0.5, 5.0]})
+
+        stock_filter = qmf.StockFilter(Provider())
+        self.assertEqual(stock_filter.filter_stocks(), [])
+        self.assertEqual(Provider.requested, ['A', 'B', 'C'])
+        # 当前PE高于全部历史值的A不满足历史分位规则，B满足
+        self.assertEqual(stock_filter.last_mask['pe'].tolist(), [False, True, False])
@@ -0,0 +1,45 @@
+from unittest import TestCase
+import contextlib
+import io
+from com.example import StrategySweep
+from com.example.MaoTai_20_Strategy import MA20Strategy
+from test.test_MaoTai_20_Strategy import make_sample_data
+import numpy as np
+
+
+class Test(TestCase):
+    def test_run_sweep_matches_backtest(self):
+        data = make_sample_data(n=1500)
+        results = StrategySweep.run_sweep(
+            {'window': [10, 20], 'slippage': [0.0002, 0.001], 'commision_rate': [0.001]},
+            data=data, rank_by='total_return', max_workers=2, chunk_size=1
+        )
+        self.assertEqual(len(results), 4)
+        self.assertTrue(results['total_return'].is_monotonic_decreasing)
+
+        strategy = MA20Strategy(window=20)
+        strategy.data = data.copy()
+        strategy.generate_signals()
+        strategy.backtest(slippage=0.001, vectorized=True)
+        final_assets = strategy.results['total_assets'].iloc[-1]
+
+        row = results[(results['window'] == 20) & (results['slippage'] == 0.001)].iloc[0]
+        expected = (final_assets - 1000000.0) / 1000000.0 * 100
+        self.assertTrue(np.isclose(row['total_return'], expected))
+
+        # 成交次数与逐日循环引擎的交易记录一致
+        log = io.StringIO()
+        with contextlib.redirect_stdout(log):
+            strategy.backtest(slippage=0.001)
+        trades = [line for line in log.getvalue().splitlines() if ' 股，价格 ' in line]
+        self.assertGreater(len(trades), 0)
+        self.assertEqual(row['trades'], len(trades))
+
+    def test_trades_include_opening_position(self):
+        assets = np.array([100.0, 101.0, 102.0, 101.0])
+        summary = StrategySweep.summarize_assets(assets, np.array([100, 100, 0, 0]), 1.0)
+        self.assertEqual(summary['trades'], 2)
+        # 只统计有买卖信号的成交，空仓时的卖出信号不算成交
+        position = np.array([np.nan, 0.0, -2.0, -2.0])
+        summary = StrategySweep.summarize_assets(assets, np.array([100, 100, 0, 0]), 1.0, position)
+        self.assertEqual(summary['trades'], 1)
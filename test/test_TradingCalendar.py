@@ -0,0 +1,76 @@
+from unittest import TestCase
+import tempfile
+import numpy as np
+import pandas as pd
+from com.example.tools import TradingCalendar
+
+# 2024年春节休市：0209-0217
+Holidays = set(pd.date_range('20240209', '20240217').strftime('%Y%m%d'))
+
+
+class FakeCalendarApi:
+    def __init__(self):
+        self.calls = []
+
+    def trade_cal(self, exchange, start_date, end_date, fields=''):
+        self.calls.append((exchange, start_date, end_date))
+        days = pd.date_range(start_date, min(end_date, '20241231')).strftime('%Y%m%d')
+        is_open = [int(pd.Timestamp(day).weekday() < 5 and day not in Holidays) for day in days]
+        return pd.DataFrame({'exchange': exchange, 'cal_date': days, 'is_open': is_open})
+
+
+class Test(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.api = FakeCalendarApi()
+        calendar = TradingCalendar.TradingCalendar([], exchange='SSE')
+        calendar.extend(self.api, end_date='20241231')
+        self.calendar = calendar
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_date_math(self):
+        calendar = self.calendar
+        self.assertEqual(calendar.days.dtype, np.int32)
+        self.assertTrue(calendar.is_trading_day('20240208'))
+        self.assertNotIn('20240212', calendar)
+        self.assertEqual(calendar.next_day('20240208'), '20240219')
+        self.assertEqual(calendar.next_day('20240208', inclusive=True), '20240208')
+        self.assertEqual(calendar.previous_day('20240218'), '20240208')
+        self.assertEqual(calendar.previous_day('20240219', inclusive=True), '20240219')
+        self.assertEqual(calendar.offset('20240208', 1), '20240219')
+        self.assertEqual(calendar.offset('20240210', 1), '20240219')
+        self.assertEqual(calendar.offset('20240210', -1), '20240208')
+        self.assertEqual(calendar.offset('20240210', 0), '20240208')
+        self.assertEqual(calendar.dates('20240207', '20240220'), ['20240207', '20240208', '20240219', '20240220'])
+        self.assertEqual(calendar.count('20240101', '20241231'), 262 - 6)  # 春节休市6个工作日
+        self.assertIsNone(calendar.next_day('20241231'))
+        self.assertIsNone(calendar.offset('19900101', -1))
+        self.assertEqual(TradingCalendar.shift_days('20240301', -1), '20240229')
+
+    def test_cache_and_incremental_refresh(self):
+        calendar = TradingCalendar.TradingCalendar([], exchange='SSE')
+        calendar.extend(self.api, end_date='20240630')
+        self.assertEqual(calendar.covered_until, 20240630)
+        calendar.save(self.tmp.name)
+
+        loaded = TradingCalendar.TradingCalendar.load('SSE', self.tmp.name)
+        np.testing.assert_array_equal(loaded.days, calendar.days)
+        self.api.calls.clear()
+        loaded.refreshed = 0.0
+        TradingCalendar.set_calendar(loaded, root=self.tmp.name)
+        shared = TradingCalendar.get_calendar(end_date='20241015', client=self.api, root=self.tmp.name)
+        # 只请求缓存覆盖范围之后的日期
+        self.assertEqual(self.api.calls[0][1], '20240701')
+        self.assertEqual(shared.covered_until, 20241231)
+        np.testing.assert_array_equal(shared.days, self.calendar.days)
+        # 已覆盖的日期不再请求
+        self.api.calls.clear()
+        TradingCalendar.get_calendar(end_date='20241231', client=self.api, root=self.tmp.name)
+        self.assertEqual(self.api.calls, [])
+
+    def test_weekdays(self):
+        calendar = TradingCalendar.TradingCalendar.weekdays('20240101', '20240131')
+        self.assertEqual(calendar.dates(), list(pd.bdate_range('20240101', '20240131').strftime('%Y%m%d')))
+        self.assertTrue(calendar.covers('20240131'))